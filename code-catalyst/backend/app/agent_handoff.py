@@ -3,12 +3,19 @@ Agent Handoff System - Inspired by argus-prime/handoff.py
 Allows Code Catalyst to delegate specialized tasks to domain-specific agents
 """
 
+import asyncio
 import logging
+import re
+import threading
 import time
 import json
-from typing import Dict, Optional, List
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterator, Optional, List, Tuple
 from datetime import datetime
 from enum import Enum
+from .config import Config
+from .handoff_store import OPEN_STATUSES, HandoffStore, create_handoff_store
 
 logger = logging.getLogger(__name__)
 
@@ -34,25 +41,137 @@ class TaskStatus(Enum):
     HANDED_BACK = "handed_back"
 
 
+# Routing weights: a language hint outweighs any single keyword hit
+LANGUAGE_WEIGHT = 2.0
+KEYWORD_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split lowercased text into alphanumeric tokens ("pull-request" -> pull, request)"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class KeywordIndex:
+    """
+    Precompiled keyword index over all agent specializations
+    Maps keyword phrases to (agent, weight) postings so a task is scored
+    against every agent in one pass over its tokens
+    """
+
+    def __init__(self, specializations: Dict):
+        # Phrases are stored as space-joined tokens ("smart-contract" -> "smart contract")
+        self.phrases: Dict[str, List[Tuple[AgentType, float]]] = {}
+        self.languages: Dict[str, AgentType] = {}
+        self.max_phrase_len = 1
+
+        owners: Dict[str, List[AgentType]] = {}
+        for agent_type, info in specializations.items():
+            for keyword in info.get("keywords", []):
+                tokens = _tokenize(keyword)
+                if not tokens:
+                    continue
+                phrase = " ".join(tokens)
+                if agent_type not in owners.setdefault(phrase, []):
+                    owners[phrase].append(agent_type)
+                self.max_phrase_len = max(self.max_phrase_len, len(tokens))
+            for language in info.get("languages", []):
+                self.languages[language.lower()] = agent_type
+
+        # Keywords shared by several agents are worth proportionally less
+        for phrase, agents in owners.items():
+            weight = KEYWORD_WEIGHT / len(agents)
+            self.phrases[phrase] = [(agent, weight) for agent in agents]
+
+    def _lookup(self, phrase: str) -> Optional[List[Tuple[AgentType, float]]]:
+        postings = self.phrases.get(phrase)
+        if postings is None and len(phrase) > 3 and phrase[-1] == "s":
+            # Cheap plural folding: "contracts" -> "contract"
+            postings = self.phrases.get(phrase[:-1])
+        return postings
+
+    def score(self, task_description: str, code_language: Optional[str] = None) -> Tuple[Dict, Dict]:
+        """
+        Score every agent against the task in a single pass
+
+        Returns:
+            (scores, matches): agent -> score, agent -> matched keywords
+        """
+        scores: Dict[AgentType, float] = {}
+        matches: Dict[AgentType, List[str]] = {}
+        seen = set()
+
+        if code_language:
+            agent_type = self.languages.get(code_language.lower())
+            if agent_type is not None:
+                scores[agent_type] = LANGUAGE_WEIGHT
+                matches[agent_type] = [f"language:{code_language.lower()}"]
+
+        window: List[str] = []
+        for token in _tokenize(task_description):
+            window.append(token)
+            if len(window) > self.max_phrase_len:
+                del window[0]
+            # Check every phrase ending at this token (at most max_phrase_len lookups)
+            phrase = token
+            for i in range(len(window) - 1, -1, -1):
+                if i < len(window) - 1:
+                    phrase = window[i] + " " + phrase
+                if phrase in seen:
+                    continue
+                postings = self._lookup(phrase)
+                if postings is None:
+                    continue
+                seen.add(phrase)
+                for agent_type, weight in postings:
+                    scores[agent_type] = scores.get(agent_type, 0.0) + weight
+                    matches.setdefault(agent_type, []).append(phrase)
+
+        return scores, matches
+
+
 class AgentHandoff:
     """
     Central handoff coordinator for Code Catalyst agents
     Matches tasks to specialized agents and tracks delegation
     """
 
-    def __init__(self):
-        self.handoff_log: List[Dict] = []
-        self.active_delegations: Dict[str, Dict] = {}
+    def __init__(
+        self,
+        log_capacity: Optional[int] = None,
+        delegation_ttl_seconds: Optional[float] = None,
+        store: Optional[HandoffStore] = None,
+    ):
+        # Delegations + bounded handoff log (memory, SQLite or Redis backend),
+        # created on first use so importing this module does no I/O
+        self._store = store
+        self._log_capacity = log_capacity
+        self._store_lock = threading.Lock()
+
+        # How long finished/overdue delegations stay queryable before eviction
+        self.delegation_ttl_seconds = (
+            delegation_ttl_seconds
+            if delegation_ttl_seconds is not None
+            else Config.HANDOFF_DELEGATION_TTL_SECONDS
+        )
+        # Lifecycle listeners: callback(event, record) on
+        # delegated/redelegated/started/handed_back/expired
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        # Event loop the listeners run on (see bind_loop)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
         # Agent specializations mapping
         self.agent_specializations = {
             AgentType.DART_CAPSULE: {
-                "keywords": ["dart", "capsule", "flutter", "wealthbridge", "stateful"],
+                "keywords": ["dart", "capsule", "flutter", "wealthbridge", "stateful", "widget"],
+                "languages": ["dart"],
                 "capabilities": ["code-generation", "code-review", "pattern-matching"],
                 "models": ["claude-3.5-sonnet", "gpt-4"],
             },
             AgentType.SOLIDITY_AUDITOR: {
-                "keywords": ["solidity", "smart-contract", "ethereum", "polygon", "security"],
+                "keywords": ["solidity", "smart-contract", "contract", "vulnerability", "ethereum", "polygon", "security"],
+                "languages": ["solidity"],
                 "capabilities": ["vulnerability-scan", "gas-optimization", "audit"],
                 "models": ["claude-3.5-sonnet"],
             },
@@ -72,46 +191,96 @@ class AgentHandoff:
                 "models": ["claude-3.5-sonnet"],
             },
             AgentType.VAULTGEMMA_SECURITY: {
-                "keywords": ["security", "encryption", "credential", "vault", "secret"],
+                "keywords": ["security", "encryption", "encrypt", "credential", "vault", "secret"],
                 "capabilities": ["credential-scanning", "encryption", "compliance"],
                 "models": ["claude-3.5-sonnet"],
             },
         }
 
+        # Routing decision counters (exposed via get_routing_stats)
+        self.routing_stats: Counter = Counter()
+        self.rebuild_index()
+
+    @property
+    def store(self) -> HandoffStore:
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    self._store = create_handoff_store(self._log_capacity)
+        return self._store
+
+    def rebuild_index(self):
+        """Recompile the keyword index after editing agent_specializations"""
+        self._index = KeywordIndex(self.agent_specializations)
+
+    def rank_agents(
+        self,
+        task_description: str,
+        code_language: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Rank candidate agents for a task
+
+        Returns:
+            Candidates sorted by score, each with: agent, score, confidence, matched
+        """
+        scores, matches = self._index.score(task_description, code_language)
+        total = sum(scores.values())
+
+        # Ties resolve in agent_specializations declaration order
+        order = {agent_type: i for i, agent_type in enumerate(self.agent_specializations)}
+        ranked = sorted(scores, key=lambda a: (-scores[a], order.get(a, len(order))))
+        if limit is not None:
+            ranked = ranked[:limit]
+
+        return [
+            {
+                "agent": agent_type.value,
+                "score": round(scores[agent_type], 3),
+                "confidence": round(scores[agent_type] / total, 3),
+                "matched": matches[agent_type],
+            }
+            for agent_type in ranked
+        ]
+
+    def route(self, task_description: str, code_language: Optional[str] = None) -> Dict:
+        """
+        Route a task and record the decision
+
+        Returns:
+            Dict with: agent (AgentType), confidence, candidates (top 3)
+        """
+        candidates = self.rank_agents(task_description, code_language, limit=3)
+
+        if candidates:
+            agent_type = AgentType(candidates[0]["agent"])
+            confidence = candidates[0]["confidence"]
+        else:
+            # Fallback to generalist
+            agent_type = AgentType.DEEPAGENT
+            confidence = 0.0
+            self.routing_stats["fallback"] += 1
+
+        self.routing_stats["decisions"] += 1
+        self.routing_stats[agent_type.value] += 1
+
+        return {
+            "agent": agent_type,
+            "confidence": confidence,
+            "candidates": candidates,
+        }
+
     def predict_agent(self, task_description: str, code_language: Optional[str] = None) -> AgentType:
         """
         Predict best agent for a task based on keywords and language
         Returns the specialized agent type
         """
-        task_lower = task_description.lower()
-        language_lower = code_language.lower() if code_language else ""
-        
-        # Dart capsule task
-        if "dart" in language_lower or "capsule" in task_lower or "flutter" in task_lower:
-            return AgentType.DART_CAPSULE
-        
-        # Solidity/security task
-        if "solidity" in language_lower or "contract" in task_lower or "vulnerability" in task_lower:
-            return AgentType.SOLIDITY_AUDITOR
-        
-        # Twilio/SMS/Voice task
-        if "sms" in task_lower or "voice" in task_lower or "twilio" in task_lower or "notification" in task_lower:
-            return AgentType.TWILIO_INTEGRATOR
-        
-        # GitHub task
-        if "github" in task_lower or "webhook" in task_lower or "pull request" in task_lower:
-            return AgentType.GITHUB_APP_AGENT
-        
-        # Optimization task
-        if "optimize" in task_lower or "performance" in task_lower or "quantum" in task_lower:
-            return AgentType.MINDMAX_OPTIMIZER
-        
-        # Security/credential task
-        if "security" in task_lower or "credential" in task_lower or "encrypt" in task_lower:
-            return AgentType.VAULTGEMMA_SECURITY
-        
-        # Fallback to generalist
-        return AgentType.DEEPAGENT
+        return self.route(task_description, code_language)["agent"]
+
+    def get_routing_stats(self) -> Dict:
+        """Routing decision counts per agent, plus total decisions and fallbacks"""
+        return dict(self.routing_stats)
 
     def delegate(
         self,
@@ -121,6 +290,8 @@ class AgentHandoff:
         code_language: Optional[str] = None,
         context: Optional[Dict] = None,
         timeout_seconds: int = 300,
+        target_agent: Optional[AgentType] = None,
+        routing: Optional[Dict] = None,
     ) -> Dict:
         """
         Delegate a task to a specialized agent
@@ -132,13 +303,19 @@ class AgentHandoff:
             code_language: Programming language (dart, solidity, javascript, etc)
             context: Additional context/parameters for the task
             timeout_seconds: Max time before handback timeout
+            target_agent: Skip routing and delegate to this agent
+            routing: Routing decision already made by route()
         
         Returns:
             Delegation record with agent assignment
         """
         
         # Predict best agent for this task
-        target_agent = self.predict_agent(task_description, code_language)
+        if target_agent is not None:
+            routing = {"agent": target_agent, "confidence": 1.0, "candidates": []}
+        elif routing is None:
+            routing = self.route(task_description, code_language)
+        target_agent = routing["agent"]
         
         # Create delegation record
         delegation = {
@@ -149,23 +326,34 @@ class AgentHandoff:
             "code_language": code_language,
             "context": context or {},
             "status": TaskStatus.DELEGATED.value,
+            "routing": {
+                "confidence": routing["confidence"],
+                "candidates": routing["candidates"],
+            },
             "delegated_at": datetime.now().isoformat(),
             "expected_handback_at": (datetime.now().timestamp() + timeout_seconds),
+            "timeout_seconds": timeout_seconds,
+            "attempts": 1,
             "timestamp": time.time(),
         }
         
-        # Track active delegation
-        self.active_delegations[task_id] = delegation
+        # Track active delegation (evicted ttl seconds after its handback deadline)
+        delegation["evict_at"] = delegation["expected_handback_at"] + self.delegation_ttl_seconds
+        self.evict_expired()
+        self.store.put_delegation(delegation)
         
         # Log handoff
-        self.handoff_log.append(delegation)
+        self.store.append_log(delegation)
         
         logger.info(
-            f"🤝 HANDOFF: {from_agent} → {target_agent.value} | "
+            f"🤝 HANDOFF: {from_agent} → {target_agent.value} "
+            f"(confidence {routing['confidence']:.2f}) | "
             f"Task: {task_description[:50]}... | ID: {task_id}"
         )
         
-        return delegation
+        self._emit("delegated", delegation)
+        
+        return dict(delegation)
 
     def handback(
         self,
@@ -176,6 +364,8 @@ class AgentHandoff:
     ) -> Dict:
         """
         Receive delegated work back from specialized agent
+        First handback wins: once a task is handed back (or failed) later
+        results are rejected, even if they come from another worker
         
         Args:
             task_id: Original task identifier
@@ -184,14 +374,27 @@ class AgentHandoff:
             status: "completed" or "failed"
         
         Returns:
-            Handback record
+            Handback record, or {"error": ...} if the task is unknown or closed
         """
-        
-        if task_id not in self.active_delegations:
-            logger.error(f"❌ Unknown task_id in handback: {task_id}")
-            return {"error": "Task not found"}
-        
-        delegation = self.active_delegations[task_id]
+        now = time.time()
+
+        def close(delegation: Dict) -> Optional[Dict]:
+            if delegation["status"] not in OPEN_STATUSES:
+                return None
+            delegation["status"] = (
+                TaskStatus.FAILED.value if status == TaskStatus.FAILED.value else TaskStatus.HANDED_BACK.value
+            )
+            delegation["result"] = result
+            delegation["evict_at"] = now + self.delegation_ttl_seconds
+            return delegation
+
+        delegation = self.store.update_delegation(task_id, close)
+        if delegation is None:
+            if self.store.get_delegation(task_id) is None:
+                logger.error(f"❌ Unknown task_id in handback: {task_id}")
+                return {"error": "Task not found"}
+            logger.warning(f"⚠️ Ignoring handback for closed task {task_id} from {agent}")
+            return {"error": "Task already handed back"}
         
         handback_record = {
             "task_id": task_id,
@@ -200,34 +403,216 @@ class AgentHandoff:
             "status": status,
             "result": result,
             "handed_back_at": datetime.now().isoformat(),
-            "duration_seconds": time.time() - delegation["timestamp"],
+            "duration_seconds": now - delegation["timestamp"],
         }
         
         # Log handback
-        self.handoff_log.append(handback_record)
-        
-        # Update active delegation status
-        delegation["status"] = TaskStatus.HANDED_BACK.value
-        delegation["result"] = result
+        self.store.append_log(handback_record)
+        self.evict_expired()
         
         logger.info(
             f"🔄 HANDBACK: {agent} → {delegation['from_agent']} | "
             f"Status: {status} | Duration: {handback_record['duration_seconds']:.2f}s"
         )
         
+        self._emit("handed_back", handback_record)
+        
         return handback_record
 
+    def mark_in_progress(self, task_id: str, agent: str) -> Optional[Dict]:
+        """
+        Move a delegation from DELEGATED to IN_PROGRESS when an agent picks it up
+        
+        Returns:
+            The delegation, or None if it is gone or no longer waiting for this agent
+        """
+        def start(delegation: Dict) -> Optional[Dict]:
+            if delegation["status"] != TaskStatus.DELEGATED.value or delegation["to_agent"] != agent:
+                return None
+            delegation["status"] = TaskStatus.IN_PROGRESS.value
+            delegation["started_at"] = time.time()
+            return delegation
+
+        delegation = self.store.update_delegation(task_id, start)
+        if delegation is not None:
+            self._emit("started", delegation)
+        return delegation
+
+    def expire(
+        self,
+        task_id: str,
+        now: Optional[float] = None,
+        policy: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Enforce the handback deadline of a delegation
+        
+        Args:
+            task_id: Delegated task identifier
+            now: Current epoch time (defaults to time.time())
+            policy: "fallback" re-delegates once to DEEPAGENT, "fail" marks FAILED
+                    (defaults to Config.HANDOFF_TIMEOUT_POLICY)
+        
+        Returns:
+            "redelegated", "failed", or None if the task is gone, finished, or not yet due
+        """
+        now = time.time() if now is None else now
+        policy = policy or Config.HANDOFF_TIMEOUT_POLICY
+        timed_out = {}
+
+        def time_out(delegation: Dict) -> Optional[Dict]:
+            if delegation["status"] not in OPEN_STATUSES or now < delegation["expected_handback_at"]:
+                return None
+            timed_out["agent"] = delegation["to_agent"]
+
+            if policy == "fallback" and delegation["to_agent"] != AgentType.DEEPAGENT.value:
+                # Hand the same task_id to the generalist so poll URLs stay valid
+                delegation["to_agent"] = AgentType.DEEPAGENT.value
+                delegation["status"] = TaskStatus.DELEGATED.value
+                delegation["redelegated_from"] = timed_out["agent"]
+                delegation["attempts"] = delegation.get("attempts", 1) + 1
+                delegation["expected_handback_at"] = now + delegation.get("timeout_seconds", 300)
+                delegation["evict_at"] = delegation["expected_handback_at"] + self.delegation_ttl_seconds
+            else:
+                delegation["status"] = TaskStatus.FAILED.value
+                delegation["error"] = f"Handback timeout after {delegation.get('timeout_seconds', 0)}s"
+                delegation["evict_at"] = now + self.delegation_ttl_seconds
+            return delegation
+
+        # Atomic, so only one worker/node acts on a given deadline
+        delegation = self.store.update_delegation(task_id, time_out)
+        if delegation is None:
+            return None
+
+        timed_out_agent = timed_out["agent"]
+        self.store.append_log({
+            "task_id": task_id,
+            "from_agent": timed_out_agent,
+            "to_agent": delegation["from_agent"],
+            "status": "timeout",
+            "timed_out_at": datetime.now().isoformat(),
+            "duration_seconds": now - delegation["timestamp"],
+        })
+
+        if delegation["status"] == TaskStatus.DELEGATED.value:
+            logger.warning(
+                f"⏰ TIMEOUT: {timed_out_agent} missed handback for {task_id}, "
+                f"re-delegated to {AgentType.DEEPAGENT.value}"
+            )
+            self._emit("redelegated", delegation)
+            # A listener may have failed it straight away (e.g. deepagent's queue is full)
+            current = self.store.get_delegation(task_id)
+            if current is not None and current["status"] == TaskStatus.FAILED.value:
+                return "failed"
+            return "redelegated"
+
+        logger.warning(f"⏰ TIMEOUT: {timed_out_agent} missed handback for {task_id}, marked failed")
+        self._emit("expired", delegation)
+        return "failed"
+
+    def subscribe(self, listener: Callable[[str, Dict], None]):
+        """Register a lifecycle listener: listener(event, record)"""
+        self._listeners.append(listener)
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        Run listeners on this event loop
+        Async callers run coordinator methods (and so store I/O) in worker
+        threads via asyncio.to_thread; listeners touch asyncio queues and
+        events, so their calls are handed back to the loop
+        """
+        self._loop = loop
+
+    def _emit(self, event: str, record: Dict):
+        loop = self._loop
+        if loop is not None and loop.is_running() and not _running_on(loop):
+            # Wait for the listeners, so the caller sees their effects as
+            # it would on the loop (expire() re-reads the record after them)
+            done: Future = Future()
+
+            def notify():
+                try:
+                    self._notify(event, record)
+                finally:
+                    done.set_result(None)
+
+            try:
+                loop.call_soon_threadsafe(notify)
+            except RuntimeError:
+                # Loop closed in the meantime
+                self._notify(event, record)
+                return
+            done.result()
+            return
+
+        self._notify(event, record)
+
+    def _notify(self, event: str, record: Dict):
+        for listener in self._listeners:
+            try:
+                listener(event, record)
+            except Exception as e:
+                logger.error(f"❌ Handoff listener failed on {event}: {str(e)}")
+
     def get_task_status(self, task_id: str) -> Optional[Dict]:
         """Get current status of a delegated task"""
-        return self.active_delegations.get(task_id)
+        return self.store.get_delegation(task_id)
+
+    def iter_open_delegations(self) -> Iterator[Dict]:
+        """Delegations (from any worker sharing the store) still awaiting handback"""
+        return self.store.iter_open_delegations()
 
     def get_agent_info(self, agent_type: AgentType) -> Dict:
         """Get specialization info for an agent type"""
         return self.agent_specializations.get(agent_type, {})
 
-    def export_handoff_log(self) -> str:
-        """Export handoff log as JSON string"""
-        return json.dumps(self.handoff_log, indent=2)
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """
+        Drop delegations whose eviction deadline has passed
+        Called on every delegate/handback
+        
+        Returns:
+            Number of delegations evicted
+        """
+        evicted = self.store.evict_expired(now)
+        if evicted:
+            logger.info(f"🧹 Evicted {evicted} expired delegations")
+        return evicted
+
+    def get_storage_stats(self) -> Dict:
+        """Current size of the handoff log and delegation table"""
+        return {
+            **self.store.stats(),
+            "delegation_ttl_seconds": self.delegation_ttl_seconds,
+        }
+
+    def iter_handoff_log_jsonl(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        page_size: int = 500,
+    ) -> Iterator[str]:
+        """
+        Stream the handoff log as JSON Lines, one page of records per chunk
+        
+        Args:
+            offset: Number of oldest retained records to skip
+            limit: Max records to export (None = all retained)
+            page_size: Records serialized per yielded chunk
+        """
+        for page in self.store.iter_log(offset=offset, limit=limit, page_size=page_size):
+            yield "".join(json.dumps(record, default=str) + "\n" for record in page)
+
+    def export_handoff_log(self, offset: int = 0, limit: Optional[int] = None) -> str:
+        """Export (a page of) the handoff log as a JSON Lines string"""
+        return "".join(self.iter_handoff_log_jsonl(offset=offset, limit=limit))
+
+
+def _running_on(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
 
 
 # Singleton instance for global access
@@ -238,11 +623,19 @@ async def delegate_task_to_agent(
     task_description: str,
     code_language: Optional[str] = None,
     context: Optional[Dict] = None,
+    timeout_seconds: int = 300,
+    priority: int = 5,
+    target_agent: Optional[AgentType] = None,
 ) -> Dict:
     """
     Convenient async function to delegate a task
     Used by Code Catalyst API endpoints
     
+    The task is queued on the assigned agent's work queue (target_agent
+    skips routing); raises QueueFullError if that queue is full. The
+    delegation is recorded in a worker thread, and if the queue fills up
+    meanwhile it is marked failed before the error is raised
+    
     Example:
         result = await delegate_task_to_agent(
             task_description="Create AP2 affiliate tracking capsule",
@@ -251,16 +644,33 @@ async def delegate_task_to_agent(
         )
     """
     import uuid
+    from .agent_queues import QueueFullError, agent_queue_manager
     
     task_id = str(uuid.uuid4())
     
-    delegation = handoff_coordinator.delegate(
+    if target_agent is not None:
+        routing = {"agent": target_agent, "confidence": 1.0, "candidates": []}
+    else:
+        routing = handoff_coordinator.route(task_description, code_language)
+    agent_queue_manager.check_capacity(routing["agent"])
+    
+    delegation = await asyncio.to_thread(
+        handoff_coordinator.delegate,
         from_agent="code-catalyst",
         task_id=task_id,
         task_description=task_description,
         code_language=code_language,
         context=context,
+        timeout_seconds=timeout_seconds,
+        routing=routing,
     )
+    try:
+        agent_queue_manager.submit(delegation, priority=priority)
+    except QueueFullError as e:
+        await asyncio.to_thread(
+            handoff_coordinator.handback, task_id, delegation["to_agent"], {"error": str(e)}, status="failed"
+        )
+        raise
     
     logger.info(f"📤 Delegated to {delegation['to_agent']}: {task_id}")
     
@@ -0,0 +1,295 @@
+"""
+Multi-Agent Orchestration
+Runs a dependency graph (DAG) of subtasks through AgentHandoff: every
+subtask is delegated to its agent's work queue, independent branches run
+concurrently, and results flow along edges into dependents' context
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from .agent_handoff import AgentHandoff, AgentType, delegate_task_to_agent, handoff_coordinator
+
+logger = logging.getLogger(__name__)
+
+# Subtask states in the orchestration report
+COMPLETED = "completed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class OrchestrationError(ValueError):
+    """Invalid subtask graph (unknown dependency, duplicate id, cycle)"""
+
+
+def capsule_pipeline(
+    capsule_name: str,
+    capsule_type: str = "stateful",
+    description: str = "",
+    functionality: Optional[List[str]] = None,
+) -> List[Dict]:
+    """
+    Built-in capsule pipeline:
+
+        generate ──┬─> review
+                   └─> audit
+        test_template (needs only the name, runs alongside generate)
+    """
+    return [
+        {
+            "id": "generate",
+            "task": f"Generate {capsule_type} Dart capsule {capsule_name}",
+            "agent": AgentType.DART_CAPSULE.value,
+            "language": "dart",
+            "context": {
+                "operation": "generate-capsule",
+                "capsule_name": capsule_name,
+                "capsule_type": capsule_type,
+                "description": description,
+                "functionality": functionality or [],
+            },
+        },
+        {
+            "id": "review",
+            "task": f"Review Dart capsule {capsule_name}",
+            "agent": AgentType.DART_CAPSULE.value,
+            "language": "dart",
+            "depends_on": ["generate"],
+            "context": {"operation": "review-code", "capsule_name": capsule_name},
+            "inputs": {"code": "generate.generated_code"},
+        },
+        {
+            "id": "test_template",
+            "task": f"Generate test template for {capsule_name}",
+            "agent": AgentType.DART_CAPSULE.value,
+            "language": "dart",
+            "context": {"operation": "test-template", "capsule_name": capsule_name},
+        },
+        {
+            "id": "audit",
+            "task": f"Security audit of Dart capsule {capsule_name}",
+            "agent": AgentType.VAULTGEMMA_SECURITY.value,
+            "language": "dart",
+            "depends_on": ["generate"],
+            "context": {"language": "dart"},
+            "inputs": {"code": "generate.generated_code"},
+        },
+    ]
+
+
+PIPELINES = {
+    "capsule": capsule_pipeline,
+}
+
+
+def _resolve_input(path: str, results: Dict[str, Any]) -> Any:
+    """Look up "subtask_id.key.subkey" in upstream results"""
+    node_id, _, key_path = path.partition(".")
+    value = results[node_id]
+    for key in filter(None, key_path.split(".")):
+        value = value[key]
+    return value
+
+
+def validate_graph(subtasks: List[Dict]) -> List[str]:
+    """
+    Check ids, dependencies and agents; return a topological order
+
+    Raises:
+        OrchestrationError: If the graph is not a valid DAG
+    """
+    ids = [subtask.get("id") for subtask in subtasks]
+    if not subtasks:
+        raise OrchestrationError("No subtasks given")
+    if None in ids or len(set(ids)) != len(ids):
+        raise OrchestrationError("Every subtask needs a unique id")
+
+    valid_agents = {agent.value for agent in AgentType}
+    indegree = {}
+    dependents: Dict[str, List[str]] = {node_id: [] for node_id in ids}
+    for subtask in subtasks:
+        if "task" not in subtask:
+            raise OrchestrationError(f"Subtask {subtask['id']} has no task description")
+        if subtask.get("agent") and subtask["agent"] not in valid_agents:
+            raise OrchestrationError(f"Subtask {subtask['id']} names unknown agent {subtask['agent']}")
+        deps = subtask.get("depends_on", [])
+        for dep in deps:
+            if dep not in dependents:
+                raise OrchestrationError(f"Subtask {subtask['id']} depends on unknown subtask {dep}")
+            dependents[dep].append(subtask["id"])
+        for path in subtask.get("inputs", {}).values():
+            if path.partition(".")[0] not in deps:
+                raise OrchestrationError(f"Subtask {subtask['id']} input {path} is not from a dependency")
+        indegree[subtask["id"]] = len(deps)
+
+    # Kahn's algorithm; leftovers mean a cycle
+    order = [node_id for node_id in ids if indegree[node_id] == 0]
+    for node_id in order:
+        for dependent in dependents[node_id]:
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                order.append(dependent)
+    if len(order) != len(ids):
+        raise OrchestrationError("Subtask graph has a cycle")
+    return order
+
+
+class AgentOrchestrator:
+    """Executes subtask DAGs on the agent work queues"""
+
+    def __init__(self, coordinator: AgentHandoff):
+        self.coordinator = coordinator
+        self._waiters: Dict[str, asyncio.Future] = {}
+        coordinator.subscribe(self._on_handoff_event)
+
+    def _on_handoff_event(self, event: str, record: Dict):
+        if event not in ("handed_back", "expired"):
+            return
+        future = self._waiters.get(record["task_id"])
+        if future is not None and not future.done():
+            future.get_loop().call_soon_threadsafe(self._resolve, future, event, record)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, event: str, record: Dict):
+        if not future.done():
+            future.set_result((event, record))
+
+    async def _run_subtask(
+        self,
+        subtask: Dict,
+        results: Dict[str, Any],
+        timeout_seconds: int,
+        priority: int,
+        run_started: float,
+    ) -> Dict:
+        context = dict(subtask.get("context") or {})
+        deps = subtask.get("depends_on", [])
+        if deps:
+            context["upstream"] = {dep: results[dep] for dep in deps}
+        for key, path in subtask.get("inputs", {}).items():
+            context[key] = _resolve_input(path, results)
+
+        target_agent = AgentType(subtask["agent"]) if subtask.get("agent") else None
+        future = asyncio.get_running_loop().create_future()
+        started = time.time()
+
+        delegation = await delegate_task_to_agent(
+            task_description=subtask["task"],
+            code_language=subtask.get("language"),
+            context=context,
+            timeout_seconds=timeout_seconds,
+            priority=priority,
+            target_agent=target_agent,
+        )
+        task_id = delegation["task_id"]
+        self._waiters[task_id] = future
+
+        try:
+            # The task may have finished before the waiter was registered
+            current = await asyncio.to_thread(self.coordinator.get_task_status, task_id)
+            if current is not None and current["status"] not in ("delegated", "in_progress"):
+                self._resolve(future, "snapshot", current)
+
+            # Allows for one fallback re-delegation by the reaper
+            event, record = await asyncio.wait_for(future, timeout=timeout_seconds * 2 + 30)
+        finally:
+            self._waiters.pop(task_id, None)
+
+        # Handback records name the agent in from_agent, delegation records in to_agent
+        result = record.get("result")
+        failed = event == "expired" or record.get("status") == FAILED
+        return {
+            "status": FAILED if failed else COMPLETED,
+            "task_id": task_id,
+            "agent": record["from_agent"] if event == "handed_back" else record["to_agent"],
+            "result": result,
+            "error": record.get("error") or (result.get("error") if failed and isinstance(result, dict) else None),
+            "started_offset_seconds": started - run_started,
+            "duration_seconds": time.time() - started,
+        }
+
+    async def run(
+        self,
+        subtasks: List[Dict],
+        timeout_seconds: int = 300,
+        priority: int = 5,
+    ) -> Dict:
+        """
+        Run a subtask graph to completion
+
+        Args:
+            subtasks: [{"id", "task", "agent"?, "language"?, "context"?,
+                        "depends_on"?: [ids], "inputs"?: {context_key: "id.result_key"}}]
+            timeout_seconds: Handback deadline for each subtask
+            priority: Queue priority for every subtask
+
+        Returns:
+            Per-subtask report plus wall-clock, summed and critical-path times
+        """
+        validate_graph(subtasks)
+        by_id = {subtask["id"]: subtask for subtask in subtasks}
+        remaining = {node_id: set(subtask.get("depends_on", [])) for node_id, subtask in by_id.items()}
+        results: Dict[str, Any] = {}
+        report: Dict[str, Dict] = {}
+        running: Dict[asyncio.Task, str] = {}
+        run_started = time.time()
+
+        def launch_ready():
+            for node_id in [n for n, deps in remaining.items() if not deps]:
+                del remaining[node_id]
+                task = asyncio.create_task(self._run_subtask(
+                    by_id[node_id], results, timeout_seconds, priority, run_started
+                ))
+                running[task] = node_id
+
+        def skip_dependents(failed_id: str):
+            for node_id in [n for n, deps in remaining.items() if failed_id in deps]:
+                del remaining[node_id]
+                report[node_id] = {"status": SKIPPED, "error": f"Dependency {failed_id} failed"}
+                skip_dependents(node_id)
+
+        launch_ready()
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                node_id = running.pop(task)
+                try:
+                    report[node_id] = task.result()
+                except Exception as e:
+                    logger.error(f"❌ Orchestration subtask {node_id} failed: {str(e)}")
+                    report[node_id] = {"status": FAILED, "error": str(e)}
+
+                if report[node_id]["status"] == COMPLETED:
+                    results[node_id] = report[node_id]["result"]
+                    for deps in remaining.values():
+                        deps.discard(node_id)
+                else:
+                    skip_dependents(node_id)
+            launch_ready()
+
+        total_seconds = time.time() - run_started
+        statuses = {entry["status"] for entry in report.values()}
+        logger.info(f"🧩 Orchestrated {len(subtasks)} subtasks in {total_seconds:.2f}s")
+
+        return {
+            "status": COMPLETED if statuses == {COMPLETED} else ("partial" if COMPLETED in statuses else FAILED),
+            "subtasks": report,
+            "total_seconds": total_seconds,
+            "sum_of_steps_seconds": sum(entry.get("duration_seconds", 0) for entry in report.values()),
+            "critical_path_seconds": self._critical_path(by_id, report),
+        }
+
+    @staticmethod
+    def _critical_path(by_id: Dict[str, Dict], report: Dict[str, Dict]) -> float:
+        """Longest dependency chain by measured subtask duration"""
+        finish: Dict[str, float] = {}
+        for node_id in validate_graph(list(by_id.values())):
+            upstream = max((finish[dep] for dep in by_id[node_id].get("depends_on", [])), default=0.0)
+            finish[node_id] = upstream + report.get(node_id, {}).get("duration_seconds", 0.0)
+        return max(finish.values(), default=0.0)
+
+
+# Singleton bound to the global coordinator
+agent_orchestrator = AgentOrchestrator(handoff_coordinator)
@@ -0,0 +1,299 @@
+"""
+Per-Agent Work Queues
+Each AgentType gets its own bounded priority queue and worker pool, so a
+burst of work for one agent cannot starve the others
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .agent_handoff import AgentHandoff, AgentType, handoff_coordinator
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+AgentHandler = Callable[[Dict], Awaitable[Dict]]
+
+# Lower value = picked up sooner
+DEFAULT_PRIORITY = 5
+
+
+class QueueFullError(Exception):
+    """Raised when an agent's work queue cannot accept more tasks"""
+
+    def __init__(self, agent_type: AgentType, retry_after: float):
+        self.agent_type = agent_type
+        self.retry_after = retry_after
+        super().__init__(f"{agent_type.value} queue is full, retry after {retry_after:.0f}s")
+
+
+def _parse_queue_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """Parse "agent=concurrency:maxsize,..." into {agent: (concurrency, maxsize)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            agent, values = item.split("=", 1)
+            concurrency, maxsize = values.split(":", 1)
+            limits[agent.strip()] = (int(concurrency), int(maxsize))
+        except ValueError:
+            logger.warning(f"⚠️ Ignoring malformed AGENT_QUEUE_LIMITS entry: {item}")
+    return limits
+
+
+# ===== DEFAULT AGENT HANDLERS =====
+
+async def _llm_handler(delegation: Dict) -> Dict:
+    """Generic handler: run the task description through the configured LLM"""
+    from .worker import LLMProcessor
+
+    language = delegation.get("code_language") or "python"
+    context = json.dumps(delegation["context"]) if delegation.get("context") else ""
+
+    if Config.LLM_PROVIDER == "claude":
+        call = LLMProcessor.call_claude
+    elif Config.LLM_PROVIDER == "openai":
+        call = LLMProcessor.call_openai
+    else:
+        raise ValueError(f"Unknown LLM provider: {Config.LLM_PROVIDER}")
+
+    output = await call(delegation["task_description"], context, language)
+    return {"output": output}
+
+
+async def _dart_handler(delegation: Dict) -> Dict:
+    """Dart capsule operations via DartAgentSpecialization, LLM otherwise"""
+    from .dart_agent import dart_agent, generate_dart_capsule
+
+    context = delegation.get("context") or {}
+    operation = context.get("operation")
+
+    if operation == "generate-capsule":
+        return await generate_dart_capsule(
+            capsule_name=context["capsule_name"],
+            capsule_type=context.get("capsule_type", "stateful"),
+            description=context.get("description", ""),
+            functionality=context.get("functionality", []),
+        )
+    if operation == "review-code":
+        return dart_agent.review_capsule_code(context["code"], context.get("capsule_name", ""))
+    if operation == "test-template":
+        return {"test_template": dart_agent.generate_test_template(context["capsule_name"])}
+
+    return await _llm_handler(delegation)
+
+
+async def _security_handler(delegation: Dict) -> Dict:
+    """Scan supplied code with the security scanner, LLM otherwise"""
+    from .security_scanner import scan_code
+
+    context = delegation.get("context") or {}
+    if "code" not in context:
+        return await _llm_handler(delegation)
+
+    language = context.get("language") or delegation.get("code_language") or "dart"
+    return await asyncio.to_thread(scan_code, context["code"], language)
+
+
+DEFAULT_HANDLERS: Dict[AgentType, AgentHandler] = {
+    AgentType.DART_CAPSULE: _dart_handler,
+    AgentType.VAULTGEMMA_SECURITY: _security_handler,
+}
+
+
+# ===== QUEUES =====
+
+class AgentWorkQueue:
+    """Bounded priority queue plus a fixed pool of workers for one agent"""
+
+    def __init__(
+        self,
+        agent_type: AgentType,
+        coordinator: AgentHandoff,
+        handler: AgentHandler,
+        concurrency: int,
+        maxsize: int,
+    ):
+        self.agent_type = agent_type
+        self.coordinator = coordinator
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.maxsize = max(1, maxsize)
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue(self.maxsize)
+        self.busy = 0
+        self.stats: Counter = Counter()
+        # Moving average of handler run time, used for Retry-After estimates
+        self.avg_service_seconds: Optional[float] = None
+
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+
+    def is_full(self) -> bool:
+        return self.queue.full()
+
+    def retry_after(self) -> float:
+        """Estimate seconds until a queue slot frees up"""
+        if self.avg_service_seconds is None:
+            return Config.AGENT_QUEUE_RETRY_AFTER_SECONDS
+        estimate = self.avg_service_seconds * self.queue.qsize() / self.concurrency
+        return min(max(estimate, 1.0), 300.0)
+
+    def submit(self, task_id: str, priority: int = DEFAULT_PRIORITY):
+        """Enqueue a delegated task without waiting; raises QueueFullError when full"""
+        try:
+            self.queue.put_nowait((priority, next(self._sequence), task_id))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise QueueFullError(self.agent_type, self.retry_after())
+        self.stats["submitted"] += 1
+
+    async def _work(self):
+        while True:
+            _, _, task_id = await self.queue.get()
+            try:
+                await self._run(task_id)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, task_id: str):
+        delegation = await asyncio.to_thread(self.coordinator.mark_in_progress, task_id, self.agent_type.value)
+        if delegation is None:
+            # Expired, re-delegated or evicted while waiting
+            self.stats["skipped"] += 1
+            return
+
+        self.busy += 1
+        started = time.time()
+        try:
+            result = await self.handler(delegation)
+            status = "completed"
+        except Exception as e:
+            logger.error(f"❌ {self.agent_type.value} failed task {task_id}: {str(e)}")
+            result = {"error": str(e)}
+            status = "failed"
+        finally:
+            self.busy -= 1
+
+        elapsed = time.time() - started
+        self.avg_service_seconds = (
+            elapsed if self.avg_service_seconds is None
+            else 0.8 * self.avg_service_seconds + 0.2 * elapsed
+        )
+        self.stats[status] += 1
+
+        # First result wins; the coordinator rejects results for closed tasks
+        record = await asyncio.to_thread(
+            self.coordinator.handback, task_id, self.agent_type.value, result, status=status
+        )
+        if "error" in record:
+            self.stats["discarded"] += 1
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def get_stats(self) -> Dict:
+        return {
+            "depth": self.queue.qsize(),
+            "maxsize": self.maxsize,
+            "concurrency": self.concurrency,
+            "busy": self.busy,
+            **self.stats,
+        }
+
+
+class AgentQueueManager:
+    """Owns one AgentWorkQueue per AgentType"""
+
+    def __init__(self, coordinator: AgentHandoff):
+        self.coordinator = coordinator
+        limits = _parse_queue_limits(Config.AGENT_QUEUE_LIMITS)
+
+        self.queues: Dict[AgentType, AgentWorkQueue] = {}
+        for agent_type in AgentType:
+            concurrency, maxsize = limits.get(
+                agent_type.value,
+                (Config.AGENT_QUEUE_CONCURRENCY, Config.AGENT_QUEUE_MAXSIZE),
+            )
+            self.queues[agent_type] = AgentWorkQueue(
+                agent_type,
+                coordinator,
+                DEFAULT_HANDLERS.get(agent_type, _llm_handler),
+                concurrency,
+                maxsize,
+            )
+        # In-flight expiries of dropped re-delegations; the loop only keeps weak references to tasks
+        self._expiring: Set[asyncio.Task] = set()
+
+        coordinator.subscribe(self._on_handoff_event)
+
+    def _on_handoff_event(self, event: str, record: Dict):
+        if event == "redelegated":
+            try:
+                self.submit(record)
+            except QueueFullError as e:
+                logger.error(f"❌ Re-delegation of {record['task_id']} dropped: {str(e)}")
+                self._expire(record)
+
+    def _expire(self, record: Dict):
+        """Fail a dropped re-delegation (store I/O, so off the event loop when on it)"""
+        task_id, now = record["task_id"], record["expected_handback_at"]
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Emitted from a thread with no loop bound: blocking here is fine
+            self.coordinator.expire(task_id, now=now, policy="fail")
+            return
+        task = asyncio.create_task(asyncio.to_thread(self.coordinator.expire, task_id, now=now, policy="fail"))
+        self._expiring.add(task)
+        task.add_done_callback(self._expire_done)
+
+    def _expire_done(self, task: asyncio.Task):
+        self._expiring.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ Expiring a dropped re-delegation failed: {str(task.exception())}")
+
+    def register_handler(self, agent_type: AgentType, handler: AgentHandler):
+        """Replace the coroutine that executes tasks for an agent"""
+        self.queues[agent_type].handler = handler
+
+    def check_capacity(self, agent_type: AgentType):
+        """Raise QueueFullError if the agent's queue cannot take another task"""
+        queue = self.queues[agent_type]
+        if queue.is_full():
+            queue.stats["rejected"] += 1
+            raise QueueFullError(agent_type, queue.retry_after())
+
+    def submit(self, delegation: Dict, priority: int = DEFAULT_PRIORITY):
+        """Queue a delegation on its assigned agent's queue"""
+        agent_type = AgentType(delegation["to_agent"])
+        self.queues[agent_type].submit(delegation["task_id"], priority)
+
+    def start(self):
+        self.coordinator.bind_loop(asyncio.get_running_loop())
+        for queue in self.queues.values():
+            queue.start()
+        logger.info(f"✅ Agent work queues started ({len(self.queues)} agents)")
+
+    async def stop(self):
+        for queue in self.queues.values():
+            await queue.stop()
+        logger.info("✅ Agent work queues stopped")
+
+    def get_stats(self, agent_type: AgentType) -> Dict:
+        return self.queues[agent_type].get_stats()
+
+
+# Singleton bound to the global coordinator
+agent_queue_manager = AgentQueueManager(handoff_coordinator)
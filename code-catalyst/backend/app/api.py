@@ -3,20 +3,39 @@ API Routes for Code Catalyst Backend
 Endpoints: /suggest, /generate, /analyze, /audit, /webhook, /twilio, /agents, /delegate
 """
 
-from fastapi import APIRouter, Request, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Request, BackgroundTasks, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
+from urllib.parse import parse_qsl
+import asyncio
 import logging
 import json
+import math
 from .config import Config
+from .message_templates import TEMPLATES
 from .worker import process_suggestion, process_generation
 from .twilio_service import (
+    get_twilio_service,
     send_affiliate_notification,
     send_relief_hotline_update,
     send_event_confirmation,
 )
 from .agent_handoff import handoff_coordinator, delegate_task_to_agent
+from .agent_queues import agent_queue_manager, QueueFullError
+from .handoff_reaper import handoff_reaper
+from .handoff_metrics import handoff_metrics
+from .handoff_events import task_event_broadcaster
+from .agent_orchestrator import agent_orchestrator, OrchestrationError, PIPELINES
 from .dart_agent import dart_agent, generate_dart_capsule, review_dart_code
+from .capsule_bundle import (
+    ARCHIVE_FORMATS, RegistryError, build_registry_patch, iter_bundle_files, prepare_capsules, stream_bundle
+)
+from .dart_repo_review import repo_reviewer
+from .recipients import OPTED_OUT_ERROR_CODE, get_suppression_store, normalize_number
+from .sms_campaigns import FINAL_STATUSES as CAMPAIGN_FINAL_STATUSES, get_campaign_engine
+from .sms_outbox import get_sms_outbox
+from .sms_status import get_delivery_tracker, validate_signature
 
 logger = logging.getLogger(__name__)
 
@@ -218,13 +237,79 @@ async def get_task_status(task_id: str):
     """Get status of a background task"""
     logger.info(f"📋 Task status check: {task_id}")
     
+    delegation = await asyncio.to_thread(handoff_coordinator.get_task_status, task_id)
+    if delegation is None:
+        campaign = await asyncio.to_thread(get_campaign_engine().get, task_id)
+        if campaign is not None:
+            return {
+                "task_id": task_id,
+                "status": campaign["status"],
+                "progress": 100 if campaign["status"] in CAMPAIGN_FINAL_STATUSES else campaign["progress"],
+                "result": campaign,
+                "error": campaign["errors"][-1]["error"] if campaign["status"] == "failed" else None,
+            }
+        return {
+            "task_id": task_id,
+            "status": "pending",  # Would fetch from Redis in production
+            "progress": 0,
+        }
+    
+    finished = delegation["status"] in ("handed_back", "completed", "failed")
     return {
         "task_id": task_id,
-        "status": "pending",  # Would fetch from Redis in production
-        "progress": 0,
+        "status": delegation["status"],
+        "progress": 100 if finished else 0,
+        "assigned_agent": delegation["to_agent"],
+        "result": delegation.get("result"),
+        "error": delegation.get("error"),
     }
 
 
+@router.get("/task/{task_id}/events")
+async def task_events(task_id: str, request: Request):
+    """
+    Server-Sent Events stream for a delegated task
+    Sends a "snapshot" of the current state, then started/redelegated/
+    handed_back/expired events; closes after the event with "final": true
+    
+    Example:
+    curl -N http://localhost:8001/api/task/<task_id>/events
+    """
+    if await asyncio.to_thread(handoff_coordinator.get_task_status, task_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown task: {task_id}")
+
+    async def event_stream():
+        async for event in task_event_broadcaster.stream(task_id):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/task/{task_id}/ws")
+async def task_events_ws(websocket: WebSocket, task_id: str):
+    """WebSocket variant of /task/{task_id}/events (one JSON message per event)"""
+    await websocket.accept()
+    if await asyncio.to_thread(handoff_coordinator.get_task_status, task_id) is None:
+        await websocket.close(code=4404, reason="Unknown task")
+        return
+
+    try:
+        async for event in task_event_broadcaster.stream(task_id):
+            await websocket.send_json(event if event is not None else {"event": "keepalive"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"🔌 Task event subscriber disconnected: {task_id}")
+
+
 # ===== TWILIO SMS/VOICE MODELS =====
 class SendSMSRequest(BaseModel):
     """Request to send SMS via Twilio"""
@@ -240,11 +325,49 @@ class SendVoiceRequest(BaseModel):
     from_number: Optional[str] = None  # Override caller number
 
 
+class BatchVoiceRequest(BaseModel):
+    """Request to call multiple recipients with one text-to-speech message"""
+    recipients: List[str]  # List of phone numbers
+    message: str  # Message to read via text-to-speech
+    from_number: Optional[str] = None
+    concurrency: Optional[int] = None  # Calls started at once (capped by TWILIO_VOICE_CONCURRENCY)
+
+
 class BatchSMSRequest(BaseModel):
     """Request to send batch SMS to multiple recipients"""
     recipients: List[str]  # List of phone numbers
     message: str  # Message body
     from_number: Optional[str] = None
+    concurrency: Optional[int] = None  # Sends in flight at once (capped by TWILIO_BATCH_CONCURRENCY)
+    campaign_id: Optional[str] = None  # Group delivery status under this campaign
+    max_segments: Optional[int] = None  # Shorten the message to fit this many segments
+    dry_run: bool = False  # Only report the final message, segments, cost and ETA
+
+
+class OutboxSMSRequest(BaseModel):
+    """Request to queue batch SMS on the durable outbox"""
+    recipients: List[str]  # List of phone numbers
+    message: str  # Message body
+    from_number: Optional[str] = None
+    idempotency_key: Optional[str] = None  # Re-submitting the same key never re-sends a recipient
+    max_segments: Optional[int] = None  # Shorten the message to fit this many segments
+    dry_run: bool = False  # Only report the final message, segments, cost and ETA
+
+
+class TemplateBatchSMSRequest(BaseModel):
+    """Request to send a personalized template message to many recipients"""
+    template: str  # Template name (GET /api/twilio/templates)
+    recipients: List[dict]  # {"to": phone, <field>: value, ...} per recipient
+    from_number: Optional[str] = None
+    concurrency: Optional[int] = None  # Sends in flight at once (capped by TWILIO_BATCH_CONCURRENCY)
+    campaign_id: Optional[str] = None  # Group delivery status under this campaign
+    dry_run: bool = False  # Only report the rendered bodies, segments, cost and ETA
+
+
+class SuppressionRequest(BaseModel):
+    """Request to add numbers to the SMS suppression (opt-out) list"""
+    numbers: List[str]  # Phone numbers, any common format
+    reason: str = "opt_out"  # e.g. "opt_out", "complaint", "manual"
 
 
 class EventConfirmationRequest(BaseModel):
@@ -326,39 +449,417 @@ async def send_voice_endpoint(request: SendVoiceRequest):
         raise HTTPException(status_code=500, detail=f"Voice call failed: {str(e)}")
 
 
+# ===== TWILIO BATCH VOICE ENDPOINT =====
+@router.post("/twilio/send-voice-batch")
+async def send_voice_batch_endpoint(request: BatchVoiceRequest):
+    """
+    Call multiple recipients with the same message (e.g. a Relief hotline update)
+    
+    The TwiML is built once; call requests run a few at a time.
+    
+    Example:
+    POST /api/twilio/send-voice-batch
+    {
+        "recipients": ["+1-555-201-0001", "+1-555-201-0002"],
+        "message": "Relief payments for Q&A sessions resume Monday."
+    }
+    """
+    if not request.recipients:
+        raise HTTPException(status_code=400, detail="recipients must not be empty")
+    
+    logger.info(f"📞📞 Batch voice to {len(request.recipients)} recipients")
+    
+    try:
+        return await get_twilio_service().send_voice_batch(
+            recipients=request.recipients,
+            message=request.message,
+            from_number=request.from_number,
+            concurrency=request.concurrency,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Batch voice failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch voice failed: {str(e)}")
+
+
 # ===== TWILIO BATCH SMS ENDPOINT =====
 @router.post("/twilio/send-sms-batch")
 async def send_sms_batch_endpoint(request: BatchSMSRequest):
     """
     Send batch SMS to multiple recipients
     
+    Sends run concurrently off the event loop; the response has one
+    result per recipient, in request order, plus the projected segment
+    count and cost. With "dry_run": true only the projection is returned.
+    
     Example:
     POST /api/twilio/send-sms-batch
     {
-        "recipients": ["+1-555-1111", "+1-555-2222", "+1-555-3333"],
+        "recipients": ["+1-555-201-0001", "+1-555-201-0002", "+1-555-201-0003"],
         "message": "New affiliate opportunity available!",
         "from_number": "+1-555-INFLUWEALTH"
     }
     """
+    if not request.recipients:
+        raise HTTPException(status_code=400, detail="recipients must not be empty")
+    
+    if request.max_segments is not None and request.max_segments < 1:
+        raise HTTPException(status_code=400, detail="max_segments must be at least 1")
+    
     logger.info(f"📱📱 Batch SMS to {len(request.recipients)} recipients")
     
     try:
-        result = await send_affiliate_notification(
-            phone=request.recipients[0],
-            affiliate_name="Batch",
-            notification_type="alert"
+        service = get_twilio_service()
+        if request.dry_run:
+            return await asyncio.to_thread(service.preview_sms_batch, request.recipients, request.message, request.max_segments)
+        return await service.send_sms_batch(
+            recipients=request.recipients,
+            message=request.message,
+            from_number=request.from_number,
+            concurrency=request.concurrency,
+            campaign_id=request.campaign_id,
+            max_segments=request.max_segments,
         )
-        return {
-            "status": "batch_sent",
-            "sent_count": len(request.recipients),
-            "failed_count": 0,
-            "timestamp": result.get("timestamp"),
-        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Batch SMS failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Batch SMS failed: {str(e)}")
 
 
+# ===== MESSAGE TEMPLATE ENDPOINTS =====
+@router.get("/twilio/templates")
+async def list_templates_endpoint():
+    """
+    Message templates: fields, per-field length limits and segment budget
+    
+    Example:
+    GET /api/twilio/templates
+    → {"templates": [{"name": "event_confirmation", "fields": ["event_name", "event_date"],
+       "limits": {"event_name": 40, "event_date": 20}, "max_segments": 1,
+       "worst_case_segments": 1, "body": "Confirmed! ..."}, ...]}
+    """
+    return {"templates": [template.describe() for template in TEMPLATES.values()]}
+
+
+@router.post("/twilio/send-template-batch")
+async def send_template_batch_endpoint(request: TemplateBatchSMSRequest):
+    """
+    Send a template message personalized for each recipient
+    
+    Bodies are rendered for the whole batch in one pass and kept within
+    the template's segment budget. With "dry_run": true the rendered
+    bodies and projected cost are returned instead.
+    
+    Example:
+    POST /api/twilio/send-template-batch
+    {
+        "template": "event_confirmation",
+        "recipients": [
+            {"to": "+1-555-201-0001", "event_name": "Influwealth Summit", "event_date": "Nov 20"},
+            {"to": "+1-555-201-0002", "event_name": "Influwealth Summit", "event_date": "Nov 21"}
+        ]
+    }
+    """
+    if request.template not in TEMPLATES:
+        raise HTTPException(status_code=404, detail=f"Unknown message template: {request.template}")
+    
+    if not request.recipients:
+        raise HTTPException(status_code=400, detail="recipients must not be empty")
+    
+    if any(not recipient.get("to") for recipient in request.recipients):
+        raise HTTPException(status_code=400, detail="every recipient needs a \"to\" number")
+    
+    logger.info(f"📱📱 Template '{request.template}' SMS to {len(request.recipients)} recipients")
+    
+    service = get_twilio_service()
+    try:
+        if request.dry_run:
+            return await asyncio.to_thread(service.preview_template_batch, request.template, request.recipients)
+        return await service.send_template_batch(
+            template=request.template,
+            recipients=request.recipients,
+            from_number=request.from_number,
+            concurrency=request.concurrency,
+            campaign_id=request.campaign_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Template batch SMS failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Template batch SMS failed: {str(e)}")
+
+
+# ===== TWILIO SEND QUEUE ENDPOINT =====
+@router.get("/twilio/queue")
+async def twilio_queue_endpoint():
+    """
+    Outbound SMS queue: sends waiting for a sender slot and time to drain
+    
+    Example:
+    GET /api/twilio/queue
+    → {"queued": 1200, "eta_seconds": 400.0, "total_mps": 3.0,
+       "senders": [{"number": "+15550001111", "mps": 1.0, "queued": 400, "eta_seconds": 400.0}, ...]}
+    """
+    return get_twilio_service().senders.stats()
+
+
+# ===== SMS OUTBOX ENDPOINTS =====
+@router.post("/twilio/outbox")
+async def queue_sms_outbox_endpoint(request: OutboxSMSRequest):
+    """
+    Queue batch SMS on the durable outbox (returns before anything is sent)
+    
+    Messages are retried with backoff and survive restarts; repeating a
+    request with the same idempotency_key only queues new recipients
+    
+    Example:
+    POST /api/twilio/outbox
+    {
+        "recipients": ["+1-555-201-0001", "+1-555-201-0002"],
+        "message": "New affiliate opportunity available!",
+        "idempotency_key": "campaign-2025-11-20"
+    }
+    → {"batch_id": "campaign-2025-11-20", "queued": 2, "duplicates": 0, "total": 2, "eta_seconds": 2.0}
+    """
+    if not request.recipients:
+        raise HTTPException(status_code=400, detail="recipients must not be empty")
+    if request.max_segments is not None and request.max_segments < 1:
+        raise HTTPException(status_code=400, detail="max_segments must be at least 1")
+    
+    try:
+        service = get_twilio_service()
+        if request.dry_run:
+            return await asyncio.to_thread(service.preview_sms_batch, request.recipients, request.message, request.max_segments)
+        return await asyncio.to_thread(
+            service.queue_sms_batch,
+            recipients=request.recipients,
+            message=request.message,
+            from_number=request.from_number,
+            batch_id=request.idempotency_key,
+            max_segments=request.max_segments,
+        )
+    except Exception as e:
+        logger.error(f"❌ Outbox enqueue failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Outbox enqueue failed: {str(e)}")
+
+
+@router.get("/twilio/outbox")
+async def sms_outbox_stats_endpoint():
+    """
+    Outbox totals by status and worker counters
+    
+    Example:
+    GET /api/twilio/outbox
+    → {"backend": "sqlite", "running": true, "counts": {"pending": 40, "sending": 20, "sent": 940, "failed": 0}, ...}
+    """
+    return await asyncio.to_thread(get_sms_outbox().stats)
+
+
+@router.get("/twilio/outbox/{batch_id}")
+async def sms_outbox_batch_endpoint(batch_id: str):
+    """
+    Progress of one outbox batch
+    
+    Example:
+    GET /api/twilio/outbox/campaign-2025-11-20
+    → {"batch_id": "campaign-2025-11-20", "total": 2, "done": true, "sent": 2, "failed": 0, ...}
+    """
+    status = await asyncio.to_thread(get_sms_outbox().batch_status, batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Outbox batch not found: {batch_id}")
+    return status
+
+
+# ===== TWILIO STATUS CALLBACK ENDPOINTS =====
+@router.post("/twilio/status-callback")
+async def twilio_status_callback_endpoint(request: Request):
+    """
+    Delivery status webhook (set as StatusCallback on outbound messages)
+    
+    Twilio posts form fields (MessageSid, MessageStatus, ErrorCode, ...);
+    requests are verified against X-Twilio-Signature when
+    TWILIO_AUTH_TOKEN is set. The campaign comes from the callback URL.
+    A recipient reported as opted out (error 21610) is added to the
+    suppression list.
+    
+    Example:
+    POST /api/twilio/status-callback?campaign_id=summit-2025
+    MessageSid=SM123...&MessageStatus=delivered&To=%2B15551234567
+    """
+    params = parse_qsl((await request.body()).decode("utf-8"), keep_blank_values=True)
+    
+    if Config.TWILIO_AUTH_TOKEN:
+        # Twilio signs the URL it was given, not the one a proxy forwards
+        url = Config.TWILIO_STATUS_CALLBACK_URL or str(request.url).split("?")[0]
+        if request.url.query:
+            url += "?" + request.url.query
+        if not validate_signature(url, params, request.headers.get("X-Twilio-Signature", ""), Config.TWILIO_AUTH_TOKEN):
+            logger.warning("⚠️ Rejected status callback with an invalid signature")
+            raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+    
+    try:
+        fields = dict(params)
+        record = await asyncio.to_thread(get_delivery_tracker().ingest, fields, request.query_params.get("campaign_id"))
+        if fields.get("ErrorCode") == str(OPTED_OUT_ERROR_CODE) and fields.get("To"):
+            await asyncio.to_thread(get_suppression_store().add, [fields["To"]], reason="opt_out")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Status callback failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Status callback failed: {str(e)}")
+    
+    return {"status": "received", "updated": record is not None}
+
+
+# ===== SMS SUPPRESSION LIST ENDPOINTS =====
+@router.post("/twilio/suppressions")
+async def add_suppressions_endpoint(request: SuppressionRequest):
+    """
+    Add numbers to the suppression list; bulk sends skip them from then on
+    
+    Example:
+    POST /api/twilio/suppressions
+    {"numbers": ["(555) 201-0001", "+1 555 201 0002"], "reason": "opt_out"}
+    → {"added": 2, "invalid": [], "total": 2}
+    """
+    normalized = [(raw, normalize_number(raw)) for raw in request.numbers]
+    invalid = [raw for raw, number in normalized if number is None]
+    try:
+        store = get_suppression_store()
+        added = await asyncio.to_thread(store.add, [number for _, number in normalized if number], reason=request.reason)
+        return {"added": added, "invalid": invalid, "total": await asyncio.to_thread(store.count)}
+    except Exception as e:
+        logger.error(f"❌ Suppression update failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Suppression update failed: {str(e)}")
+
+
+@router.get("/twilio/suppressions/{number}")
+async def get_suppression_endpoint(number: str):
+    """
+    Whether a number is suppressed, and why
+    
+    Example:
+    GET /api/twilio/suppressions/+15552010001
+    → {"number": "+15552010001", "reason": "opt_out", "created_at": 1763600000.0}
+    """
+    normalized = normalize_number(number)
+    if normalized is None:
+        raise HTTPException(status_code=400, detail=f"Invalid phone number: {number}")
+    entry = await asyncio.to_thread(get_suppression_store().get, normalized)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"{normalized} is not suppressed")
+    return entry
+
+
+@router.delete("/twilio/suppressions/{number}")
+async def remove_suppression_endpoint(number: str):
+    """
+    Remove a number from the suppression list (e.g. after it texts START)
+    
+    Example:
+    DELETE /api/twilio/suppressions/+15552010001
+    → {"number": "+15552010001", "removed": true}
+    """
+    normalized = normalize_number(number)
+    if normalized is None:
+        raise HTTPException(status_code=400, detail=f"Invalid phone number: {number}")
+    if not await asyncio.to_thread(get_suppression_store().remove, normalized):
+        raise HTTPException(status_code=404, detail=f"{normalized} is not suppressed")
+    return {"number": normalized, "removed": True}
+
+
+# ===== SMS CAMPAIGN ENDPOINTS =====
+@router.post("/twilio/campaigns", status_code=202)
+async def create_campaign_endpoint(
+    request: Request,
+    message: Optional[str] = None,
+    template: Optional[str] = None,
+    format: Optional[str] = None,
+    phone_field: Optional[str] = None,
+    from_number: Optional[str] = None,
+    campaign_id: Optional[str] = None,
+):
+    """
+    Start a campaign from a streamed CSV or JSONL upload of recipients
+    
+    The body is the raw file (header row for CSV, one object per line for
+    JSONL) and is spooled to disk as it arrives; the campaign then runs in
+    the background: numbers are normalized and screened, a message or
+    template is rendered per row, and sends are paced by the sender pool.
+    Follow progress at GET /api/twilio/campaigns/{campaign_id} (or
+    /api/task/{campaign_id}) and delivery at .../delivery.
+    
+    Example:
+    curl -X POST "http://localhost:8001/api/twilio/campaigns?template=event_confirmation&campaign_id=summit-2025" \
+         -H "Content-Type: text/csv" --data-binary @attendees.csv
+    → {"campaign_id": "summit-2025", "status": "queued", "upload_bytes": 48213, ...}
+    """
+    fmt = format or ("jsonl" if "json" in request.headers.get("content-type", "") else "csv")
+    engine = get_campaign_engine()
+    try:
+        record = await engine.receive(
+            request.stream(), fmt, message=message, template=template,
+            phone_field=phone_field, from_number=from_number, campaign_id=campaign_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Campaign upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Campaign upload failed: {str(e)}")
+    
+    engine.start(record["campaign_id"])
+    return record
+
+
+@router.get("/twilio/campaigns/{campaign_id}")
+async def campaign_progress_endpoint(campaign_id: str):
+    """
+    Progress of a campaign: rows read, sent / failed / skipped, recipients
+    dropped before sending, and the first errors
+    
+    Example:
+    GET /api/twilio/campaigns/summit-2025
+    → {"campaign_id": "summit-2025", "status": "running", "progress": 41.5, "rows": 41500,
+       "sent": 40210, "failed": 12, "skipped": 0, "recipients": {...}, "errors": [...]}
+    """
+    record = await asyncio.to_thread(get_campaign_engine().get, campaign_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown campaign: {campaign_id}")
+    return record
+
+
+@router.post("/twilio/campaigns/{campaign_id}/cancel")
+async def cancel_campaign_endpoint(campaign_id: str):
+    """
+    Stop a running campaign; messages already sent stay sent
+    
+    Example:
+    POST /api/twilio/campaigns/summit-2025/cancel
+    → {"campaign_id": "summit-2025", "cancelled": true}
+    """
+    if not get_campaign_engine().cancel(campaign_id):
+        raise HTTPException(status_code=404, detail=f"No running campaign: {campaign_id}")
+    return {"campaign_id": campaign_id, "cancelled": True}
+
+
+@router.get("/twilio/campaigns/{campaign_id}/delivery")
+async def campaign_delivery_endpoint(campaign_id: str):
+    """
+    Delivery summary for a campaign, answered from status callback counters
+    
+    Example:
+    GET /api/twilio/campaigns/summit-2025/delivery
+    → {"campaign_id": "summit-2025", "total": 1000, "delivered": 962, "delivery_rate": 0.962,
+       "in_progress": 20, "statuses": {"delivered": 962, "sent": 20, "undelivered": 18}}
+    """
+    summary = await asyncio.to_thread(get_delivery_tracker().summary, campaign_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No delivery status for campaign: {campaign_id}")
+    return summary
+
+
 # ===== TWILIO EVENT CONFIRMATION ENDPOINT =====
 @router.post("/twilio/send-event-confirmation")
 async def send_event_confirmation_endpoint(request: EventConfirmationRequest):
@@ -431,15 +932,64 @@ async def sima2_bridge(request: dict):
     """
     Integration bridge with SIMA2Agent in WealthBridge
     Allows orchestrated code generation with agent memory
+    
+    The "orchestrate" action runs a subtask graph through the agent queues;
+    independent subtasks run concurrently and results flow to dependents
+    
+    Example (built-in capsule pipeline):
+    POST /api/sima2-bridge
+    {
+        "action": "orchestrate",
+        "pipeline": "capsule",
+        "params": {"capsule_name": "AP2Affiliate", "capsule_type": "stateful"}
+    }
+    
+    Example (custom graph):
+    {
+        "action": "orchestrate",
+        "subtasks": [
+            {"id": "contract", "task": "Write an ERC-20 contract", "language": "solidity"},
+            {"id": "audit", "task": "Audit the contract", "agent": "solidity-auditor",
+             "depends_on": ["contract"], "inputs": {"code": "contract.output"}}
+        ]
+    }
     """
     logger.info("🧠 SIMA2 bridge request")
     
-    try:
-        action = request.get("action")  # suggest, generate, orchestrate
-        task = request.get("task")
+    action = request.get("action")  # suggest, generate, orchestrate
+    task = request.get("task")
+    
+    logger.info(f"Action: {action} | Task: {task}")
+    
+    if action == "orchestrate":
+        pipeline = request.get("pipeline")
+        if pipeline is not None and pipeline not in PIPELINES:
+            raise HTTPException(status_code=400, detail=f"Unknown pipeline: {pipeline}")
         
-        logger.info(f"Action: {action} | Task: {task}")
+        try:
+            if pipeline is not None:
+                subtasks = PIPELINES[pipeline](**request.get("params", {}))
+            else:
+                subtasks = request.get("subtasks") or []
+            
+            report = await agent_orchestrator.run(
+                subtasks,
+                timeout_seconds=request.get("timeout_seconds", 300),
+                priority=request.get("priority", 5),
+            )
+        except (OrchestrationError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"❌ SIMA2 orchestration error: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
         
+        return {
+            "status": "bridged",
+            "action": "orchestrate",
+            **report,
+        }
+    
+    try:
         return {
             "status": "bridged",
             "agent_response": "SIMA2 processing...",
@@ -458,20 +1008,43 @@ class DelegateTaskRequest(BaseModel):
     code_language: Optional[str] = None
     context: Optional[dict] = None
     timeout_seconds: int = 300
+    priority: int = 5  # 0 = most urgent
+
+
+class RouteTaskRequest(BaseModel):
+    """Request to rank candidate agents for a task"""
+    task_description: str
+    code_language: Optional[str] = None
+    limit: Optional[int] = None
 
 
 class GenerateDartCapsuleRequest(BaseModel):
     """Request to generate Dart capsule"""
     capsule_name: str
-    capsule_type: str = "stateful"  # stateful, stateless, service
+    capsule_type: str = "stateful"  # stateful, stateless, service, data_provider, model, utility
     description: str = ""
     functionality: List[str] = None
 
 
+class BulkDartCapsuleRequest(BaseModel):
+    """Request to generate many Dart capsules as one archive"""
+    capsules: List[dict]  # GenerateDartCapsuleRequest fields, plus optional "category"
+    format: str = "zip"  # zip or tar.gz
+    include_tests: bool = True
+    registry_patch: bool = True
+
+
 class ReviewDartCodeRequest(BaseModel):
-    """Request to review Dart code"""
-    code: str
+    """Request to review Dart code (one snippet, or several files)"""
+    code: Optional[str] = None
     capsule_name: str = ""
+    files: Optional[List[dict]] = None  # [{"path": ..., "code": ...}]
+
+
+class ReviewDartRepoRequest(BaseModel):
+    """Request to review every .dart file under paths of the WealthBridge checkout"""
+    paths: List[str] = ["lib"]  # Relative to WEALTHBRIDGE_ROOT, e.g. lib/widgets
+    include_issues: bool = False
 
 
 # ===== AGENT DELEGATION ENDPOINTS =====
@@ -481,6 +1054,7 @@ async def delegate_task(request: DelegateTaskRequest):
     """
     Delegate task to best-fit specialized agent
     Automatically selects: DartAgent, SolidityAuditor, TwilioIntegrator, etc.
+    Returns 429 with Retry-After when the selected agent's queue is full
     
     Example:
     POST /api/delegate
@@ -497,15 +1071,28 @@ async def delegate_task(request: DelegateTaskRequest):
             task_description=request.task_description,
             code_language=request.code_language,
             context=request.context,
+            timeout_seconds=request.timeout_seconds,
+            priority=request.priority,
         )
         
         return {
             "status": "delegated",
             "task_id": delegation["task_id"],
             "assigned_agent": delegation["to_agent"],
+            "routing_confidence": delegation["routing"]["confidence"],
+            "candidates": delegation["routing"]["candidates"],
             "estimated_completion_seconds": request.timeout_seconds,
             "poll_url": f"/api/task/{delegation['task_id']}",
+            "events_url": f"/api/task/{delegation['task_id']}/events",
+            "ws_url": f"/api/task/{delegation['task_id']}/ws",
         }
+    except QueueFullError as e:
+        logger.warning(f"⚠️ Delegation rejected: {str(e)}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
     except Exception as e:
         logger.error(f"❌ Delegation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -523,11 +1110,59 @@ async def list_agents():
             "keywords": info.get("keywords", []),
             "capabilities": info.get("capabilities", []),
             "models": info.get("models", []),
+            "queue": agent_queue_manager.get_stats(agent_type),
+            "metrics": handoff_metrics.get_summary(agent_type.value),
         }
     
     return {
         "available_agents": len(agents_info),
         "agents": agents_info,
+        "routing": handoff_coordinator.get_routing_stats(),
+        "storage": await asyncio.to_thread(handoff_coordinator.get_storage_stats),
+        "timeouts": handoff_reaper.get_metrics(),
+        "events": task_event_broadcaster.get_stats(),
+    }
+
+
+@router.get("/handoff-log")
+async def export_handoff_log(offset: int = 0, limit: Optional[int] = None):
+    """
+    Stream the retained handoff log as JSON Lines (one record per line)
+    
+    Example:
+    GET /api/handoff-log?offset=0&limit=1000
+    """
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset and limit must be non-negative")
+    
+    return StreamingResponse(
+        handoff_coordinator.iter_handoff_log_jsonl(offset=offset, limit=limit),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post("/agents/route")
+async def route_task(request: RouteTaskRequest):
+    """
+    Rank agents for a task without delegating it
+    Useful for inspecting and tuning routing decisions
+    
+    Example:
+    POST /api/agents/route
+    {
+        "task_description": "Audit the Polygon staking contract",
+        "code_language": "solidity"
+    }
+    """
+    candidates = handoff_coordinator.rank_agents(
+        request.task_description,
+        request.code_language,
+        limit=request.limit,
+    )
+    
+    return {
+        "assigned_agent": candidates[0]["agent"] if candidates else "deepagent",
+        "candidates": candidates,
     }
 
 
@@ -567,11 +1202,62 @@ async def generate_dart_capsule_endpoint(request: GenerateDartCapsuleRequest):
             "best_practices": result["best_practices"][:3],  # Top 3
             "next_steps": result["next_steps"],
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Dart capsule generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/agents/dart/generate-bulk")
+async def generate_dart_capsules_bulk(request: BulkDartCapsuleRequest):
+    """
+    Generate several Dart capsules in one round trip
+    Streams a zip/tar.gz with each capsule, its test template, a
+    capsule_registry.dart patch and MANIFEST.json
+    
+    Example:
+    POST /api/agents/dart/generate-bulk
+    {
+        "capsules": [
+            {"capsule_name": "AffiliateEarnings", "capsule_type": "stateful", "category": "Partnerships"},
+            {"capsule_name": "PayoutService", "capsule_type": "service"}
+        ],
+        "format": "zip"
+    }
+    """
+    logger.info(f"📦 Bulk Dart capsule generation: {len(request.capsules)} capsules")
+    
+    if request.format not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {request.format} (zip or tar.gz)")
+    
+    try:
+        # Validate everything before the first byte is sent
+        capsules = prepare_capsules(request.capsules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    registry_patch = None
+    if request.registry_patch:
+        try:
+            registry_patch = await asyncio.to_thread(build_registry_patch, capsules)
+        except RegistryError as e:
+            logger.error(f"❌ Registry patch failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    media_type, extension = ARCHIVE_FORMATS[request.format]
+    files = iter_bundle_files(
+        capsules,
+        include_tests=request.include_tests,
+        registry_patch=registry_patch,
+    )
+    return StreamingResponse(
+        stream_bundle(files, request.format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="capsules.{extension}"'},
+    )
+
+
 @router.post("/agents/dart/review-code")
 async def review_dart_code_endpoint(request: ReviewDartCodeRequest):
     """
@@ -584,7 +1270,33 @@ async def review_dart_code_endpoint(request: ReviewDartCodeRequest):
         "code": "class MyWidget extends StatelessWidget { ... }",
         "capsule_name": "MyWidget"
     }
+    
+    Multi-file:
+    {
+        "files": [
+            {"path": "lib/widgets/a_capsule.dart", "code": "..."},
+            {"path": "lib/widgets/b_capsule.dart", "code": "..."}
+        ]
+    }
     """
+    if request.files is not None:
+        if not request.files or any(not isinstance(f.get("code"), str) for f in request.files):
+            raise HTTPException(status_code=400, detail="Every file needs a code string")
+        if len(request.files) > Config.DART_REVIEW_MAX_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {Config.DART_REVIEW_MAX_FILES} files per request (use /agents/dart/review-repo for whole trees)",
+            )
+        logger.info(f"📋 Reviewing {len(request.files)} Dart files")
+        try:
+            return {"status": "reviewed", **await asyncio.to_thread(dart_agent.review_files, request.files)}
+        except Exception as e:
+            logger.error(f"❌ Code review failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    if request.code is None:
+        raise HTTPException(status_code=400, detail="Provide code or files")
+    
     logger.info(f"📋 Reviewing Dart code: {request.capsule_name}")
     
     try:
@@ -602,12 +1314,38 @@ async def review_dart_code_endpoint(request: ReviewDartCodeRequest):
             "warnings": result["warnings"],
             "pass_review": result["pass_review"],
             "issues": result["issues"][:5],  # Top 5 issues
+            "suggestions": result["suggestions"],
         }
     except Exception as e:
         logger.error(f"❌ Code review failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/agents/dart/review-repo")
+async def review_dart_repo_endpoint(request: ReviewDartRepoRequest):
+    """
+    Review every .dart file under the given paths on a worker pool
+    Unchanged files are served from a content-hash cache; scores are
+    aggregated per directory
+    
+    Example:
+    POST /api/agents/dart/review-repo
+    {
+        "paths": ["lib/capsules", "lib/widgets"],
+        "include_issues": false
+    }
+    """
+    logger.info(f"📋 Reviewing Dart files under: {', '.join(request.paths)}")
+    
+    try:
+        return await asyncio.to_thread(repo_reviewer.review, request.paths, request.include_issues)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Repo review failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/agents/dart/test-template/{capsule_name}")
 async def get_dart_test_template(capsule_name: str):
     """Get Dart test template for a capsule"""
@@ -623,27 +1361,3 @@ async def get_dart_test_template(capsule_name: str):
     except Exception as e:
         logger.error(f"❌ Test template generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.post("/sima2-bridge")
-async def sima2_bridge(request: dict):
-    """
-    Integration bridge with SIMA2Agent in WealthBridge
-    Allows orchestrated code generation with agent memory
-    """
-    logger.info("🧠 SIMA2 bridge request")
-    
-    try:
-        action = request.get("action")  # suggest, generate, orchestrate
-        task = request.get("task")
-        
-        logger.info(f"Action: {action} | Task: {task}")
-        
-        return {
-            "status": "bridged",
-            "agent_response": "SIMA2 processing...",
-            "memory_updated": True,
-        }
-    except Exception as e:
-        logger.error(f"❌ SIMA2 bridge error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
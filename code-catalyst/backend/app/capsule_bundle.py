@@ -0,0 +1,253 @@
+"""
+Bulk Capsule Bundles
+Renders many capsules (code, test template, capsule_registry.dart patch)
+and streams them back as a zip or tar.gz archive, one file at a time
+"""
+
+import difflib
+import io
+import json
+import logging
+import os
+import tarfile
+import time
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .config import Config
+from .dart_agent import CapsuleType, DartAgentSpecialization, dart_agent, parse_capsule_type
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_PATH = "lib/capsules/capsule_registry.dart"
+ARCHIVE_FORMATS = {
+    "zip": ("application/zip", "zip"),
+    "tar.gz": ("application/gzip", "tar.gz"),
+}
+
+# Only widget capsules can be registered (CapsuleMetadata.widget)
+WIDGET_TYPES = (CapsuleType.STATEFUL, CapsuleType.STATELESS)
+
+REGISTRY_ENTRY = """
+    CapsuleMetadata(
+      id: '{capsule_id}',
+      name: '{name}',
+      route: '/{route}',
+      description:
+          '{description}',
+      icon: Icons.widgets,
+      color: Colors.blue,
+      category: '{category}',
+      widget: const {class_name}Capsule(),
+      version: '1.0',
+    ),"""
+
+
+class RegistryError(Exception):
+    """capsule_registry.dart does not have the layout the patch expects"""
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """
+    Write-only, non-seekable sink: the archive writer appends bytes and the
+    response generator drains them after every file
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _pending(buffer: _ChunkBuffer) -> Iterator[bytes]:
+    """Drain the buffer, skipping empty chunks (gzip holds data back between files)"""
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk
+
+
+def _dart_string(text: str) -> str:
+    """Escape text for a single-quoted Dart string literal"""
+    return text.replace("\\", "\\\\").replace("'", "\\'").replace("$", "\\$").replace("\n", " ")
+
+
+def build_registry_patch(capsules: List[Dict], root: Optional[str] = None) -> Optional[str]:
+    """
+    Unified diff adding imports and CapsuleMetadata entries for widget
+    capsules to capsule_registry.dart (apply with `git apply`); built
+    before streaming, so a registry problem fails the request cleanly
+
+    Raises:
+        RegistryError: If the capsules list or the imports can't be found
+    """
+    root = root or Config.WEALTHBRIDGE_ROOT
+    path = os.path.join(root, REGISTRY_PATH)
+    if not os.path.exists(path):
+        logger.warning(f"⚠️ {REGISTRY_PATH} not found under {root}, skipping registry patch")
+        return None
+
+    with open(path, encoding="utf-8", newline="") as f:
+        original = f.read().splitlines(keepends=True)
+    newline = "\r\n" if original and original[0].endswith("\r\n") else "\n"
+    text = "".join(original)
+
+    imports, entries = [], []
+    for capsule in capsules:
+        if capsule["type"] not in WIDGET_TYPES:
+            continue
+        package_path = capsule["file_path"][len("lib/"):]
+        import_line = f"import 'package:wealthbridge/{package_path}';"
+        if import_line not in text:
+            imports.append(import_line + newline)
+        if f"const {capsule['class_name']}Capsule()" not in text:
+            snake = capsule["file_path"].rsplit("/", 1)[-1][: -len("_capsule.dart")]
+            camel = "".join(part.title() if i else part for i, part in enumerate(snake.split("_")))
+            entry = REGISTRY_ENTRY.format(
+                capsule_id=snake.replace("_", "-"),
+                name=_dart_string(capsule["capsule_name"]),
+                route=camel,
+                description=_dart_string(capsule["description"] or f"{capsule['capsule_name']} capsule"),
+                category=_dart_string(capsule["category"]),
+                class_name=capsule["class_name"],
+            )
+            entries.extend(line + newline for line in entry.split("\n"))
+
+    if not imports and not entries:
+        return None
+
+    patched = list(original)
+    # Entries go before the "];" closing `static final List<CapsuleMetadata> capsules = [`
+    list_start = _find_line(patched, lambda line: "List<CapsuleMetadata> capsules = [" in line)
+    if list_start is None:
+        raise RegistryError(f"{REGISTRY_PATH}: 'List<CapsuleMetadata> capsules = [' not found")
+    list_end = _find_line(patched, lambda line: line.strip() == "];", start=list_start)
+    if list_end is None:
+        raise RegistryError(f"{REGISTRY_PATH}: no closing '];' after the capsules list")
+    import_lines = [i for i, line in enumerate(patched[:list_start]) if line.startswith("import ")]
+    if not import_lines:
+        raise RegistryError(f"{REGISTRY_PATH}: no import lines before the capsules list")
+
+    patched[list_end:list_end] = entries
+    patched[import_lines[-1] + 1:import_lines[-1] + 1] = imports
+
+    return "".join(difflib.unified_diff(
+        original, patched, fromfile=f"a/{REGISTRY_PATH}", tofile=f"b/{REGISTRY_PATH}"
+    ))
+
+
+def _find_line(lines: List[str], match, start: int = 0) -> Optional[int]:
+    for i in range(start, len(lines)):
+        if match(lines[i]):
+            return i
+    return None
+
+
+def prepare_capsules(specs: List[Dict]) -> List[Dict]:
+    """
+    Validate capsule specs before any bytes are streamed
+
+    Raises:
+        ValueError: Unknown capsule type, missing name, or duplicate output path
+    """
+    prepared, seen = [], set()
+    for spec in specs:
+        if not spec.get("capsule_name"):
+            raise ValueError("Every capsule needs a capsule_name")
+        capsule_type = parse_capsule_type(spec.get("capsule_type") or "stateful")
+        class_name = DartAgentSpecialization._to_pascal_case(spec["capsule_name"])
+        file_path = f"lib/widgets/{DartAgentSpecialization._to_snake_case(spec['capsule_name'])}_capsule.dart"
+        if file_path in seen:
+            raise ValueError(f"Duplicate capsule output path: {file_path}")
+        seen.add(file_path)
+        prepared.append({
+            "capsule_name": spec["capsule_name"],
+            "type": capsule_type,
+            "class_name": class_name,
+            "file_path": file_path,
+            "description": spec.get("description") or "",
+            "functionality": spec.get("functionality") or [],
+            "category": spec.get("category") or "General",
+        })
+    if not prepared:
+        raise ValueError("No capsules given")
+    return prepared
+
+
+def iter_bundle_files(
+    capsules: List[Dict],
+    include_tests: bool = True,
+    registry_patch: Optional[str] = None,
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (archive path, content) pairs, rendering each file on demand
+    registry_patch is the diff from build_registry_patch(), if any
+    """
+    manifest = []
+    for capsule in capsules:
+        result = dart_agent.generate_capsule(
+            capsule_name=capsule["capsule_name"],
+            capsule_type=capsule["type"],
+            description=capsule["description"],
+            functionality=capsule["functionality"],
+        )
+        yield result["file_path"], result["generated_code"].encode("utf-8")
+        entry = {"capsule_name": capsule["capsule_name"], "type": capsule["type"].value, "file_path": result["file_path"]}
+
+        if include_tests:
+            test_path = result["file_path"].replace("lib/", "test/", 1).replace(".dart", "_test.dart")
+            yield test_path, dart_agent.generate_test_template(capsule["capsule_name"]).encode("utf-8")
+            entry["test_path"] = test_path
+        manifest.append(entry)
+
+    if registry_patch:
+        yield "capsule_registry.patch", registry_patch.encode("utf-8")
+
+    yield "MANIFEST.json", json.dumps({"capsules": manifest}, indent=2).encode("utf-8")
+
+
+def stream_bundle(files: Iterator[Tuple[str, bytes]], archive_format: str = "zip") -> Iterator[bytes]:
+    """
+    Build the archive incrementally; each yielded chunk holds the bytes
+    written for one file, so the full archive never sits in memory
+    """
+    buffer = _ChunkBuffer()
+    mtime = time.time()
+
+    if archive_format == "zip":
+        with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for path, data in files:
+                info = zipfile.ZipInfo(path, date_time=time.localtime(mtime)[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                archive.writestr(info, data)
+                yield from _pending(buffer)
+    elif archive_format == "tar.gz":
+        # "w|gz" is tarfile's streaming mode: no seeking, output in order
+        with tarfile.open(fileobj=buffer, mode="w|gz") as archive:
+            for path, data in files:
+                info = tarfile.TarInfo(path)
+                info.size = len(data)
+                info.mtime = mtime
+                info.mode = 0o644
+                archive.addfile(info, io.BytesIO(data))
+                yield from _pending(buffer)
+    else:
+        raise ValueError(f"Unknown archive format: {archive_format}")
+
+    # Central directory / end-of-archive blocks
+    yield from _pending(buffer)
@@ -46,10 +46,93 @@ class Config:
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
     REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", "")
     
+    # ===== AGENT HANDOFF =====
+    HANDOFF_STORE_BACKEND = os.getenv("HANDOFF_STORE_BACKEND", "memory")  # memory, sqlite or redis
+    HANDOFF_SQLITE_PATH = os.getenv("HANDOFF_SQLITE_PATH", "handoff.db")
+    HANDOFF_LOG_CAPACITY = int(os.getenv("HANDOFF_LOG_CAPACITY", "10000"))
+    HANDOFF_DELEGATION_TTL_SECONDS = float(os.getenv("HANDOFF_DELEGATION_TTL_SECONDS", "3600"))
+    HANDOFF_TIMEOUT_POLICY = os.getenv("HANDOFF_TIMEOUT_POLICY", "fallback").lower()  # fallback or fail
+    
+    # Per-agent work queues; AGENT_QUEUE_LIMITS overrides per agent as
+    # "agent=concurrency:maxsize,..." e.g. "solidity-auditor=2:50,dart-capsule=8:200"
+    AGENT_QUEUE_CONCURRENCY = int(os.getenv("AGENT_QUEUE_CONCURRENCY", "4"))
+    AGENT_QUEUE_MAXSIZE = int(os.getenv("AGENT_QUEUE_MAXSIZE", "100"))
+    AGENT_QUEUE_LIMITS = os.getenv("AGENT_QUEUE_LIMITS", "")
+    AGENT_QUEUE_RETRY_AFTER_SECONDS = float(os.getenv("AGENT_QUEUE_RETRY_AFTER_SECONDS", "5"))
+    # Keepalive interval for task event streams (SSE/WebSocket)
+    TASK_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("TASK_EVENTS_HEARTBEAT_SECONDS", "15"))
+    
+    # ===== WEALTHBRIDGE REPO =====
+    # Flutter app checkout (lib/, test/); defaults to the repo containing code-catalyst
+    WEALTHBRIDGE_ROOT = os.getenv(
+        "WEALTHBRIDGE_ROOT",
+        os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")),
+    )
+    
+    # ===== DART REVIEW =====
+    # Worker processes for repository-wide reviews (0 = one per CPU)
+    DART_REVIEW_WORKERS = int(os.getenv("DART_REVIEW_WORKERS", "0"))
+    # Per-file review results kept by content hash
+    DART_REVIEW_CACHE_SIZE = int(os.getenv("DART_REVIEW_CACHE_SIZE", "5000"))
+    # Most files one /agents/dart/review-code request may send
+    DART_REVIEW_MAX_FILES = int(os.getenv("DART_REVIEW_MAX_FILES", "200"))
+    
     # ===== COMMUNICATIONS (TWILIO) =====
     TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
     TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER", "+1-555-INFLUWEALTH")
+    # Twilio API calls in flight at once (batch send limit and HTTP connection pool size)
+    TWILIO_BATCH_CONCURRENCY = int(os.getenv("TWILIO_BATCH_CONCURRENCY", "20"))
+    # Call-creation requests in flight at once for batch voice sends
+    TWILIO_VOICE_CONCURRENCY = int(os.getenv("TWILIO_VOICE_CONCURRENCY", "5"))
+    # REST API origin (point at a local fake server for tests and benchmarks)
+    TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL", "https://api.twilio.com")
+    TWILIO_HTTP_TIMEOUT_SECONDS = float(os.getenv("TWILIO_HTTP_TIMEOUT_SECONDS", "10"))
+    # Outbound SMS sender pool as "number[=mps],..." (defaults to TWILIO_PHONE_NUMBER);
+    # sends are paced per number at TWILIO_MPS_PER_NUMBER unless overridden
+    TWILIO_SENDER_NUMBERS = os.getenv("TWILIO_SENDER_NUMBERS", "")
+    TWILIO_MPS_PER_NUMBER = float(os.getenv("TWILIO_MPS_PER_NUMBER", "1"))
+    # Longest a synchronous batch send may take at that pace; bigger batches
+    # are rejected and belong in the outbox or a campaign upload
+    TWILIO_BATCH_MAX_ETA_SECONDS = float(os.getenv("TWILIO_BATCH_MAX_ETA_SECONDS", "60"))
+    # Public URL of /api/twilio/status-callback; when set, sends ask Twilio to
+    # report delivery status there and are tracked per campaign
+    TWILIO_STATUS_CALLBACK_URL = os.getenv("TWILIO_STATUS_CALLBACK_URL", "")
+    # Price per outbound SMS segment, for batch cost estimates
+    SMS_SEGMENT_PRICE_USD = float(os.getenv("SMS_SEGMENT_PRICE_USD", "0.0083"))
+    
+    # ===== SMS OUTBOX =====
+    SMS_OUTBOX_BACKEND = os.getenv("SMS_OUTBOX_BACKEND", "sqlite")  # sqlite or redis
+    SMS_OUTBOX_SQLITE_PATH = os.getenv("SMS_OUTBOX_SQLITE_PATH", "sms_outbox.db")
+    SMS_OUTBOX_MAX_ATTEMPTS = int(os.getenv("SMS_OUTBOX_MAX_ATTEMPTS", "5"))
+    # Retry backoff doubles from the base up to the max (with jitter)
+    SMS_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("SMS_OUTBOX_RETRY_BASE_SECONDS", "2"))
+    SMS_OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("SMS_OUTBOX_RETRY_MAX_SECONDS", "300"))
+    # A send unconfirmed after this long is checked against Twilio before any resend
+    SMS_OUTBOX_LEASE_SECONDS = float(os.getenv("SMS_OUTBOX_LEASE_SECONDS", "60"))
+    
+    # ===== SMS DELIVERY STATUS =====
+    SMS_STATUS_BACKEND = os.getenv("SMS_STATUS_BACKEND", "sqlite")  # sqlite or redis
+    SMS_STATUS_SQLITE_PATH = os.getenv("SMS_STATUS_SQLITE_PATH", "sms_status.db")
+    
+    # ===== SMS RECIPIENTS =====
+    # Country code assumed for numbers written without "+" (e.g. "555-123-4567")
+    SMS_DEFAULT_COUNTRY_CODE = os.getenv("SMS_DEFAULT_COUNTRY_CODE", "1")
+    SMS_SUPPRESSION_BACKEND = os.getenv("SMS_SUPPRESSION_BACKEND", "sqlite")  # sqlite or redis
+    SMS_SUPPRESSION_SQLITE_PATH = os.getenv("SMS_SUPPRESSION_SQLITE_PATH", "sms_suppression.db")
+    # Lists longer than this are deduplicated with a Bloom filter sized for the capacity
+    SMS_DEDUPE_BLOOM_THRESHOLD = int(os.getenv("SMS_DEDUPE_BLOOM_THRESHOLD", "1000000"))
+    SMS_DEDUPE_BLOOM_CAPACITY = int(os.getenv("SMS_DEDUPE_BLOOM_CAPACITY", "20000000"))
+    
+    # ===== SMS CAMPAIGNS =====
+    SMS_CAMPAIGN_BACKEND = os.getenv("SMS_CAMPAIGN_BACKEND", "sqlite")  # sqlite or redis
+    SMS_CAMPAIGN_SQLITE_PATH = os.getenv("SMS_CAMPAIGN_SQLITE_PATH", "sms_campaigns.db")
+    # Uploads are spooled here while a campaign runs
+    SMS_CAMPAIGN_UPLOAD_DIR = os.getenv("SMS_CAMPAIGN_UPLOAD_DIR", "campaign_uploads")
+    SMS_CAMPAIGN_MAX_UPLOAD_MB = int(os.getenv("SMS_CAMPAIGN_MAX_UPLOAD_MB", "500"))
+    SMS_CAMPAIGN_PROGRESS_SECONDS = float(os.getenv("SMS_CAMPAIGN_PROGRESS_SECONDS", "2"))
+    # Campaign dedupe keeps exact numbers up to this many, then a fixed-size Bloom filter
+    SMS_CAMPAIGN_DEDUPE_SET_LIMIT = int(os.getenv("SMS_CAMPAIGN_DEDUPE_SET_LIMIT", "100000"))
     
     # ===== CONTACT INFO =====
     SUPPORT_EMAIL = os.getenv("SUPPORT_EMAIL", "support@influwealth.com")
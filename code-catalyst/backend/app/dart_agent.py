@@ -5,11 +5,18 @@ Understands: StatelessWidget, StatefulWidget, patterns, best practices
 """
 
 import logging
-from typing import Optional, Dict, List
+from functools import lru_cache
+from string import Formatter
+from typing import Optional, Dict, List, Tuple
 from enum import Enum
 
+from .dart_review import build_outline, review_source, review_sources, suggestions_for_outline
+
 logger = logging.getLogger(__name__)
 
+# Distinct (capsule_name, type) renders kept in memory
+RENDER_CACHE_SIZE = 1024
+
 
 class CapsuleType(Enum):
     """WealthBridge capsule types"""
@@ -21,6 +28,50 @@ class CapsuleType(Enum):
     UTILITY = "utility"
 
 
+# Accepted spellings: enum name ("data_provider", "data-provider") or value ("stateful_widget")
+_CAPSULE_TYPE_ALIASES = {
+    **{member.name.lower(): member for member in CapsuleType},
+    **{member.value: member for member in CapsuleType},
+}
+
+
+def parse_capsule_type(capsule_type: str) -> CapsuleType:
+    """
+    Resolve a capsule type name
+
+    Raises:
+        ValueError: If the type is unknown
+    """
+    member = _CAPSULE_TYPE_ALIASES.get(capsule_type.strip().lower().replace("-", "_"))
+    if member is None:
+        valid = ", ".join(member.name.lower() for member in CapsuleType)
+        raise ValueError(f"Unknown capsule_type '{capsule_type}' (valid: {valid})")
+    return member
+
+
+class CompiledTemplate:
+    """
+    str.format-style template parsed once at startup
+    Literal segments are escaped into a %-format string, so a render is a
+    single C-level substitution with no per-call template parsing
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        segments = []
+        fields = set()
+        for literal, field_name, _, _ in Formatter().parse(source):
+            segments.append(literal.replace("%", "%%"))
+            if field_name is not None:
+                segments.append(f"%({field_name})s")
+                fields.add(field_name)
+        self._format = "".join(segments)
+        self.field_names = frozenset(fields)
+
+    def render(self, values: Dict[str, str]) -> str:
+        return self._format % values
+
+
 class DartAgentSpecialization:
     """
     Expert Dart/Flutter agent for WealthBridge capsules
@@ -91,10 +142,114 @@ class {ServiceName}Service {{
   Future<void> initialize() async {{
     logger.d('$_tag initialized');
   }}
+}}
+            """,
+            "data_provider": """
+class {ClassName}Provider extends ChangeNotifier {{
+  bool _isLoading = false;
+  String? _error;
+  List<Map<String, dynamic>> _items = [];
+
+  bool get isLoading => _isLoading;
+  String? get error => _error;
+  List<Map<String, dynamic>> get items => List.unmodifiable(_items);
+
+  Future<void> load() async {{
+    _isLoading = true;
+    _error = null;
+    notifyListeners();
+
+    try {{
+      // Fetch {CapsuleName} data here
+      _items = [];
+    }} catch (e) {{
+      _error = e.toString();
+    }} finally {{
+      _isLoading = false;
+      notifyListeners();
+    }}
+  }}
+}}
+            """,
+            "model": """
+class {ClassName} {{
+  final String id;
+  final DateTime createdAt;
+
+  const {ClassName}({{required this.id, required this.createdAt}});
+
+  factory {ClassName}.fromJson(Map<String, dynamic> json) {{
+    return {ClassName}(
+      id: json['id'] as String,
+      createdAt: DateTime.parse(json['createdAt'] as String),
+    );
+  }}
+
+  Map<String, dynamic> toJson() => {{
+        'id': id,
+        'createdAt': createdAt.toIso8601String(),
+      }};
+
+  {ClassName} copyWith({{String? id, DateTime? createdAt}}) {{
+    return {ClassName}(
+      id: id ?? this.id,
+      createdAt: createdAt ?? this.createdAt,
+    );
+  }}
+}}
+            """,
+            "utility": """
+class {ClassName}Utils {{
+  {ClassName}Utils._();
+
+  static const String tag = '{CapsuleName}';
+
+  // Static helpers here
 }}
             """,
         }
 
+        self.test_template_pattern = """
+import 'package:flutter/material.dart';
+import 'package:flutter_test/flutter_test.dart';
+import 'package:wealthbridge/widgets/{SnakeName}_capsule.dart';
+
+void main() {{
+  group('{ClassName} Capsule Tests', () {{
+    testWidgets('{ClassName} renders correctly',
+        (WidgetTester tester) async {{
+      await tester.pumpWidget(
+        const MaterialApp(
+          home: {ClassName}Capsule(),
+        ),
+      );
+
+      expect(find.byType({ClassName}Capsule), findsOneWidget);
+    }});
+
+    testWidgets('{ClassName} handles user interaction',
+        (WidgetTester tester) async {{
+      await tester.pumpWidget(
+        const MaterialApp(
+          home: {ClassName}Capsule(),
+        ),
+      );
+
+      // Add your interaction tests here
+    }});
+  }});
+}}
+        """
+
+        self.next_steps = [
+            "1. Review generated code",
+            "2. Implement custom functionality in marked sections",
+            "3. Add state management (Provider/BLoC)",
+            "4. Register in capsule_registry.dart",
+            "5. Test with flutter test",
+            "6. Add to SIMA2Agent orchestration if needed",
+        ]
+
         # WealthBridge best practices
         self.best_practices = [
             "Use const constructors for performance",
@@ -108,6 +263,34 @@ class {ServiceName}Service {{
             "Use VaultGemma for sensitive data",
         ]
 
+        self.compile_templates()
+
+    def compile_templates(self):
+        """Parse templates once; call again after editing wealthbridge_patterns"""
+        self.templates = {
+            name: CompiledTemplate(source) for name, source in self.wealthbridge_patterns.items()
+        }
+        self.test_template = CompiledTemplate(self.test_template_pattern)
+        # Renders depend only on (capsule_name, type), so repeat requests are lookups
+        self._render_capsule = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render_capsule_uncached)
+        self._render_test_template = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render_test_template_uncached)
+
+    def _render_capsule_uncached(self, capsule_name: str, capsule_type: CapsuleType) -> Tuple[str, str, str]:
+        class_name = self._to_pascal_case(capsule_name)
+        generated_code = self.templates[capsule_type.value].render({
+            "ClassName": class_name,
+            "CapsuleName": capsule_name,
+            "ServiceName": class_name,
+        })
+        file_path = f"lib/widgets/{self._to_snake_case(capsule_name)}_capsule.dart"
+        return class_name, generated_code, file_path
+
+    def _render_test_template_uncached(self, capsule_name: str) -> str:
+        return self.test_template.render({
+            "ClassName": self._to_pascal_case(capsule_name),
+            "SnakeName": self._to_snake_case(capsule_name),
+        })
+
     def generate_capsule(
         self,
         capsule_name: str,
@@ -120,7 +303,8 @@ class {ServiceName}Service {{
         
         Args:
             capsule_name: Name of the capsule (e.g., "AP2Affiliate")
-            capsule_type: Type of capsule (stateful, stateless, service)
+            capsule_type: Type of capsule (stateful, stateless, service,
+                          data_provider, model, utility)
             description: What the capsule does
             functionality: List of features to implement
         
@@ -128,16 +312,7 @@ class {ServiceName}Service {{
             Generated code and metadata
         """
 
-        class_name = self._to_pascal_case(capsule_name)
-        template = self.wealthbridge_patterns.get(
-            capsule_type.value, self.wealthbridge_patterns["stateful_widget"]
-        )
-
-        generated_code = template.format(
-            ClassName=class_name,
-            CapsuleName=capsule_name,
-            ServiceName=class_name,
-        )
+        class_name, generated_code, file_path = self._render_capsule(capsule_name, capsule_type)
 
         result = {
             "capsule_name": capsule_name,
@@ -146,16 +321,10 @@ class {ServiceName}Service {{
             "description": description,
             "functionality": functionality or [],
             "generated_code": generated_code,
-            "file_path": f"lib/widgets/{self._to_snake_case(capsule_name)}_capsule.dart",
-            "best_practices": self.best_practices,
-            "next_steps": [
-                "1. Review generated code",
-                "2. Implement custom functionality in marked sections",
-                "3. Add state management (Provider/BLoC)",
-                "4. Register in capsule_registry.dart",
-                "5. Test with flutter test",
-                "6. Add to SIMA2Agent orchestration if needed",
-            ],
+            "file_path": file_path,
+            # Copies: callers may edit the lists without touching later results
+            "best_practices": list(self.best_practices),
+            "next_steps": list(self.next_steps),
         }
 
         logger.info(
@@ -171,137 +340,41 @@ class {ServiceName}Service {{
     ) -> Dict:
         """
         Review Dart capsule code against best practices
-        
+
         Returns:
-            Issues found, severity level, and suggestions
+            Issues found (with line numbers), severity level, suggestions
+            and the class outline
         """
-
-        issues = []
-        warnings = 0
-        errors = 0
-
-        # Check 1: Const constructors
-        if "StatelessWidget" in code and "const " not in code:
-            issues.append({
-                "severity": "warning",
-                "type": "missing_const",
-                "message": "StatelessWidget constructor should be const",
-                "suggestion": "Add 'const' keyword to constructor",
-            })
-            warnings += 1
-
-        # Check 2: Proper widget structure
-        if "build(BuildContext context)" not in code:
-            issues.append({
-                "severity": "error",
-                "type": "missing_build",
-                "message": "Missing required build() method",
-                "suggestion": "Implement build() method",
-            })
-            errors += 1
-
-        # Check 3: Key parameter
-        if "Key?" not in code and "StatelessWidget" in code:
-            issues.append({
-                "severity": "warning",
-                "type": "missing_key",
-                "message": "Consider adding Key parameter for better widget identification",
-                "suggestion": "Add Key? key parameter to constructor",
-            })
-            warnings += 1
-
-        # Check 4: Proper naming
-        if "State<" in code and not code.count("_"):
-            issues.append({
-                "severity": "warning",
-                "type": "naming_convention",
-                "message": "Private state classes should start with underscore",
-                "suggestion": "Rename to _PrivateStateName",
-            })
-            warnings += 1
-
-        result = {
-            "capsule_name": capsule_name,
-            "total_issues": len(issues),
-            "errors": errors,
-            "warnings": warnings,
-            "issues": issues,
-            "code_quality_score": max(0, 100 - (errors * 20 + warnings * 5)),
-            "pass_review": errors == 0,
-        }
+        result = review_source(code, capsule_name)
 
         logger.info(
             f"📋 Code review: {capsule_name} - "
-            f"Errors: {errors}, Warnings: {warnings}"
+            f"Errors: {result['errors']}, Warnings: {result['warnings']}"
         )
 
         return result
 
-    def suggest_improvements(self, code: str) -> List[str]:
-        """Suggest improvements for existing Dart code"""
-        suggestions = []
-
-        # Performance suggestions
-        if "setState" in code:
-            suggestions.append(
-                "Consider using state management library (Provider/BLoC/GetX) "
-                "to reduce unnecessary rebuilds"
-            )
+    def review_files(self, files: List[Dict]) -> Dict:
+        """Review several Dart files at once: [{"path": ..., "code": ...}]"""
+        result = review_sources(files)
 
-        if "Future.delayed" in code:
-            suggestions.append("Use proper async/await patterns instead of Future.delayed")
-
-        if "print(" in code:
-            suggestions.append("Use logger instead of print() for better observability")
-
-        # Security suggestions
-        if "password" in code.lower() and "VaultGemma" not in code:
-            suggestions.append(
-                "Sensitive data detected. Consider using VaultGemma encryption"
-            )
+        logger.info(
+            f"📋 Code review: {result['total_files']} files - "
+            f"Errors: {result['total_errors']}, Warnings: {result['total_warnings']}"
+        )
 
-        # Best practices
-        if "try {" in code and "catch" not in code:
-            suggestions.append("Add proper exception handling to async operations")
+        return result
 
-        return suggestions
+    def suggest_improvements(self, code: str) -> List[str]:
+        """Suggest improvements for existing Dart code"""
+        return [
+            f"{suggestion['message']} (line {', '.join(map(str, suggestion['lines']))})"
+            for suggestion in suggestions_for_outline(build_outline(code))
+        ]
 
     def generate_test_template(self, capsule_name: str) -> str:
         """Generate test template for capsule"""
-        class_name = self._to_pascal_case(capsule_name)
-        
-        template = f"""
-import 'package:flutter/material.dart';
-import 'package:flutter_test/flutter_test.dart';
-import 'package:wealthbridge/widgets/{self._to_snake_case(capsule_name)}_capsule.dart';
-
-void main() {{
-  group('{class_name} Capsule Tests', () {{
-    testWidgets('{class_name} renders correctly',
-        (WidgetTester tester) async {{
-      await tester.pumpWidget(
-        const MaterialApp(
-          home: {class_name}Capsule(),
-        ),
-      );
-
-      expect(find.byType({class_name}Capsule), findsOneWidget);
-    }});
-
-    testWidgets('{class_name} handles user interaction',
-        (WidgetTester tester) async {{
-      await tester.pumpWidget(
-        const MaterialApp(
-          home: {class_name}Capsule(),
-        ),
-      );
-
-      // Add your interaction tests here
-    }});
-  }});
-}}
-        """
-        return template
+        return self._render_test_template(capsule_name)
 
     # Helper methods
     @staticmethod
@@ -333,15 +406,11 @@ async def generate_dart_capsule(
 ) -> Dict:
     """
     API endpoint helper to generate Dart capsule
+    Raises ValueError for an unknown capsule_type
     """
-    try:
-        capsule_type_enum = CapsuleType[capsule_type.upper()]
-    except KeyError:
-        capsule_type_enum = CapsuleType.STATEFUL
-
     return dart_agent.generate_capsule(
         capsule_name=capsule_name,
-        capsule_type=capsule_type_enum,
+        capsule_type=parse_capsule_type(capsule_type),
         description=description,
         functionality=functionality or [],
     )
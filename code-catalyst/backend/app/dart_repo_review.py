@@ -0,0 +1,240 @@
+"""
+Repository-wide Dart Review
+Reviews every .dart file under paths of the WealthBridge checkout on a
+process pool, re-reviewing only files whose content changed, and rolls
+code_quality_score up per directory
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .config import Config
+from .dart_review import review_source
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REVIEW_PATHS = ["lib"]
+# Below this many changed files, reviewing inline beats shipping them to
+# workers (a typical capsule file reviews in well under a millisecond)
+PARALLEL_MIN_FILES = 64
+# Generated or tool-owned trees, never reviewed
+SKIP_DIRS = {".dart_tool", "build", ".git", ".idea", "node_modules"}
+
+
+def _inside(root: str, path: str) -> bool:
+    """Whether path, symlinks resolved, is under root (already a realpath)"""
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def _review_code(code: str) -> Dict:
+    """Worker entry point (module-level so it pickles)"""
+    result = review_source(code)
+    del result["capsule_name"]
+    return result
+
+
+class RepoReviewer:
+    """
+    Reviews Dart files under the WealthBridge root
+
+    Results are cached by SHA-256 of the file content; a (mtime, size)
+    index lets unchanged files skip even the read and hash.
+    """
+
+    def __init__(self, workers: int = 0, cache_size: int = 5000):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self._results: "OrderedDict[str, Dict]" = OrderedDict()
+        self._stat_index: Dict[str, Tuple[int, int, str]] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {"runs": 0, "files_reviewed": 0, "cache_hits": 0}
+
+    def resolve_paths(self, paths: List[str], root: Optional[str] = None) -> List[str]:
+        """
+        Map request paths onto the checkout
+
+        Raises:
+            ValueError: If a path escapes the root or does not exist
+        """
+        root = os.path.realpath(root or Config.WEALTHBRIDGE_ROOT)
+        resolved = []
+        for path in paths or DEFAULT_REVIEW_PATHS:
+            full = os.path.realpath(os.path.join(root, path))
+            if not _inside(root, full):
+                raise ValueError(f"Path is outside the WealthBridge root: {path}")
+            if not os.path.exists(full):
+                raise ValueError(f"Path not found: {path}")
+            resolved.append(full)
+        return resolved
+
+    @staticmethod
+    def collect(paths: List[str], root: str) -> List[str]:
+        """
+        Every .dart file under paths, sorted, without duplicates; files
+        symlinked to somewhere outside root are skipped
+        """
+        found = set()
+        for path in paths:
+            if os.path.isfile(path):
+                if path.endswith(".dart"):
+                    found.add(path)
+                continue
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+                found.update(os.path.join(dirpath, name) for name in filenames if name.endswith(".dart"))
+
+        outside = {path for path in found if not _inside(root, path)}
+        for path in sorted(outside):
+            logger.warning(f"⚠️ Skipping {os.path.relpath(path, root)}: links outside the WealthBridge root")
+        return sorted(found - outside)
+
+    def _cached(self, path: str, stat: os.stat_result) -> Optional[Dict]:
+        entry = self._stat_index.get(path)
+        if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return self._results.get(entry[2])
+        return None
+
+    def _store(self, digest: str, result: Dict):
+        self._results[digest] = result
+        self._results.move_to_end(digest)
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+
+    def _run(self, codes: List[str]) -> List[Dict]:
+        if len(codes) < PARALLEL_MIN_FILES or self.workers < 2:
+            return [_review_code(code) for code in codes]
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            pool = self._pool
+        chunksize = max(1, len(codes) // (self.workers * 4))
+        return list(pool.map(_review_code, codes, chunksize=chunksize))
+
+    def review(
+        self,
+        paths: Optional[List[str]] = None,
+        include_issues: bool = False,
+        root: Optional[str] = None,
+    ) -> Dict:
+        """
+        Review every .dart file under paths (relative to the WealthBridge root)
+
+        Returns:
+            Per-directory and overall scores, per-file summaries, and how
+            many files were reviewed versus served from the cache
+        """
+        started = time.time()
+        root = os.path.realpath(root or Config.WEALTHBRIDGE_ROOT)
+        files = self.collect(self.resolve_paths(paths, root), root)
+
+        results: Dict[str, Dict] = {}
+        pending: Dict[str, Tuple[str, str]] = {}  # digest → (path, code)
+        duplicates: List[Tuple[str, str]] = []  # (path, digest) with the same content as a pending file
+        with self._lock:
+            for path in files:
+                stat = os.stat(path)
+                cached = self._cached(path, stat)
+                if cached is not None:
+                    results[path] = cached
+                    continue
+                with open(path, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()
+                self._stat_index[path] = (stat.st_mtime_ns, stat.st_size, digest)
+                if digest in self._results:
+                    results[path] = self._results[digest]
+                elif digest in pending:
+                    duplicates.append((path, digest))
+                else:
+                    pending[digest] = (path, data.decode("utf-8", errors="replace"))
+
+        reviewed = dict(zip(pending, self._run([code for _, code in pending.values()])))
+
+        with self._lock:
+            for digest, result in reviewed.items():
+                self._store(digest, result)
+                results[pending[digest][0]] = result
+            for path, digest in duplicates:
+                results[path] = reviewed[digest]
+            self.stats["runs"] += 1
+            self.stats["files_reviewed"] += len(pending)
+            self.stats["cache_hits"] += len(files) - len(pending)
+
+        report = self._aggregate(root, results, include_issues)
+        report.update({
+            "reviewed_files": len(pending),
+            "cached_files": len(files) - len(pending),
+            "duration_seconds": round(time.time() - started, 3),
+        })
+        logger.info(
+            f"📋 Repo review: {len(files)} files ({len(pending)} reviewed, "
+            f"{len(files) - len(pending)} cached) in {report['duration_seconds']}s"
+        )
+        return report
+
+    @staticmethod
+    def _aggregate(root: str, results: Dict[str, Dict], include_issues: bool) -> Dict:
+        directories: Dict[str, Dict] = {}
+        files = []
+        for path in sorted(results):
+            result = results[path]
+            relative = os.path.relpath(path, root).replace(os.sep, "/")
+            directory = relative.rsplit("/", 1)[0] if "/" in relative else "."
+
+            summary = directories.setdefault(directory, {
+                "files": 0, "score_total": 0, "min_score": 100,
+                "errors": 0, "warnings": 0, "failing_files": 0,
+            })
+            summary["files"] += 1
+            summary["score_total"] += result["code_quality_score"]
+            summary["min_score"] = min(summary["min_score"], result["code_quality_score"])
+            summary["errors"] += result["errors"]
+            summary["warnings"] += result["warnings"]
+            summary["failing_files"] += not result["pass_review"]
+
+            entry = {
+                "path": relative,
+                "code_quality_score": result["code_quality_score"],
+                "errors": result["errors"],
+                "warnings": result["warnings"],
+                "pass_review": result["pass_review"],
+            }
+            if include_issues:
+                entry["issues"] = result["issues"]
+                entry["suggestions"] = result["suggestions"]
+            files.append(entry)
+
+        for summary in directories.values():
+            summary["average_score"] = round(summary.pop("score_total") / summary["files"], 1)
+
+        total = len(files)
+        return {
+            "root": root,
+            "total_files": total,
+            "average_score": round(sum(f["code_quality_score"] for f in files) / total, 1) if total else None,
+            "total_errors": sum(f["errors"] for f in files),
+            "total_warnings": sum(f["warnings"] for f in files),
+            "pass_review": all(f["pass_review"] for f in files),
+            "directories": directories,
+            "files": files,
+        }
+
+    def shutdown(self):
+        """Stop worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Singleton instance
+repo_reviewer = RepoReviewer(
+    workers=Config.DART_REVIEW_WORKERS,
+    cache_size=Config.DART_REVIEW_CACHE_SIZE,
+)
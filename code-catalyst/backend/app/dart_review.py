@@ -0,0 +1,266 @@
+"""
+Dart Code Review Engine
+Tokenizes Dart source in one pass into a lightweight outline (classes,
+constructors, build methods, State subclasses, setState/print calls) and
+runs the WealthBridge review rules against that outline, with line numbers
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Outlines kept per distinct source text (review and suggestions share one)
+OUTLINE_CACHE_SIZE = 64
+
+# The lexer: one lexeme per match, in source order. Comments and strings
+# are matched as a whole (unnamed) so nothing inside them reads as code;
+# every other alternative is a named outline token. Each alternative
+# starts on a literal character, picked to be uncommon in Dart ("{" for
+# try, "S" for setState), with the word boundary checked behind it.
+_LEXEME_RE = re.compile(
+    r"""
+      '(?:''.*?'''|[^'\\\n]*(?:\\.[^'\\\n]*)*')
+    | "(?:"".*?\"\"\"|[^"\\\n]*(?:\\.[^"\\\n]*)*")
+    | /(?:/[^\n]*|\*.*?\*/)
+    | c(?:
+          (?P<class>lass(?<![\w$]class)\s+(?P<name>[A-Za-z_$][\w$]*)(?:\s*<[^{>]*>)?
+          (?:\s+extends\s+(?P<base>[A-Za-z_$][\w$]*)(?:\s*<\s*(?P<state_of>[A-Za-z_$][\w$]*))?)?)
+        | atch(?<![\w$]catch)(?P<catch>)\ *\(
+      )
+    | p(?:rint(?<![\w$]print)(?P<print>)\ *\(|(?P<password>assword))
+    | P(?P<password_upper>assword|ASSWORD)
+    | S(?<=setS)(?<![\w$]setS)(?P<set_state>)tate\ *\(
+    | b(?:uild(?<![\w$]build)(?P<build>)\ *\(\s*BuildContext)
+    | \{(?:(?<=try\{)(?<![\w$]try\{)|(?<=try\ \{)(?<![\w$]try\ \{))(?P<try>)
+    | F(?:uture\.delayed(?<![\w$]Future\.delayed)(?P<delayed>)\ *\()
+    | \.(?<=super\.)(?<![\w$]super\.)(?P<super_key>)key
+    | K(?P<key>)ey\?
+    | V(?P<vault>)aultGemma
+    """,
+    re.S | re.X,
+)
+
+# Lexeme group → outline token kind
+_KINDS = {
+    "class": "class", "build": "build", "super_key": "key", "key": "key",
+    "set_state": "set_state", "print": "print", "delayed": "delayed", "try": "try",
+    "catch": "catch", "password": "password", "password_upper": "password", "vault": "vault",
+}
+
+_IDENT_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$")
+
+# Outline call kinds, recorded as line lists
+CALL_KINDS = ("set_state", "print", "delayed", "try", "catch", "password", "vault")
+
+WIDGET_BASES = {"StatelessWidget": "stateless", "StatefulWidget": "stateful", "State": "state"}
+
+
+@lru_cache(maxsize=OUTLINE_CACHE_SIZE)
+def build_outline(code: str) -> Dict:
+    """
+    Walk the source once, in order, and collect the file's structure
+    (cached per source text; treat the result as read-only)
+
+    A widget's constructor ("ClassName(" in its body) is looked up when its
+    class is declared and confirmed or moved on as the walk passes it, so
+    a match inside a comment or string is skipped without a second pass.
+
+    Returns:
+        {"classes": [{name, kind, base, state_of, line, has_build, has_key,
+                      constructor_line, const_constructor}],
+         "calls": {kind: [line, ...]}}
+    """
+    classes: List[Dict] = []
+    calls: Dict[str, List[int]] = {kind: [] for kind in CALL_KINDS}
+    line, position = 1, 0
+    # Widget whose constructor is still being looked for, and where
+    ctor_cls: Optional[Dict] = None
+    ctor = -1
+
+    for match in _LEXEME_RE.finditer(code):
+        start = match.start()
+        if ctor_cls is not None and ctor < start:
+            line += code.count("\n", position, ctor)
+            position = ctor
+            _set_constructor(code, ctor_cls, ctor, line)
+            ctor_cls = None
+
+        group = match.lastgroup
+        if group is None:
+            # Comment or string: a constructor candidate inside it isn't code
+            if ctor_cls is not None and ctor < match.end():
+                ctor = _find_constructor(code, ctor_cls["name"], match.end())
+                if ctor == -1:
+                    ctor_cls = None
+            continue
+
+        line += code.count("\n", position, start)
+        position = start
+        kind = _KINDS[group]
+
+        if kind == "class":
+            ctor_cls = None
+            base = match.group("base")
+            cls = {
+                "name": match.group("name"),
+                "kind": WIDGET_BASES.get(base, "class"),
+                "base": base,
+                "state_of": match.group("state_of") if base == "State" else None,
+                "line": line,
+                "has_build": False,
+                "has_key": False,
+                "constructor_line": None,
+                "const_constructor": False,
+            }
+            classes.append(cls)
+            if cls["kind"] in ("stateless", "stateful"):
+                body = code.find("{", match.end())
+                ctor = _find_constructor(code, cls["name"], body) if body != -1 else -1
+                ctor_cls = cls if ctor != -1 else None
+        elif kind == "build" and classes:
+            classes[-1]["has_build"] = True
+        elif kind == "key" and classes:
+            classes[-1]["has_key"] = True
+        else:
+            calls[kind].append(line)
+
+    if ctor_cls is not None:
+        line += code.count("\n", position, ctor)
+        _set_constructor(code, ctor_cls, ctor, line)
+
+    return {"classes": classes, "calls": calls}
+
+
+def _find_constructor(code: str, name: str, start: int) -> int:
+    """Offset of the next "name(" from start that isn't part of a longer identifier"""
+    literal = name + "("
+    offset = code.find(literal, start)
+    while offset > 0 and code[offset - 1] in _IDENT_CHARS:
+        offset = code.find(literal, offset + 1)
+    return offset
+
+
+def _set_constructor(code: str, cls: Dict, offset: int, line: int):
+    cls["constructor_line"] = line
+    cls["const_constructor"] = code[max(0, offset - 32):offset].rstrip().endswith("const")
+
+
+def _issue(severity: str, issue_type: str, message: str, suggestion: str, line: int, symbol: str) -> Dict:
+    return {
+        "severity": severity,
+        "type": issue_type,
+        "message": message,
+        "suggestion": suggestion,
+        "line": line,
+        "symbol": symbol,
+    }
+
+
+def review_outline(outline: Dict) -> List[Dict]:
+    """Apply the widget rules to every class in the outline"""
+    issues = []
+
+    for cls in outline["classes"]:
+        kind, name, line = cls["kind"], cls["name"], cls["line"]
+
+        if kind in ("stateless", "state") and not cls["has_build"]:
+            issues.append(_issue(
+                "error", "missing_build",
+                f"{name} is missing the required build() method",
+                "Implement Widget build(BuildContext context)", line, name,
+            ))
+
+        if kind == "stateless" and not cls["const_constructor"]:
+            issues.append(_issue(
+                "warning", "missing_const",
+                f"{name} constructor should be const",
+                "Add 'const' keyword to constructor", cls["constructor_line"] or line, name,
+            ))
+
+        if kind in ("stateless", "stateful") and not cls["has_key"]:
+            issues.append(_issue(
+                "warning", "missing_key",
+                f"{name}: consider adding Key parameter for better widget identification",
+                "Add super.key (or Key? key) to the constructor", cls["constructor_line"] or line, name,
+            ))
+
+        if kind == "state" and not name.startswith("_"):
+            issues.append(_issue(
+                "warning", "naming_convention",
+                f"State class {name} should be private",
+                f"Rename to _{name}", line, name,
+            ))
+
+    return issues
+
+
+def suggestions_for_outline(outline: Dict) -> List[Dict]:
+    """Non-blocking improvement hints with the lines that triggered them"""
+    calls = outline["calls"]
+    suggestions = []
+
+    def add(kind: str, message: str):
+        if calls[kind]:
+            suggestions.append({"message": message, "lines": list(calls[kind])})
+
+    add("set_state", "Consider using state management library (Provider/BLoC/GetX) to reduce unnecessary rebuilds")
+    add("delayed", "Use proper async/await patterns instead of Future.delayed")
+    add("print", "Use logger instead of print() for better observability")
+    if not calls["vault"]:
+        add("password", "Sensitive data detected. Consider using VaultGemma encryption")
+    if not calls["catch"]:
+        add("try", "Add proper exception handling to async operations")
+
+    return suggestions
+
+
+def review_source(code: str, name: str = "") -> Dict:
+    """
+    Review one Dart source string
+
+    Returns:
+        Same keys as DartAgentSpecialization.review_capsule_code, plus
+        "suggestions" and the class "outline"
+    """
+    outline = build_outline(code)
+    issues = review_outline(outline)
+    errors = sum(1 for issue in issues if issue["severity"] == "error")
+    warnings = len(issues) - errors
+
+    return {
+        "capsule_name": name,
+        "total_issues": len(issues),
+        "errors": errors,
+        "warnings": warnings,
+        "issues": issues,
+        "suggestions": suggestions_for_outline(outline),
+        "outline": [
+            {"name": cls["name"], "kind": cls["kind"], "base": cls["base"], "line": cls["line"]}
+            for cls in outline["classes"]
+        ],
+        "code_quality_score": max(0, 100 - (errors * 20 + warnings * 5)),
+        "pass_review": errors == 0,
+    }
+
+
+def review_sources(files: Iterable[Dict]) -> Dict:
+    """
+    Review several files: [{"path": ..., "code": ...}]
+
+    Returns:
+        Per-file results plus totals and the average score
+    """
+    results = []
+    for f in files:
+        result = review_source(f["code"])
+        del result["capsule_name"]
+        results.append({"path": f.get("path", ""), **result})
+
+    return {
+        "files": results,
+        "total_files": len(results),
+        "total_errors": sum(r["errors"] for r in results),
+        "total_warnings": sum(r["warnings"] for r in results),
+        "average_score": sum(r["code_quality_score"] for r in results) / len(results) if results else None,
+        "pass_review": all(r["pass_review"] for r in results),
+    }
@@ -0,0 +1,195 @@
+"""
+Task Event Broadcaster
+Pushes delegation lifecycle events to SSE/WebSocket subscribers instead of
+making clients poll /api/task/{task_id}
+
+Events go through Redis pub/sub when main.redis_client is connected (so a
+handback on any worker reaches subscribers on every worker), otherwise
+through in-process queues
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from typing import AsyncIterator, Dict, Optional, Set
+
+from .agent_handoff import AgentHandoff, TaskStatus, handoff_coordinator
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Coordinator events forwarded to subscribers
+PUSH_EVENTS = ("started", "redelegated", "handed_back", "expired")
+FINAL_EVENTS = ("handed_back", "expired")
+FINAL_STATUSES = (TaskStatus.HANDED_BACK.value, TaskStatus.COMPLETED.value, TaskStatus.FAILED.value)
+
+
+def _event_payload(event: str, record: Dict) -> Dict:
+    """Client-facing event: status is the task status as /api/task reports it"""
+    if event == "handed_back":
+        # Handback records are addressed back to the delegating agent
+        agent = record["from_agent"]
+        status = TaskStatus.FAILED.value if record["status"] == "failed" else TaskStatus.HANDED_BACK.value
+    else:
+        agent = record.get("to_agent")
+        status = record.get("status")
+
+    return {
+        "event": event,
+        "task_id": record["task_id"],
+        "status": status,
+        "agent": agent,
+        "result": record.get("result"),
+        "error": record.get("error"),
+        "final": event in FINAL_EVENTS or (event == "snapshot" and status in FINAL_STATUSES),
+        "timestamp": time.time(),
+    }
+
+
+class TaskEventBroadcaster:
+    """Fans coordinator events out to per-task subscriber queues"""
+
+    def __init__(self, coordinator: AgentHandoff, channel_prefix: str = "handoff:events"):
+        self.coordinator = coordinator
+        self.channel_prefix = channel_prefix
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+        # In-flight Redis publishes; the loop only keeps weak references to tasks
+        self._publishes: Set[asyncio.Task] = set()
+        self.stats: Counter = Counter()
+
+        coordinator.subscribe(self._on_handoff_event)
+
+    def _on_handoff_event(self, event: str, record: Dict):
+        if event in PUSH_EVENTS:
+            self.publish(_event_payload(event, record))
+
+    def publish(self, payload: Dict):
+        """Broadcast an event; safe to call from any thread"""
+        if self._loop is None or self._loop.is_closed():
+            # Not started: nobody can be subscribed
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, payload)
+
+    def _dispatch(self, payload: Dict):
+        self.stats["published"] += 1
+        if self._redis is not None:
+            task = asyncio.create_task(self._publish_redis(payload))
+            self._publishes.add(task)
+            task.add_done_callback(self._publish_done)
+        else:
+            self._deliver(payload)
+
+    def _publish_done(self, task: asyncio.Task):
+        self._publishes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ Task event publish failed: {str(task.exception())}")
+
+    async def _publish_redis(self, payload: Dict):
+        try:
+            await self._redis.publish(
+                f"{self.channel_prefix}:{payload['task_id']}", json.dumps(payload, default=str)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Redis publish failed, delivering locally: {str(e)}")
+            self._deliver(payload)
+
+    def _deliver(self, payload: Dict):
+        for queue in self._subscribers.get(payload["task_id"], ()):
+            try:
+                queue.put_nowait(payload)
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                self.stats["dropped"] += 1
+
+    async def _listen(self):
+        """Relay Redis pub/sub messages to local subscribers"""
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.psubscribe(f"{self.channel_prefix}:*")
+            async for message in pubsub.listen():
+                if message["type"] == "pmessage":
+                    self._deliver(json.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Redis event listener stopped, using in-process events: {str(e)}")
+            self._redis = None
+        finally:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
+
+    async def stream(
+        self,
+        task_id: str,
+        heartbeat_seconds: Optional[float] = None,
+    ) -> AsyncIterator[Optional[Dict]]:
+        """
+        Yield events for one task until a final one
+        Starts with a "snapshot" of the current state; yields None as a
+        heartbeat when nothing happened for heartbeat_seconds
+        """
+        heartbeat_seconds = heartbeat_seconds or Config.TASK_EVENTS_HEARTBEAT_SECONDS
+        queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+        # Subscribe before reading state so a handback in between isn't missed
+        self._subscribers[task_id].add(queue)
+        self.stats["subscribers"] += 1
+        try:
+            record = await asyncio.to_thread(self.coordinator.get_task_status, task_id)
+            if record is not None:
+                snapshot = _event_payload("snapshot", record)
+                yield snapshot
+                if snapshot["final"]:
+                    return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event["final"]:
+                    return
+        finally:
+            self._subscribers[task_id].discard(queue)
+            if not self._subscribers[task_id]:
+                del self._subscribers[task_id]
+
+    def start(self, redis_client=None):
+        """Bind to the running loop; relay through Redis if a client is given"""
+        self._loop = asyncio.get_running_loop()
+        self._redis = redis_client
+        if redis_client is not None:
+            self._listener = asyncio.create_task(self._listen())
+        logger.info(f"📣 Task events started ({'redis' if redis_client is not None else 'in-process'})")
+
+    async def stop(self):
+        if self._publishes:
+            await asyncio.gather(*self._publishes, return_exceptions=True)
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._redis = None
+        self._loop = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "backend": "redis" if self._redis is not None else "in-process",
+            "active_subscriptions": sum(len(queues) for queues in self._subscribers.values()),
+            **self.stats,
+        }
+
+
+# Singleton bound to the global coordinator
+task_event_broadcaster = TaskEventBroadcaster(handoff_coordinator)
@@ -0,0 +1,162 @@
+"""
+Handoff Metrics
+Per-agent latency/queue-wait histograms and outcome counters, fed by
+AgentHandoff lifecycle events and exported in Prometheus text format
+"""
+
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from .agent_handoff import AgentHandoff, AgentType, handoff_coordinator
+
+# Bucket upper bounds in seconds (Prometheus "le"), shared by every histogram
+LATENCY_BUCKETS: Tuple[float, ...] = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+QUEUE_WAIT_BUCKETS: Tuple[float, ...] = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+OUTCOMES = ("delegated", "completed", "failed", "timed_out")
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts are preallocated, observe() allocates nothing"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # Last slot is the +Inf overflow bucket
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if i == len(self.buckets):
+                    # Overflow bucket has no upper bound
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "avg_seconds": self.sum / self.count if self.count else None,
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+        }
+
+
+class AgentMetrics:
+    """Histograms and outcome counters for one agent"""
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(QUEUE_WAIT_BUCKETS)
+        self.outcomes: Dict[str, int] = dict.fromkeys(OUTCOMES, 0)
+
+    def summary(self) -> Dict:
+        return {
+            **self.outcomes,
+            "latency": self.latency.summary(),
+            "queue_wait": self.queue_wait.summary(),
+        }
+
+
+class HandoffMetrics:
+    """
+    Subscribes to AgentHandoff events:
+    - latency: delegation → handback (duration_seconds)
+    - queue wait: delegation (or re-delegation) → picked up by a worker
+    """
+
+    def __init__(self, coordinator: AgentHandoff):
+        self.agents: Dict[str, AgentMetrics] = {agent.value: AgentMetrics() for agent in AgentType}
+        coordinator.subscribe(self._on_handoff_event)
+
+    def _agent(self, agent: str) -> AgentMetrics:
+        metrics = self.agents.get(agent)
+        if metrics is None:
+            # Handbacks may name an agent outside AgentType
+            metrics = self.agents[agent] = AgentMetrics()
+        return metrics
+
+    def _on_handoff_event(self, event: str, record: Dict):
+        if event in ("delegated", "redelegated"):
+            self._agent(record["to_agent"]).outcomes["delegated"] += 1
+            if event == "redelegated":
+                self._agent(record["redelegated_from"]).outcomes["timed_out"] += 1
+
+        elif event == "started":
+            # expected_handback_at - timeout_seconds = when this attempt was delegated
+            delegated_at = record["expected_handback_at"] - record.get("timeout_seconds", 0)
+            self._agent(record["to_agent"]).queue_wait.observe(max(0.0, time.time() - delegated_at))
+
+        elif event == "handed_back":
+            metrics = self._agent(record["from_agent"])
+            metrics.latency.observe(record["duration_seconds"])
+            metrics.outcomes["failed" if record["status"] == "failed" else "completed"] += 1
+
+        elif event == "expired":
+            self._agent(record["to_agent"]).outcomes["timed_out"] += 1
+
+    def get_summary(self, agent: str) -> Dict:
+        return self._agent(agent).summary()
+
+    def render_prometheus(self, queue_stats: Optional[Dict[str, Dict]] = None) -> str:
+        """
+        Prometheus text exposition (format 0.0.4)
+
+        Args:
+            queue_stats: Optional {agent: AgentWorkQueue.get_stats()} for queue gauges
+        """
+        lines = []
+
+        for name, attr, help_text in (
+            ("codecatalyst_handoff_latency_seconds", "latency", "Delegation to handback latency"),
+            ("codecatalyst_handoff_queue_wait_seconds", "queue_wait", "Delegation to worker pickup wait"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for agent, metrics in self.agents.items():
+                histogram: Histogram = getattr(metrics, attr)
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{agent="{agent}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{agent="{agent}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{agent="{agent}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{agent="{agent}"}} {histogram.count}')
+
+        lines.append("# HELP codecatalyst_handoff_tasks_total Delegated tasks by outcome")
+        lines.append("# TYPE codecatalyst_handoff_tasks_total counter")
+        for agent, metrics in self.agents.items():
+            for outcome, value in metrics.outcomes.items():
+                lines.append(f'codecatalyst_handoff_tasks_total{{agent="{agent}",outcome="{outcome}"}} {value}')
+
+        if queue_stats:
+            for gauge, key, help_text in (
+                ("codecatalyst_agent_queue_depth", "depth", "Tasks waiting in the agent work queue"),
+                ("codecatalyst_agent_queue_busy", "busy", "Agent workers currently running a task"),
+                ("codecatalyst_agent_queue_concurrency", "concurrency", "Configured agent workers"),
+            ):
+                lines.append(f"# HELP {gauge} {help_text}")
+                lines.append(f"# TYPE {gauge} gauge")
+                for agent, stats in queue_stats.items():
+                    lines.append(f'{gauge}{{agent="{agent}"}} {stats[key]}')
+
+        return "\n".join(lines) + "\n"
+
+
+# Singleton bound to the global coordinator
+handoff_metrics = HandoffMetrics(handoff_coordinator)
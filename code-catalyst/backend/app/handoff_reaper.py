@@ -0,0 +1,143 @@
+"""
+Delegation Timeout Reaper
+Enforces expected_handback_at for delegated tasks without polling:
+a min-heap of deadlines and a single asyncio task that sleeps until the next one
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from .agent_handoff import AgentHandoff, handoff_coordinator
+
+logger = logging.getLogger(__name__)
+
+
+class DelegationReaper:
+    """
+    Deadline scheduler for AgentHandoff
+    Schedules every delegation on creation (O(log n)) and expires overdue
+    ones through AgentHandoff.expire (FAILED or re-delegated to DEEPAGENT)
+    """
+
+    def __init__(self, coordinator: AgentHandoff):
+        self.coordinator = coordinator
+        self._deadlines: List[Tuple[float, str]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Counter = Counter()
+
+        coordinator.subscribe(self._on_handoff_event)
+
+    def _on_handoff_event(self, event: str, record: Dict):
+        if event in ("delegated", "redelegated"):
+            self.schedule(record["task_id"], record["expected_handback_at"])
+
+    def schedule(self, task_id: str, deadline: float):
+        """Track a handback deadline; wakes the loop only if it is the new earliest"""
+        is_earliest = not self._deadlines or deadline < self._deadlines[0][0]
+        heapq.heappush(self._deadlines, (deadline, task_id))
+        self.metrics["scheduled"] += 1
+
+        if is_earliest and self._wakeup is not None:
+            self._wakeup.set()
+
+    def reap(self, now: Optional[float] = None) -> int:
+        """
+        Expire every delegation whose deadline has passed
+
+        Returns:
+            Number of delegations that timed out
+        """
+        now = time.time() if now is None else now
+        timed_out = 0
+
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, task_id = heapq.heappop(self._deadlines)
+            timed_out += self._record(self.coordinator.expire(task_id, now=now))
+
+        return timed_out
+
+    async def _reap_due(self):
+        """reap() for the loop: each expire (store I/O) runs in a worker thread"""
+        now = time.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, task_id = heapq.heappop(self._deadlines)
+            self._record(await asyncio.to_thread(self.coordinator.expire, task_id, now=now))
+
+    def _record(self, outcome: Optional[str]) -> int:
+        if outcome is None:
+            # Handed back (or evicted) before its deadline
+            self.metrics["completed_in_time"] += 1
+            return 0
+        self.metrics["timed_out"] += 1
+        self.metrics[outcome] += 1
+        return 1
+
+    async def run(self):
+        """Sleep until the next deadline (or an earlier one is scheduled), then reap"""
+        # Pick up deadlines persisted by earlier (or other) workers; expire() is
+        # atomic, so several workers reaping the same task is harmless
+        try:
+            records = await asyncio.to_thread(lambda: list(self.coordinator.iter_open_delegations()))
+            # Delegations made while loading are already scheduled by their event
+            scheduled = set(self._deadlines)
+            for record in records:
+                if (record["expected_handback_at"], record["task_id"]) not in scheduled:
+                    self.schedule(record["task_id"], record["expected_handback_at"])
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load pending delegations: {str(e)}")
+        logger.info(f"⏰ Delegation reaper started ({len(self._deadlines)} deadlines pending)")
+
+        while True:
+            self._wakeup.clear()
+
+            if not self._deadlines:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._deadlines[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._reap_due()
+
+    def start(self):
+        """Start the reaper loop on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self.coordinator.bind_loop(asyncio.get_running_loop())
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Cancel the reaper loop"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+        logger.info("✅ Delegation reaper stopped")
+
+    def get_metrics(self) -> Dict:
+        """Reaper counters plus the number of pending deadlines"""
+        return {
+            "pending_deadlines": len(self._deadlines),
+            "running": self._task is not None and not self._task.done(),
+            **self.metrics,
+        }
+
+
+# Singleton bound to the global coordinator
+handoff_reaper = DelegationReaper(handoff_coordinator)
@@ -0,0 +1,345 @@
+"""
+Handoff Storage Backends
+Delegation records and the handoff log for AgentHandoff, with atomic
+read-modify-write so several uvicorn workers/nodes can share state
+
+Backend: Config.HANDOFF_STORE_BACKEND, memory (default, in-process, single
+worker), sqlite or redis (store_backends)
+"""
+
+import heapq
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .config import Config
+from .store_backends import RedisStore, SQLiteStore, create_store
+
+logger = logging.getLogger(__name__)
+
+# Statuses that still expect a handback
+OPEN_STATUSES = ("delegated", "in_progress")
+
+# mutate(record) -> updated record, or None to leave it untouched
+Mutation = Callable[[Dict], Optional[Dict]]
+
+
+class HandoffStore:
+    """
+    Base class for handoff storage
+    Every delegation record carries an "evict_at" epoch time after which
+    the backend may drop it
+    """
+
+    name = "base"
+
+    def put_delegation(self, record: Dict):
+        raise NotImplementedError
+
+    def get_delegation(self, task_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def update_delegation(self, task_id: str, mutate: Mutation) -> Optional[Dict]:
+        """
+        Atomically apply mutate() to the current record
+
+        Returns:
+            The stored updated record, or None if missing or mutate() declined
+        """
+        raise NotImplementedError
+
+    def iter_open_delegations(self) -> Iterator[Dict]:
+        """Delegations still waiting for a handback"""
+        raise NotImplementedError
+
+    def append_log(self, record: Dict):
+        raise NotImplementedError
+
+    def iter_log(self, offset: int = 0, limit: Optional[int] = None, page_size: int = 500) -> Iterator[List[Dict]]:
+        """Yield pages of log records, oldest first"""
+        raise NotImplementedError
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+
+class MemoryHandoffStore(HandoffStore):
+    """In-process store: ring-buffer log, dict of delegations, eviction min-heap"""
+
+    name = "memory"
+
+    def __init__(self, log_capacity: int):
+        self.handoff_log: Deque[Dict] = deque(maxlen=log_capacity)
+        self.delegations: Dict[str, Dict] = {}
+        # Min-heap of (evict_at, task_id); entries superseded by a reschedule are skipped
+        self._evictions: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def put_delegation(self, record: Dict):
+        with self._lock:
+            self.delegations[record["task_id"]] = dict(record)
+            heapq.heappush(self._evictions, (record["evict_at"], record["task_id"]))
+
+    def get_delegation(self, task_id: str) -> Optional[Dict]:
+        record = self.delegations.get(task_id)
+        return dict(record) if record is not None else None
+
+    def update_delegation(self, task_id: str, mutate: Mutation) -> Optional[Dict]:
+        with self._lock:
+            current = self.delegations.get(task_id)
+            if current is None:
+                return None
+            updated = mutate(dict(current))
+            if updated is None:
+                return None
+            self.delegations[task_id] = updated
+            if updated["evict_at"] != current["evict_at"]:
+                heapq.heappush(self._evictions, (updated["evict_at"], task_id))
+            return dict(updated)
+
+    def iter_open_delegations(self) -> Iterator[Dict]:
+        with self._lock:
+            records = [dict(r) for r in self.delegations.values() if r["status"] in OPEN_STATUSES]
+        return iter(records)
+
+    def append_log(self, record: Dict):
+        with self._lock:
+            self.handoff_log.append(record)
+
+    def iter_log(self, offset: int = 0, limit: Optional[int] = None, page_size: int = 500) -> Iterator[List[Dict]]:
+        # Snapshot references so appends during streaming can't break iteration
+        with self._lock:
+            snapshot = list(self.handoff_log)
+        stop = len(snapshot) if limit is None else min(len(snapshot), offset + limit)
+        for start in range(offset, stop, page_size):
+            yield snapshot[start:min(start + page_size, stop)]
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        evicted = 0
+        with self._lock:
+            while self._evictions and self._evictions[0][0] <= now:
+                evict_at, task_id = heapq.heappop(self._evictions)
+                record = self.delegations.get(task_id)
+                if record is not None and record["evict_at"] == evict_at:
+                    del self.delegations[task_id]
+                    evicted += 1
+        return evicted
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.name,
+            "log_size": len(self.handoff_log),
+            "log_capacity": self.handoff_log.maxlen,
+            "active_delegations": len(self.delegations),
+        }
+
+
+class SQLiteHandoffStore(SQLiteStore, HandoffStore):
+    """Delegations keyed by task_id, plus the log as an autoincrement table"""
+
+    def __init__(self, path: str, log_capacity: int):
+        self.log_capacity = log_capacity
+        super().__init__(
+            path,
+            """
+            CREATE TABLE IF NOT EXISTS delegations (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                evict_at REAL NOT NULL,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_delegations_evict_at ON delegations (evict_at);
+            CREATE INDEX IF NOT EXISTS idx_delegations_status ON delegations (status);
+            CREATE TABLE IF NOT EXISTS handoff_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                record TEXT NOT NULL
+            );
+            """,
+        )
+
+    def put_delegation(self, record: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO delegations (task_id, status, evict_at, record) VALUES (?, ?, ?, ?)",
+                (record["task_id"], record["status"], record["evict_at"], json.dumps(record, default=str)),
+            )
+
+    def get_delegation(self, task_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM delegations WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_delegation(self, task_id: str, mutate: Mutation) -> Optional[Dict]:
+        def work():
+            row = self._conn.execute(
+                "SELECT record FROM delegations WHERE task_id = ?", (task_id,)
+            ).fetchone()
+            updated = mutate(json.loads(row[0])) if row else None
+            if updated is not None:
+                self._conn.execute(
+                    "UPDATE delegations SET status = ?, evict_at = ?, record = ? WHERE task_id = ?",
+                    (updated["status"], updated["evict_at"], json.dumps(updated, default=str), task_id),
+                )
+            return updated
+
+        return self._transaction(work)
+
+    def iter_open_delegations(self) -> Iterator[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM delegations WHERE status IN (?, ?)", OPEN_STATUSES
+            ).fetchall()
+        return (json.loads(row[0]) for row in rows)
+
+    def append_log(self, record: Dict):
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO handoff_log (record) VALUES (?)", (json.dumps(record, default=str),)
+            )
+            # Keep the newest log_capacity rows (range delete on the primary key)
+            self._conn.execute(
+                "DELETE FROM handoff_log WHERE seq <= ?", (cursor.lastrowid - self.log_capacity,)
+            )
+
+    def iter_log(self, offset: int = 0, limit: Optional[int] = None, page_size: int = 500) -> Iterator[List[Dict]]:
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT record FROM handoff_log ORDER BY seq LIMIT ? OFFSET ?", (size, offset)
+                ).fetchall()
+            if not rows:
+                return
+            yield [json.loads(row[0]) for row in rows]
+            offset += len(rows)
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._conn.execute("DELETE FROM delegations WHERE evict_at <= ?", (now,)).rowcount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            log_size = self._conn.execute("SELECT COUNT(*) FROM handoff_log").fetchone()[0]
+            delegations = self._conn.execute("SELECT COUNT(*) FROM delegations").fetchone()[0]
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "log_size": log_size,
+            "log_capacity": self.log_capacity,
+            "active_delegations": delegations,
+        }
+
+
+class RedisHandoffStore(RedisStore, HandoffStore):
+    """
+    Delegations are JSON strings with a native TTL, indexed by a sorted set
+    scored on evict_at; updates use WATCH/MULTI optimistic transactions
+    """
+
+    def __init__(self, client, log_capacity: int, prefix: str = "handoff"):
+        super().__init__(client, prefix)
+        self.log_capacity = log_capacity
+        self.log_key = f"{prefix}:log"
+        self.index_key = f"{prefix}:delegations"
+
+    def _key(self, task_id: str) -> str:
+        return f"{self.prefix}:delegation:{task_id}"
+
+    @staticmethod
+    def _ttl_ms(record: Dict) -> int:
+        return max(1, int((record["evict_at"] - time.time()) * 1000))
+
+    def put_delegation(self, record: Dict):
+        pipe = self.client.pipeline()
+        pipe.set(self._key(record["task_id"]), json.dumps(record, default=str), px=self._ttl_ms(record))
+        pipe.zadd(self.index_key, {record["task_id"]: record["evict_at"]})
+        pipe.execute()
+
+    def get_delegation(self, task_id: str) -> Optional[Dict]:
+        raw = self.client.get(self._key(task_id))
+        return json.loads(raw) if raw else None
+
+    def update_delegation(self, task_id: str, mutate: Mutation) -> Optional[Dict]:
+        import redis
+
+        key = self._key(task_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    updated = mutate(json.loads(raw)) if raw else None
+                    if updated is None:
+                        pipe.unwatch()
+                        return None
+                    pipe.multi()
+                    pipe.set(key, json.dumps(updated, default=str), px=self._ttl_ms(updated))
+                    pipe.zadd(self.index_key, {task_id: updated["evict_at"]})
+                    pipe.execute()
+                    return updated
+                except redis.WatchError:
+                    # Another worker changed the record first; re-read and retry
+                    continue
+
+    def iter_open_delegations(self) -> Iterator[Dict]:
+        task_ids = self.client.zrangebyscore(self.index_key, time.time(), "+inf")
+        for start in range(0, len(task_ids), 500):
+            keys = [self._key(task_id) for task_id in task_ids[start:start + 500]]
+            for raw in self.client.mget(keys):
+                if raw:
+                    record = json.loads(raw)
+                    if record["status"] in OPEN_STATUSES:
+                        yield record
+
+    def append_log(self, record: Dict):
+        pipe = self.client.pipeline()
+        pipe.rpush(self.log_key, json.dumps(record, default=str))
+        pipe.ltrim(self.log_key, -self.log_capacity, -1)
+        pipe.execute()
+
+    def iter_log(self, offset: int = 0, limit: Optional[int] = None, page_size: int = 500) -> Iterator[List[Dict]]:
+        stop = self.client.llen(self.log_key) if limit is None else offset + limit
+        for start in range(offset, stop, page_size):
+            rows = self.client.lrange(self.log_key, start, min(start + page_size, stop) - 1)
+            if not rows:
+                return
+            yield [json.loads(row) for row in rows]
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        # Records expire through their own TTL; only the index needs trimming
+        now = time.time() if now is None else now
+        return self.client.zremrangebyscore(self.index_key, "-inf", now)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.name,
+            "log_size": self.client.llen(self.log_key),
+            "log_capacity": self.log_capacity,
+            "active_delegations": self.client.zcard(self.index_key),
+        }
+
+
+def create_handoff_store(log_capacity: Optional[int] = None, backend: Optional[str] = None) -> HandoffStore:
+    """
+    Build the store selected by Config.HANDOFF_STORE_BACKEND
+    (memory unless configured, so the fallback is memory too)
+    """
+    log_capacity = log_capacity or Config.HANDOFF_LOG_CAPACITY
+    return create_store("Handoff", "HANDOFF_STORE_BACKEND", backend or Config.HANDOFF_STORE_BACKEND, {
+        "memory": lambda: MemoryHandoffStore(log_capacity),
+        "sqlite": lambda: SQLiteHandoffStore(Config.HANDOFF_SQLITE_PATH, log_capacity),
+        "redis": lambda client: RedisHandoffStore(client, log_capacity),
+    }, fallback="memory")
\ No newline at end of file
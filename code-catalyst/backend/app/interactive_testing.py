@@ -165,7 +165,7 @@ class InteractiveTestTerminal:
 
     async def test_batch_sms(
         self,
-        recipients: list = ["+1-555-1111", "+1-555-2222", "+1-555-3333"],
+        recipients: list = ["+1-555-201-0001", "+1-555-201-0002", "+1-555-201-0003"],
         message: str = "New affiliate opportunity!",
     ) -> Dict:
         """Test batch SMS endpoint"""
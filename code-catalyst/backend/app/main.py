@@ -5,10 +5,19 @@ Sovereign AI coding agent for WealthBridge ecosystem
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 import logging
 import redis.asyncio as redis
 from .config import Config
+from .handoff_reaper import handoff_reaper
+from .agent_queues import agent_queue_manager
+from .handoff_metrics import handoff_metrics
+from .handoff_events import task_event_broadcaster
+from .dart_repo_review import repo_reviewer
+from .twilio_transport import get_twilio_transport
+from .sms_campaigns import get_campaign_engine
+from .sms_outbox import get_sms_outbox
 
 logger = logging.getLogger(__name__)
 
@@ -46,10 +55,27 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Configuration error: {str(e)}")
         raise
     
+    # Enforce delegation handback deadlines and start agent workers
+    handoff_reaper.start()
+    agent_queue_manager.start()
+    # Push task events (Redis pub/sub when connected, in-process otherwise)
+    task_event_broadcaster.start(redis_client)
+    # Drain the SMS outbox, picking up messages left by the previous run
+    if get_twilio_transport().configured:
+        get_sms_outbox().start()
+    
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down Code Catalyst Backend...")
+    await task_event_broadcaster.stop()
+    await agent_queue_manager.stop()
+    await handoff_reaper.stop()
+    repo_reviewer.shutdown()
+    await get_campaign_engine().stop()
+    if get_twilio_transport().configured:
+        await get_sms_outbox().stop()
+    await get_twilio_transport().aclose()
     if redis_client:
         await redis_client.close()
         logger.info("✅ Redis disconnected")
@@ -109,6 +135,18 @@ async def config_check():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint: handoff latency/queue-wait histograms and queue gauges"""
+    queue_stats = {
+        agent_type.value: agent_queue_manager.get_stats(agent_type)
+        for agent_type in agent_queue_manager.queues
+    }
+    return PlainTextResponse(
+        handoff_metrics.render_prometheus(queue_stats),
+        media_type="text/plain; version=0.0.4",
+    )
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -119,6 +157,7 @@ async def root():
         "description": "AI-powered coding agent for Influwealth",
         "docs": "/docs",
         "health": "/health",
+        "metrics": "/metrics",
         "endpoints": {
             "suggest": "POST /api/suggest",
             "generate": "POST /api/generate",
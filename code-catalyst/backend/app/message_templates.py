@@ -0,0 +1,184 @@
+"""
+Message Templates
+Registry of SMS bodies for every notification type, compiled once at
+import: constants (website, support email) are baked in, each template is
+checked against its segment budget, and batches are rendered column-wise
+in a single pass
+"""
+
+import logging
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+from .config import Config
+from .sms_segments import GSM_BASIC, GSM_MULTI, GSM_SINGLE, count_segments, count_segments_many, fit_segments
+
+logger = logging.getLogger(__name__)
+
+# Values baked into every template at compile time
+CONSTANTS = {
+    "website": Config.WEBSITE,
+    "support_email": Config.SUPPORT_EMAIL,
+    "company_name": Config.COMPANY_NAME,
+}
+# Assumed longest value for fields without an explicit limit
+DEFAULT_FIELD_LIMIT = 20
+
+
+class MessageTemplate:
+    """
+    One notification body with named fields, e.g. "Hi {affiliate_name}"
+
+    The body is compiled to a positional format string, so rendering a
+    batch is str.format mapped over the field columns. Load fails if the
+    body, with every field at its limit, exceeds max_segments.
+    """
+
+    def __init__(self, name: str, body: str, max_segments: int = 1, limits: Optional[Dict[str, int]] = None):
+        self.name = name
+        self.body = body
+        self.max_segments = max_segments
+        self.fields, self._format = self._compile(body)
+        # With plain GSM-7 text and values, a body fits if it is at most this long
+        self._static_gsm = set(self._format.format(*([""] * len(self.fields)))) <= GSM_BASIC
+        self._max_chars = GSM_SINGLE if max_segments == 1 else GSM_MULTI * max_segments
+        self.limits = {field: (limits or {}).get(field, DEFAULT_FIELD_LIMIT) for field in self.fields}
+        self.worst_case_segments = count_segments(
+            self._format.format(*("x" * self.limits[field] for field in self.fields))
+        )
+        if self.worst_case_segments > max_segments:
+            raise ValueError(
+                f"Template '{name}' can reach {self.worst_case_segments} segments "
+                f"(budget {max_segments}) with fields at {self.limits}"
+            )
+
+    @staticmethod
+    def _compile(body: str) -> Tuple[List[str], str]:
+        """Bake in constants and number the remaining fields ("{0}", "{1}", ...)"""
+        fields: List[str] = []
+        parts = []
+        for literal, field, spec, conversion in Formatter().parse(body):
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if spec or conversion:
+                raise ValueError(f"Template field '{field}' must be a plain {{name}}")
+            if field in CONSTANTS:
+                parts.append(str(CONSTANTS[field]).replace("{", "{{").replace("}", "}}"))
+                continue
+            if field not in fields:
+                fields.append(field)
+            parts.append(f"{{{fields.index(field)}}}")
+        return fields, "".join(parts)
+
+    def render(self, **values) -> str:
+        """Body for one recipient"""
+        return self.render_batch([values])[0]
+
+    def render_batch(self, rows: List[Dict]) -> List[str]:
+        """
+        Bodies for many recipients (one dict of field values each)
+
+        Bodies pushed past the segment budget by long values are shortened
+        with fit_segments(); the budget check is a single pass over the batch.
+
+        Raises:
+            ValueError: If a row is missing a field
+        """
+        try:
+            columns = [[str(row[field]) for row in rows] for field in self.fields]
+        except KeyError as e:
+            raise ValueError(f"Template '{self.name}' needs field {e}") from None
+        bodies = list(map(self._format.format, *columns)) if columns else [self._format.format()] * len(rows)
+
+        # Only the values can change the encoding, so check those, not every body
+        if self._static_gsm and set("".join("".join(column) for column in columns)) <= GSM_BASIC:
+            over = [i for i, length in enumerate(map(len, bodies)) if length > self._max_chars]
+        else:
+            over = [i for i, segments in enumerate(count_segments_many(bodies)) if segments > self.max_segments]
+        for i in over:
+            bodies[i] = fit_segments(bodies[i], self.max_segments)
+        return bodies
+
+    def describe(self) -> Dict:
+        return {
+            "name": self.name,
+            "fields": self.fields,
+            "limits": self.limits,
+            "max_segments": self.max_segments,
+            "worst_case_segments": self.worst_case_segments,
+            "body": self.body,
+        }
+
+
+TEMPLATES: Dict[str, MessageTemplate] = {
+    template.name: template
+    for template in (
+        MessageTemplate(
+            "affiliate_onboarding",
+            "Welcome to Influwealth, {affiliate_name}! Your AP2 affiliate account is ready. "
+            "Visit {website} to get started.",
+        ),
+        MessageTemplate(
+            "affiliate_payout",
+            "Hi {affiliate_name}, your AP2 payout is processing! Check your dashboard for details. "
+            "Support: {support_email}",
+        ),
+        MessageTemplate(
+            "affiliate_alert",
+            "Alert for {affiliate_name}: Your affiliate account requires attention. "
+            "Please contact {support_email}",
+        ),
+        MessageTemplate("affiliate_default", "Message from Influwealth"),
+        MessageTemplate(
+            "event_confirmation",
+            "Confirmed! You're registered for {event_name} on {event_date}. Details: {website}",
+            limits={"event_name": 40},
+        ),
+        MessageTemplate(
+            "verification_code",
+            "Your Influwealth verification code is: {code}\n\n"
+            "This code expires in {expires_in_minutes} minutes.\n"
+            "Do not share this code with anyone.",
+            limits={"code": 10, "expires_in_minutes": 4},
+        ),
+        MessageTemplate(
+            "welcome",
+            "Welcome to Influwealth, {client_name}!\n\n"
+            "Your personal wealth dashboard is ready.\n\n"
+            "{portal_url}\n\n"
+            "Questions? Reply HELP or contact support.",
+            max_segments=2,
+            limits={"client_name": 30, "portal_url": 100},
+        ),
+        MessageTemplate("reminder", "Reminder: {reminder_text}", limits={"reminder_text": 140}),
+        MessageTemplate(
+            "reminder_with_link",
+            "Reminder: {reminder_text}\n\n{action_url}",
+            max_segments=2,
+            limits={"reminder_text": 140, "action_url": 100},
+        ),
+    )
+}
+
+
+def get_template(name: str) -> MessageTemplate:
+    """
+    Raises:
+        ValueError: If no template has that name
+    """
+    template = TEMPLATES.get(name)
+    if template is None:
+        raise ValueError(f"Unknown message template: {name}")
+    return template
+
+
+def render(name: str, **values) -> str:
+    return get_template(name).render(**values)
+
+
+def render_batch(name: str, rows: List[Dict]) -> List[str]:
+    return get_template(name).render_batch(rows)
+
+
+logger.info(f"✉️ Message templates compiled: {len(TEMPLATES)}")
@@ -0,0 +1,365 @@
+"""
+Recipient Lists
+Streaming clean-up stage for bulk sends: numbers are normalized to E.164,
+deduplicated and checked against the opt-out (suppression) list before
+any API call is made, and every dropped number is counted by reason
+
+Suppression backend: Config.SMS_SUPPRESSION_BACKEND, sqlite (default) or
+redis (store_backends)
+"""
+
+import hashlib
+import logging
+import math
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .config import Config
+from .store_backends import RedisStore, SQLiteStore, create_store
+
+logger = logging.getLogger(__name__)
+
+# Twilio error 21610: the recipient replied STOP
+OPTED_OUT_ERROR_CODE = 21610
+# Dropped numbers kept per reason for the report
+SAMPLE_SIZE = 10
+
+_FORMATTING = re.compile(r"[\s\-.()/]")
+
+
+def normalize_number(raw: str, default_country_code: Optional[str] = None) -> Optional[str]:
+    """
+    E.164 form of a phone number ("(555) 123-4567" → "+15551234567")
+
+    Numbers without a "+" or "00" prefix are taken as national numbers in
+    default_country_code (Config.SMS_DEFAULT_COUNTRY_CODE).
+
+    Returns:
+        The E.164 number, or None if it can't be a valid one
+    """
+    country = default_country_code or Config.SMS_DEFAULT_COUNTRY_CODE
+    number = _FORMATTING.sub("", str(raw))
+    if number.startswith("+"):
+        digits = number[1:]
+    elif number.startswith("00"):
+        digits = number[2:]
+    elif country == "1" and len(number) == 11 and number.startswith("1"):
+        digits = number  # NANP numbers are often written with the trunk "1"
+    else:
+        digits = country + number.lstrip("0")
+
+    if not digits.isdigit() or digits[0] == "0" or not 8 <= len(digits) <= 15:
+        return None
+    # NANP: ten digits after the country code, area code not starting with 0 or 1
+    if digits[0] == "1" and (len(digits) != 11 or digits[1] in "01"):
+        return None
+    return "+" + digits
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership with a small false positive rate, for lists
+    too large to dedupe in a set (about 1.8 bytes per number at 0.1%)
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> bool:
+        """Add item; returns True if it was (probably) already present"""
+        present = True
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                present = False
+                self._bits[byte] |= 1 << bit
+        return present
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position // 8] & (1 << (position % 8)) for position in self._positions(item))
+
+
+class Deduplicator:
+    """
+    Remembers numbers already seen: an exact set up to `threshold` numbers,
+    then a Bloom filter (a false positive drops a number as a duplicate)
+    """
+
+    def __init__(self, threshold: Optional[int] = None, bloom_capacity: Optional[int] = None):
+        self.threshold = threshold or Config.SMS_DEDUPE_BLOOM_THRESHOLD
+        self.bloom_capacity = bloom_capacity or Config.SMS_DEDUPE_BLOOM_CAPACITY
+        self._seen: Set[str] = set()
+        self._bloom: Optional[BloomFilter] = None
+
+    @property
+    def mode(self) -> str:
+        return "bloom" if self._bloom is not None else "set"
+
+    def seen(self, number: str) -> bool:
+        """Record number; returns True if it was seen before"""
+        if self._bloom is not None:
+            return self._bloom.add(number)
+        if number in self._seen:
+            return True
+        self._seen.add(number)
+        if len(self._seen) > self.threshold:
+            self._bloom = BloomFilter(max(self.bloom_capacity, 2 * self.threshold))
+            for known in self._seen:
+                self._bloom.add(known)
+            self._seen = set()
+            logger.info(f"🧮 Recipient dedupe switched to a Bloom filter after {self.threshold} numbers")
+        return False
+
+
+class SuppressionStore:
+    """Base class for the opt-out list; numbers are stored in E.164 form"""
+
+    name = "base"
+
+    def add(self, numbers: Iterable[str], reason: str = "opt_out") -> int:
+        """Suppress numbers; returns how many were new"""
+        raise NotImplementedError
+
+    def remove(self, number: str) -> bool:
+        raise NotImplementedError
+
+    def suppressed(self, numbers: List[str]) -> Set[str]:
+        """The members of numbers that are suppressed (one round trip per chunk)"""
+        raise NotImplementedError
+
+    def get(self, number: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+
+class SQLiteSuppressionStore(SQLiteStore, SuppressionStore):
+    """One row per suppressed number, with its reason"""
+
+    # Stay under SQLite's bound-parameter limit
+    CHUNK = 500
+
+    def __init__(self, path: str):
+        super().__init__(
+            path,
+            """
+            CREATE TABLE IF NOT EXISTS sms_suppression (
+                number TEXT PRIMARY KEY,
+                reason TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            """,
+        )
+
+    def add(self, numbers: Iterable[str], reason: str = "opt_out") -> int:
+        now = time.time()
+
+        def work():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sms_suppression (number, reason, created_at) VALUES (?, ?, ?)",
+                ((number, reason, now) for number in numbers),
+            )
+            return self._conn.total_changes - before
+
+        return self._transaction(work)
+
+    def remove(self, number: str) -> bool:
+        with self._lock:
+            return self._conn.execute("DELETE FROM sms_suppression WHERE number = ?", (number,)).rowcount > 0
+
+    def suppressed(self, numbers: List[str]) -> Set[str]:
+        found: Set[str] = set()
+        with self._lock:
+            for start in range(0, len(numbers), self.CHUNK):
+                chunk = numbers[start:start + self.CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT number FROM sms_suppression WHERE number IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def get(self, number: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sms_suppression WHERE number = ?", (number,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sms_suppression").fetchone()[0]
+
+
+class RedisSuppressionStore(RedisStore, SuppressionStore):
+    """A set of numbers for bulk membership checks plus a hash of reasons"""
+
+    def __init__(self, client, prefix: str = "sms_suppression"):
+        super().__init__(client, prefix)
+        self._numbers = f"{prefix}:numbers"
+        self._details = f"{prefix}:details"
+
+    def add(self, numbers: Iterable[str], reason: str = "opt_out") -> int:
+        numbers = list(numbers)
+        if not numbers:
+            return 0
+        detail = f"{reason}|{time.time()}"
+        pipe = self.client.pipeline()
+        pipe.sadd(self._numbers, *numbers)
+        # Keep the first reason recorded for a number
+        for number in numbers:
+            pipe.hsetnx(self._details, number, detail)
+        return pipe.execute()[0]
+
+    def remove(self, number: str) -> bool:
+        pipe = self.client.pipeline()
+        pipe.srem(self._numbers, number)
+        pipe.hdel(self._details, number)
+        return pipe.execute()[0] > 0
+
+    def suppressed(self, numbers: List[str]) -> Set[str]:
+        if not numbers:
+            return set()
+        flags = self.client.smismember(self._numbers, numbers)
+        return {number for number, flag in zip(numbers, flags) if flag}
+
+    def get(self, number: str) -> Optional[Dict]:
+        detail = self.client.hget(self._details, number)
+        if detail is None:
+            return None
+        reason, created_at = detail.rsplit("|", 1)
+        return {"number": number, "reason": reason, "created_at": float(created_at)}
+
+    def count(self) -> int:
+        return self.client.scard(self._numbers)
+
+
+def create_suppression_store(backend: Optional[str] = None) -> SuppressionStore:
+    """Build the store selected by Config.SMS_SUPPRESSION_BACKEND"""
+    return create_store("SMS suppression list", "SMS_SUPPRESSION_BACKEND", backend or Config.SMS_SUPPRESSION_BACKEND, {
+        "sqlite": lambda: SQLiteSuppressionStore(Config.SMS_SUPPRESSION_SQLITE_PATH),
+        "redis": RedisSuppressionStore,
+    })
+
+
+class RecipientFilter:
+    """
+    One pass over a recipient list (any iterable, so it can stream)
+
+    Numbers are normalized and deduplicated as they arrive, then checked
+    against the suppression list a chunk at a time; clean numbers come out
+    in input order. `report` counts what was dropped and why.
+    """
+
+    def __init__(
+        self,
+        suppression: Optional[SuppressionStore] = None,
+        default_country_code: Optional[str] = None,
+        dedupe_threshold: Optional[int] = None,
+        chunk_size: int = 1000,
+    ):
+        self.suppression = suppression
+        self.default_country_code = default_country_code
+        self.chunk_size = chunk_size
+        self._dedupe = Deduplicator(dedupe_threshold)
+        self.report = {
+            "received": 0,
+            "accepted": 0,
+            "dropped": {"invalid": 0, "duplicate": 0, "suppressed": 0},
+            "samples": {"invalid": [], "duplicate": [], "suppressed": []},
+        }
+
+    def _drop(self, reason: str, number: str):
+        self.report["dropped"][reason] += 1
+        if len(self.report["samples"][reason]) < SAMPLE_SIZE:
+            self.report["samples"][reason].append(number)
+
+    def _screen(self, chunk: List[Tuple[str, object]]) -> List[Tuple[str, object]]:
+        blocked = self.suppression.suppressed([number for number, _ in chunk]) if self.suppression is not None else set()
+        for number in blocked:
+            self._drop("suppressed", number)
+        accepted = [(number, item) for number, item in chunk if number not in blocked]
+        self.report["accepted"] += len(accepted)
+        return accepted
+
+    def _run(self, items: Iterable, number_of) -> Iterator[Tuple[str, object]]:
+        chunk: List[Tuple[str, object]] = []
+        for item in items:
+            self.report["received"] += 1
+            raw = number_of(item)
+            number = normalize_number(raw, self.default_country_code) if raw else None
+            if number is None:
+                self._drop("invalid", str(raw))
+            elif self._dedupe.seen(number):
+                self._drop("duplicate", number)
+            else:
+                chunk.append((number, item))
+                if len(chunk) >= self.chunk_size:
+                    yield from self._screen(chunk)
+                    chunk = []
+        if chunk:
+            yield from self._screen(chunk)
+        self.report["dedupe"] = self._dedupe.mode
+
+    def filter(self, numbers: Iterable[str]) -> Iterator[str]:
+        """Clean numbers, in E.164 form"""
+        return (number for number, _ in self._run(numbers, lambda raw: raw))
+
+    def filter_rows(self, rows: Iterable[Dict], field: str = "to") -> Iterator[Dict]:
+        """Rows whose `field` is a clean number, with that field rewritten to E.164"""
+        return ({**row, field: number} for number, row in self._run(rows, lambda row: row.get(field)))
+
+
+def _log_report(report: Dict):
+    if report["received"] != report["accepted"]:
+        logger.info(f"🧹 Recipients: {report['accepted']}/{report['received']} kept, dropped {report['dropped']}")
+
+
+def clean_recipients(
+    numbers: Iterable[str],
+    suppression: Optional[SuppressionStore] = None,
+) -> Tuple[List[str], Dict]:
+    """
+    Normalize, dedupe and screen a recipient list against the suppression list
+
+    Returns:
+        (numbers to send to, report); the report has {received, accepted,
+        dropped: {invalid, duplicate, suppressed}, samples, dedupe}
+    """
+    recipient_filter = RecipientFilter(suppression if suppression is not None else get_suppression_store())
+    accepted = list(recipient_filter.filter(numbers))
+    _log_report(recipient_filter.report)
+    return accepted, recipient_filter.report
+
+
+def clean_recipient_rows(
+    rows: Iterable[Dict],
+    suppression: Optional[SuppressionStore] = None,
+) -> Tuple[List[Dict], Dict]:
+    """clean_recipients() for per-recipient dicts keyed by "to" (template sends)"""
+    recipient_filter = RecipientFilter(suppression if suppression is not None else get_suppression_store())
+    accepted = list(recipient_filter.filter_rows(rows))
+    _log_report(recipient_filter.report)
+    return accepted, recipient_filter.report
+
+
+# Singleton instance
+_suppression_store = None
+
+
+def get_suppression_store() -> SuppressionStore:
+    """Get or create the suppression store (chosen by SMS_SUPPRESSION_BACKEND)"""
+    global _suppression_store
+    if _suppression_store is None:
+        _suppression_store = create_suppression_store()
+    return _suppression_store
@@ -0,0 +1,459 @@
+"""
+SMS Campaigns
+Bulk sends from a streamed CSV / JSONL upload of recipients and
+personalization fields. The upload is spooled to disk as it arrives, then
+processed as a generator pipeline:
+
+    read rows → normalize / dedupe / suppress → render → rate-limit → send → record
+
+Only one chunk of rows and the in-flight sends are held in memory, so a
+campaign of 1,000,000 rows uses the same memory as one of 100. Progress is
+written to the campaign store every SMS_CAMPAIGN_PROGRESS_SECONDS.
+
+Backend: Config.SMS_CAMPAIGN_BACKEND, sqlite (default) or redis (store_backends)
+"""
+
+import asyncio
+import codecs
+import copy
+import csv
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import Config
+from .message_templates import get_template
+from .recipients import SAMPLE_SIZE, RecipientFilter, SuppressionStore, get_suppression_store
+from .store_backends import RedisStore, SQLiteStore, create_store
+from .twilio_service import get_twilio_service
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+# Column holding the phone number when the upload doesn't name one
+PHONE_COLUMNS = ("to", "phone", "phone_number", "mobile")
+FINAL_STATUSES = ("completed", "failed", "cancelled", "interrupted")
+# Campaign IDs name the spool file, so keep them to safe characters
+CAMPAIGN_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+class CampaignStore:
+    """Base class for campaign progress records (one JSON document per campaign)"""
+
+    name = "base"
+
+    def put(self, record: Dict):
+        raise NotImplementedError
+
+    def get(self, campaign_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+
+class SQLiteCampaignStore(SQLiteStore, CampaignStore):
+    """One row per campaign holding its JSON record"""
+
+    def __init__(self, path: str):
+        super().__init__(
+            path,
+            """
+            CREATE TABLE IF NOT EXISTS sms_campaigns (
+                campaign_id TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """,
+        )
+
+    def put(self, record: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sms_campaigns (campaign_id, record, updated_at) VALUES (?, ?, ?)",
+                (record["campaign_id"], json.dumps(record), time.time()),
+            )
+
+    def get(self, campaign_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM sms_campaigns WHERE campaign_id = ?", (campaign_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class RedisCampaignStore(RedisStore, CampaignStore):
+    """One JSON string per campaign"""
+
+    def __init__(self, client, prefix: str = "sms_campaign"):
+        super().__init__(client, prefix)
+
+    def put(self, record: Dict):
+        self.client.set(f"{self.prefix}:{record['campaign_id']}", json.dumps(record))
+
+    def get(self, campaign_id: str) -> Optional[Dict]:
+        raw = self.client.get(f"{self.prefix}:{campaign_id}")
+        return json.loads(raw) if raw else None
+
+
+def create_campaign_store(backend: Optional[str] = None) -> CampaignStore:
+    """Build the store selected by Config.SMS_CAMPAIGN_BACKEND"""
+    return create_store("SMS campaigns", "SMS_CAMPAIGN_BACKEND", backend or Config.SMS_CAMPAIGN_BACKEND, {
+        "sqlite": lambda: SQLiteCampaignStore(Config.SMS_CAMPAIGN_SQLITE_PATH),
+        "redis": RedisCampaignStore,
+    })
+
+
+def iter_rows(path: str, fmt: str, on_bytes: Optional[Callable[[int], None]] = None) -> Iterator[Dict]:
+    """
+    Rows of an uploaded CSV (header row first) or JSONL file, one at a time
+
+    on_bytes is called with the number of bytes consumed after each line,
+    for progress.
+
+    Raises:
+        ValueError: On a JSONL line that is not a JSON object
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+
+    def lines() -> Iterator[str]:
+        with open(path, "rb") as upload:
+            for raw in upload:
+                if on_bytes:
+                    on_bytes(len(raw))
+                yield decoder.decode(raw)
+
+    if fmt == "csv":
+        for row in csv.DictReader(lines()):
+            # Short rows leave fields out (not blank), so templates needing them fail the row
+            yield {key.strip(): value.strip() for key, value in row.items() if key and value is not None}
+        return
+
+    for number, line in enumerate(lines(), 1):
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        if not isinstance(row, dict):
+            raise ValueError(f"JSONL line {number} is not an object")
+        yield row
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CampaignEngine:
+    """
+    Receives campaign uploads and runs each as a background pipeline
+
+    Sends go through TwilioService._send_sms, so they are paced by the
+    sender pool and tracked for delivery status under the campaign ID;
+    `concurrency` workers pull from a bounded queue fed by the pipeline.
+    """
+
+    def __init__(
+        self,
+        store: Optional[CampaignStore] = None,
+        upload_dir: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        chunk_size: int = 500,
+        progress_seconds: Optional[float] = None,
+        service=None,
+        suppression: Optional[SuppressionStore] = None,
+    ):
+        self._store = store
+        self._suppression = suppression
+        self.upload_dir = upload_dir or Config.SMS_CAMPAIGN_UPLOAD_DIR
+        self.concurrency = max(1, concurrency or Config.TWILIO_BATCH_CONCURRENCY)
+        self.chunk_size = chunk_size
+        self.progress_seconds = Config.SMS_CAMPAIGN_PROGRESS_SECONDS if progress_seconds is None else progress_seconds
+        self._service = service
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancelled = set()
+
+    @property
+    def store(self) -> CampaignStore:
+        if self._store is None:
+            self._store = create_campaign_store()
+        return self._store
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = get_twilio_service()
+        return self._service
+
+    def _upload_path(self, campaign_id: str) -> str:
+        return os.path.join(self.upload_dir, f"{campaign_id}.upload")
+
+    async def receive(
+        self,
+        chunks: AsyncIterator[bytes],
+        fmt: str,
+        message: Optional[str] = None,
+        template: Optional[str] = None,
+        phone_field: Optional[str] = None,
+        from_number: Optional[str] = None,
+        campaign_id: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Dict:
+        """
+        Spool an upload to disk (never holding more than one chunk) and
+        record the campaign as queued; call start() to run it
+
+        Raises:
+            ValueError: On a bad format, message/template choice, a reused
+                campaign_id, or an upload over max_bytes
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if bool(message) == bool(template):
+            raise ValueError("Give either a message or a template")
+        if template:
+            get_template(template)  # unknown template → ValueError
+        campaign_id = campaign_id or f"campaign-{uuid.uuid4().hex[:12]}"
+        if not CAMPAIGN_ID.fullmatch(campaign_id):
+            raise ValueError("campaign_id may only use letters, digits, '_', '-' and '.' (max 64)")
+        if await asyncio.to_thread(self.store.get, campaign_id) is not None:
+            raise ValueError(f"Campaign {campaign_id} already exists")
+        limit = max_bytes or Config.SMS_CAMPAIGN_MAX_UPLOAD_MB * 1024 * 1024
+
+        os.makedirs(self.upload_dir, exist_ok=True)
+        path = self._upload_path(campaign_id)
+        size = 0
+        try:
+            with open(path, "wb") as spool:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > limit:
+                        raise ValueError(f"Upload exceeds {limit} bytes")
+                    spool.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+
+        record = {
+            "campaign_id": campaign_id,
+            "status": "queued",
+            "format": fmt,
+            "template": template,
+            "message": message,
+            "phone_field": phone_field,
+            "from_number": from_number,
+            "upload_bytes": size,
+            "bytes_read": 0,
+            "progress": 0.0,
+            "rows": 0,
+            "sent": 0,
+            "failed": 0,
+            "skipped": 0,
+            "recipients": None,
+            "errors": [],
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        await asyncio.to_thread(self.store.put, record)
+        logger.info(f"📤 Campaign {campaign_id} uploaded: {size} bytes of {fmt}")
+        return record
+
+    def start(self, campaign_id: str) -> asyncio.Task:
+        """Run a received campaign in the background"""
+        task = asyncio.create_task(self.run(campaign_id))
+        self._tasks[campaign_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(campaign_id, None))
+        return task
+
+    def get(self, campaign_id: str) -> Optional[Dict]:
+        return self.store.get(campaign_id)
+
+    def cancel(self, campaign_id: str) -> bool:
+        """Stop a running campaign; messages already sent stay sent"""
+        task = self._tasks.get(campaign_id)
+        if task is None:
+            return False
+        self._cancelled.add(campaign_id)
+        task.cancel()
+        return True
+
+    async def stop(self):
+        """Interrupt running campaigns (on shutdown); their progress is kept"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, campaign_id: str) -> Dict:
+        """Process a received campaign end to end; returns the final record"""
+        record = await asyncio.to_thread(self.store.get, campaign_id)
+        record.update(status="running", started_at=datetime.utcnow().isoformat())
+        await asyncio.to_thread(self.store.put, record)
+        path = self._upload_path(campaign_id)
+        started = time.monotonic()
+
+        try:
+            await self._process(record, path)
+            record["status"] = "completed"
+        except asyncio.CancelledError:
+            record["status"] = "cancelled" if campaign_id in self._cancelled else "interrupted"
+            self._cancelled.discard(campaign_id)
+            raise
+        except Exception as e:
+            record["status"] = "failed"
+            self._error(record, None, f"{type(e).__name__}: {e}")
+            logger.error(f"❌ Campaign {campaign_id} failed: {str(e)}")
+        finally:
+            record["finished_at"] = datetime.utcnow().isoformat()
+            record["duration_seconds"] = round(time.monotonic() - started, 3)
+            await asyncio.to_thread(self.store.put, record)
+            if os.path.exists(path):
+                os.remove(path)
+
+        logger.info(
+            f"📊 Campaign {campaign_id} {record['status']}: {record['sent']} sent, "
+            f"{record['failed']} failed of {record['rows']} rows in {record['duration_seconds']}s"
+        )
+        return record
+
+    @staticmethod
+    def _error(record: Dict, to: Optional[str], error: str):
+        if len(record["errors"]) < SAMPLE_SIZE:
+            record["errors"].append({"to": to, "error": error})
+
+    async def _process(self, record: Dict, path: str):
+        """
+        read → normalize → render → send, with the store updated as it goes
+        Reading, filtering (suppression lookups) and rendering run in a
+        worker thread a chunk at a time; the sends stay on the event loop
+        """
+        total = record["upload_bytes"] or 1
+        last_saved = time.monotonic()
+
+        def on_bytes(count: int):
+            record["bytes_read"] += count
+            record["progress"] = round(min(record["bytes_read"] / total, 1.0) * 100, 1)
+
+        def counted(rows: Iterable[Dict]) -> Iterator[Dict]:
+            for row in rows:
+                record["rows"] += 1
+                yield row
+
+        rows = counted(iter_rows(path, record["format"], on_bytes))
+        first = await _in_thread(next, rows, None)
+        if first is None:
+            return
+        phone_field = record["phone_field"] or next((column for column in PHONE_COLUMNS if column in first), None)
+        if phone_field is None:
+            raise ValueError(f"No phone column: name one with phone_field or use one of {', '.join(PHONE_COLUMNS)}")
+        record["phone_field"] = phone_field
+
+        recipient_filter = RecipientFilter(
+            self._suppression or get_suppression_store(), dedupe_threshold=Config.SMS_CAMPAIGN_DEDUPE_SET_LIMIT,
+        )
+        record["recipients"] = recipient_filter.report
+        clean = recipient_filter.filter_rows(_prepend(first, rows), phone_field)
+        messages = self._render(clean, record, phone_field)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue, record)) for _ in range(self.concurrency)]
+        try:
+            while True:
+                chunk = await _in_thread(list, islice(messages, self.chunk_size))
+                if not chunk:
+                    break
+                for to, body, error in chunk:
+                    if body is None:
+                        record["failed"] += 1
+                        self._error(record, to, error)
+                    else:
+                        await queue.put((to, body))
+                if time.monotonic() - last_saved >= self.progress_seconds:
+                    # Snapshot taken between pipeline steps, so no thread is changing it
+                    await asyncio.to_thread(self.store.put, copy.deepcopy(record))
+                    last_saved = time.monotonic()
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    def _render(self, rows: Iterable[Dict], record: Dict, phone_field: str) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+        """
+        (to, body, error) triples, rendering templates a chunk at a time;
+        body is None for a row the template can't render (the loop counts
+        those, so the pipeline thread never writes to the send counters)
+        """
+        if record["message"]:
+            for row in rows:
+                yield row[phone_field], record["message"], None
+            return
+
+        template = get_template(record["template"])
+        for chunk in chunked(rows, self.chunk_size):
+            try:
+                bodies = template.render_batch(chunk)
+            except ValueError:
+                # A row is missing a field: render one by one to fail just those rows
+                for row in chunk:
+                    try:
+                        yield row[phone_field], template.render(**row), None
+                    except ValueError as e:
+                        yield row[phone_field], None, str(e)
+                continue
+            for row, body in zip(chunk, bodies):
+                yield row[phone_field], body, None
+
+    async def _worker(self, queue: asyncio.Queue, record: Dict):
+        campaign_id = record["campaign_id"]
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            to, body = item
+            result = await self.service._send_sms(to, body, record["from_number"], campaign_id=campaign_id, bulk=True)
+            if result["status"] == "sent":
+                record["sent"] += 1
+            elif result["status"] == "skipped":
+                record["skipped"] += 1
+            else:
+                record["failed"] += 1
+                self._error(record, to, result.get("error", "send failed"))
+
+
+def _prepend(first: Dict, rows: Iterator[Dict]) -> Iterator[Dict]:
+    yield first
+    yield from rows
+
+
+async def _in_thread(fn, *args):
+    """
+    Run a pipeline step in a worker thread; if the campaign is cancelled
+    meanwhile, let the step finish so it can't touch the record afterwards
+    """
+    step = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    try:
+        return await asyncio.shield(step)
+    except asyncio.CancelledError:
+        await asyncio.wait([step])
+        raise
+
+
+# Singleton instance
+_campaign_engine = None
+
+
+def get_campaign_engine() -> CampaignEngine:
+    """Get or create the campaign engine (store chosen by SMS_CAMPAIGN_BACKEND)"""
+    global _campaign_engine
+    if _campaign_engine is None:
+        _campaign_engine = CampaignEngine()
+    return _campaign_engine
@@ -0,0 +1,641 @@
+"""
+Durable SMS Outbox
+Outbound messages are written to a store before they are sent, keyed by
+an idempotency key, and a worker drains the store with exponential-backoff
+retries, so failures and restarts don't lose (or double-send) messages
+
+Backend: Config.SMS_OUTBOX_BACKEND, sqlite (default) or redis (store_backends)
+
+Message lifecycle: pending → sending → sent | failed. A "sending" row
+carries a lease; if the worker dies mid-send the lease expires and the
+message is reconciled against Twilio's message log before any resend.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from .config import Config
+from .recipients import OPTED_OUT_ERROR_CODE, get_suppression_store
+from .sms_status import get_delivery_tracker
+from .store_backends import RedisStore, SQLiteStore, create_store
+from .twilio_transport import TwilioAPIError
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("pending", "sending", "sent", "failed")
+# Columns every outbox record carries
+FIELDS = (
+    "id", "batch_id", "to_number", "body", "from_number", "status", "attempts",
+    "next_attempt_at", "lease_until", "claimed_at", "sent_from", "sid", "last_error",
+    "created_at", "updated_at",
+)
+# Seconds between store polls when idle (other workers may have enqueued)
+POLL_SECONDS = 5.0
+# Connection failures where the request never reached Twilio
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def new_message(batch_id: str, to_number: str, body: str, from_number: Optional[str] = None) -> Dict:
+    """Outbox record for one recipient; the id is the idempotency key"""
+    now = time.time()
+    return {
+        "id": f"{batch_id}:{to_number}",
+        "batch_id": batch_id,
+        "to_number": to_number,
+        "body": body,
+        "from_number": from_number,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "lease_until": None,
+        "claimed_at": None,
+        "sent_from": None,
+        "sid": None,
+        "last_error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+class OutboxStore:
+    """Base class for outbox storage; every transition is atomic across workers"""
+
+    name = "base"
+
+    def enqueue(self, records: List[Dict]) -> int:
+        """Insert records whose id is new; returns how many were inserted"""
+        raise NotImplementedError
+
+    def get(self, message_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def claim_due(self, limit: int, now: float, lease_seconds: float) -> List[Dict]:
+        """Move up to limit due pending messages to sending (attempts + 1)"""
+        raise NotImplementedError
+
+    def claim_expired(self, limit: int, now: float, lease_seconds: float) -> List[Dict]:
+        """Re-lease up to limit sending messages whose lease ran out"""
+        raise NotImplementedError
+
+    def update(self, message_id: str, fields: Dict) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def next_due(self) -> Optional[float]:
+        """Earliest next_attempt_at (pending) or lease_until (sending)"""
+        raise NotImplementedError
+
+    def counts(self, batch_id: Optional[str] = None) -> Dict[str, int]:
+        raise NotImplementedError
+
+
+class SQLiteOutboxStore(SQLiteStore, OutboxStore):
+    """Claims run inside BEGIN IMMEDIATE, so two workers never claim the same row"""
+
+    def __init__(self, path: str):
+        super().__init__(
+            path,
+            """
+            CREATE TABLE IF NOT EXISTS sms_outbox (
+                id TEXT PRIMARY KEY,
+                batch_id TEXT NOT NULL,
+                to_number TEXT NOT NULL,
+                body TEXT NOT NULL,
+                from_number TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL,
+                lease_until REAL,
+                claimed_at REAL,
+                sent_from TEXT,
+                sid TEXT,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sms_outbox_due ON sms_outbox (status, next_attempt_at);
+            CREATE INDEX IF NOT EXISTS idx_sms_outbox_lease ON sms_outbox (status, lease_until);
+            CREATE INDEX IF NOT EXISTS idx_sms_outbox_batch ON sms_outbox (batch_id, status);
+            """,
+        )
+
+    def enqueue(self, records: List[Dict]) -> int:
+        columns = ", ".join(FIELDS)
+        placeholders = ", ".join("?" for _ in FIELDS)
+
+        def work():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO sms_outbox ({columns}) VALUES ({placeholders})",
+                ([record[field] for field in FIELDS] for record in records),
+            )
+            return self._conn.total_changes - before
+
+        return self._transaction(work)
+
+    def get(self, message_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sms_outbox WHERE id = ?", (message_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _claim(self, where: str, params: tuple, limit: int, now: float, lease_seconds: float, attempt: bool):
+        def work():
+            rows = self._conn.execute(
+                f"SELECT * FROM sms_outbox WHERE {where} LIMIT ?", (*params, limit)
+            ).fetchall()
+            claimed = []
+            for row in rows:
+                record = dict(row)
+                record.update(
+                    status="sending",
+                    attempts=record["attempts"] + attempt,
+                    lease_until=now + lease_seconds,
+                    claimed_at=now if attempt else record["claimed_at"],
+                    updated_at=now,
+                )
+                self._conn.execute(
+                    "UPDATE sms_outbox SET status = ?, attempts = ?, lease_until = ?, claimed_at = ?, updated_at = ? WHERE id = ?",
+                    (record["status"], record["attempts"], record["lease_until"], record["claimed_at"], now, record["id"]),
+                )
+                claimed.append(record)
+            return claimed
+
+        return self._transaction(work)
+
+    def claim_due(self, limit: int, now: float, lease_seconds: float) -> List[Dict]:
+        return self._claim(
+            "status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at",
+            (now,), limit, now, lease_seconds, attempt=True,
+        )
+
+    def claim_expired(self, limit: int, now: float, lease_seconds: float) -> List[Dict]:
+        return self._claim(
+            "status = 'sending' AND lease_until <= ? ORDER BY lease_until",
+            (now,), limit, now, lease_seconds, attempt=False,
+        )
+
+    def update(self, message_id: str, fields: Dict) -> Optional[Dict]:
+        fields = {**fields, "updated_at": time.time()}
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE sms_outbox SET {assignments} WHERE id = ?", (*fields.values(), message_id)
+            )
+        return self.get(message_id)
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT MIN(due) FROM (
+                    SELECT MIN(next_attempt_at) AS due FROM sms_outbox WHERE status = 'pending'
+                    UNION ALL
+                    SELECT MIN(lease_until) FROM sms_outbox WHERE status = 'sending'
+                )
+                """
+            ).fetchone()
+        return row[0]
+
+    def counts(self, batch_id: Optional[str] = None) -> Dict[str, int]:
+        query = "SELECT status, COUNT(*) FROM sms_outbox"
+        params: tuple = ()
+        if batch_id is not None:
+            query += " WHERE batch_id = ?"
+            params = (batch_id,)
+        with self._lock:
+            rows = self._conn.execute(query + " GROUP BY status", params).fetchall()
+        return {status: 0 for status in STATUSES} | {row[0]: row[1] for row in rows}
+
+
+class RedisOutboxStore(RedisStore, OutboxStore):
+    """
+    Records are hashes; pending ids sit in a sorted set scored on
+    next_attempt_at and sending ids in one scored on lease_until. Every
+    transition WATCHes the record's hash and writes it, its index entries
+    and the status counts in one MULTI, so a crash applies all or nothing
+    and only one of two racing workers can claim a message.
+    """
+
+    def __init__(self, client, prefix: str = "sms_outbox"):
+        super().__init__(client, prefix)
+        self.due_key = f"{prefix}:due"
+        self.lease_key = f"{prefix}:leases"
+        self.counts_key = f"{prefix}:counts"
+
+    def _key(self, message_id: str) -> str:
+        return f"{self.prefix}:msg:{message_id}"
+
+    def _batch_key(self, batch_id: str) -> str:
+        return f"{self.prefix}:batch:{batch_id}"
+
+    @staticmethod
+    def _encode(fields: Dict) -> Dict:
+        return {name: json.dumps(value) for name, value in fields.items()}
+
+    @staticmethod
+    def _decode(raw: Dict) -> Optional[Dict]:
+        return {name: json.loads(value) for name, value in raw.items()} if raw else None
+
+    def enqueue(self, records: List[Dict]) -> int:
+        import redis
+
+        inserted = 0
+        with self.client.pipeline() as pipe:
+            for record in records:
+                key = self._key(record["id"])
+                while True:
+                    try:
+                        pipe.watch(key)
+                        if pipe.exists(key):
+                            pipe.reset()
+                            break
+                        pipe.multi()
+                        pipe.hset(key, mapping=self._encode(record))
+                        pipe.zadd(self.due_key, {record["id"]: record["next_attempt_at"]})
+                        pipe.sadd(self._batch_key(record["batch_id"]), record["id"])
+                        pipe.hincrby(self.counts_key, "pending", 1)
+                        pipe.execute()
+                        inserted += 1
+                        break
+                    except redis.WatchError:
+                        # Enqueued concurrently; re-check and skip it
+                        continue
+        return inserted
+
+    def get(self, message_id: str) -> Optional[Dict]:
+        return self._decode(self.client.hgetall(self._key(message_id)))
+
+    def _transition(self, message_id: str, change) -> Optional[Dict]:
+        """
+        Apply change(pipe, record) -> fields (None to leave the record as
+        is) atomically: the hash is WATCHed while change reads it, then the
+        fields, due/lease indexes and status counts are written in one MULTI
+        """
+        import redis
+
+        key = self._key(message_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    record = self._decode(pipe.hgetall(key))
+                    fields = change(pipe, record) if record else None
+                    if fields is None:
+                        pipe.unwatch()
+                        return None
+                    pipe.multi()
+                    pipe.hset(key, mapping=self._encode(fields))
+                    status = fields.get("status", record["status"])
+                    if status != record["status"]:
+                        pipe.hincrby(self.counts_key, record["status"], -1)
+                        pipe.hincrby(self.counts_key, status, 1)
+                    if status == "pending":
+                        pipe.zrem(self.lease_key, message_id)
+                        pipe.zadd(self.due_key, {message_id: fields.get("next_attempt_at", record["next_attempt_at"])})
+                    elif status == "sending":
+                        pipe.zrem(self.due_key, message_id)
+                        pipe.zadd(self.lease_key, {message_id: fields.get("lease_until", record["lease_until"])})
+                    else:
+                        pipe.zrem(self.due_key, message_id)
+                        pipe.zrem(self.lease_key, message_id)
+                    pipe.execute()
+                    return {**record, **fields}
+                except redis.WatchError:
+                    # Another worker changed the record; re-read and decide again
+                    continue
+
+    def _claim(self, index_key: str, limit: int, now: float, lease_seconds: float, attempt: bool) -> List[Dict]:
+        def lease(pipe, record: Dict) -> Optional[Dict]:
+            # Still in the index and due? (gone if another worker claimed it first)
+            score = pipe.zscore(index_key, record["id"])
+            if score is None or score > now:
+                return None
+            return {
+                "status": "sending",
+                "attempts": record["attempts"] + attempt,
+                "lease_until": now + lease_seconds,
+                "claimed_at": now if attempt else record["claimed_at"],
+                "updated_at": now,
+            }
+
+        claimed = []
+        for message_id in self.client.zrangebyscore(index_key, "-inf", now, start=0, num=limit):
+            record = self._transition(message_id, lease)
+            if record is not None:
+                claimed.append(record)
+        return claimed
+
+    def claim_due(self, limit: int, now: float, lease_seconds: float) -> List[Dict]:
+        return self._claim(self.due_key, limit, now, lease_seconds, attempt=True)
+
+    def claim_expired(self, limit: int, now: float, lease_seconds: float) -> List[Dict]:
+        return self._claim(self.lease_key, limit, now, lease_seconds, attempt=False)
+
+    def update(self, message_id: str, fields: Dict) -> Optional[Dict]:
+        fields = {**fields, "updated_at": time.time()}
+        return self._transition(message_id, lambda pipe, record: fields)
+
+    def next_due(self) -> Optional[float]:
+        heads = [
+            entries[0][1]
+            for entries in (
+                self.client.zrange(self.due_key, 0, 0, withscores=True),
+                self.client.zrange(self.lease_key, 0, 0, withscores=True),
+            )
+            if entries
+        ]
+        return min(heads) if heads else None
+
+    def counts(self, batch_id: Optional[str] = None) -> Dict[str, int]:
+        counts = {status: 0 for status in STATUSES}
+        if batch_id is None:
+            counts.update({status: int(n) for status, n in self.client.hgetall(self.counts_key).items()})
+            return counts
+        ids = list(self.client.smembers(self._batch_key(batch_id)))
+        for start in range(0, len(ids), 500):
+            pipe = self.client.pipeline()
+            for message_id in ids[start:start + 500]:
+                pipe.hget(self._key(message_id), "status")
+            for raw in pipe.execute():
+                if raw:
+                    counts[json.loads(raw)] += 1
+        return counts
+
+
+def create_outbox_store(backend: Optional[str] = None) -> OutboxStore:
+    """Build the store selected by Config.SMS_OUTBOX_BACKEND"""
+    return create_store("SMS outbox", "SMS_OUTBOX_BACKEND", backend or Config.SMS_OUTBOX_BACKEND, {
+        "sqlite": lambda: SQLiteOutboxStore(Config.SMS_OUTBOX_SQLITE_PATH),
+        "redis": RedisOutboxStore,
+    })
+
+
+class SmsOutbox:
+    """
+    Outbox plus the worker that drains it
+
+    The worker keeps up to `concurrency` messages in flight, waits for a
+    sender-pool slot before each send, and retries failures with jittered
+    exponential backoff up to max_attempts. Ambiguous failures (the request
+    may have reached Twilio) are left to lease expiry and reconciliation.
+    """
+
+    def __init__(
+        self,
+        store: OutboxStore,
+        concurrency: int = 20,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 2.0,
+        retry_max_seconds: float = 300.0,
+        lease_seconds: float = 60.0,
+        service=None,
+    ):
+        self.store = store
+        # Sends through service.client / service.senders (default: the TwilioService singleton)
+        self.service = service
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.lease_seconds = lease_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {"sent": 0, "retried": 0, "failed": 0, "reconciled": 0}
+
+    def enqueue(
+        self,
+        recipients: List[str],
+        message: str,
+        from_number: Optional[str] = None,
+        batch_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        Record one message per recipient; re-submitting a batch_id skips
+        recipients already in the outbox
+
+        Returns:
+            Dict with: {batch_id, queued, duplicates, total}
+        """
+        batch_id = batch_id or uuid.uuid4().hex
+        records = {}
+        for to_number in recipients:
+            record = new_message(batch_id, to_number, message, from_number)
+            records.setdefault(record["id"], record)
+        queued = self.store.enqueue(list(records.values()))
+        self.wake()
+        logger.info(f"📥 Outbox batch {batch_id}: {queued} queued, {len(recipients) - queued} duplicates")
+        return {
+            "batch_id": batch_id,
+            "queued": queued,
+            "duplicates": len(recipients) - queued,
+            "total": len(recipients),
+        }
+
+    def wake(self):
+        """Nudge the worker; safe to call from any thread (enqueue runs in one)"""
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def batch_status(self, batch_id: str) -> Optional[Dict]:
+        counts = self.store.counts(batch_id)
+        total = sum(counts.values())
+        if not total:
+            return None
+        return {
+            "batch_id": batch_id,
+            "total": total,
+            "done": counts["sent"] + counts["failed"] == total,
+            **counts,
+        }
+
+    def stats(self) -> Dict:
+        next_due = self.store.next_due()
+        return {
+            "backend": self.store.name,
+            "running": self._task is not None and not self._task.done(),
+            "counts": self.store.counts(),
+            "next_due_in": max(0.0, round(next_due - time.time(), 3)) if next_due is not None else None,
+            **self.metrics,
+        }
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** max(0, attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _update(self, message_id: str, fields: Dict):
+        await asyncio.to_thread(self.store.update, message_id, fields)
+
+    async def _retry_or_fail(self, record: Dict, error: str):
+        if record["attempts"] >= self.max_attempts:
+            await self._update(record["id"], {"status": "failed", "last_error": error, "lease_until": None})
+            self.metrics["failed"] += 1
+            logger.error(f"❌ Outbox gave up on {record['id']} after {record['attempts']} attempts: {error}")
+            return
+        delay = self._backoff(record["attempts"])
+        await self._update(record["id"], {
+            "status": "pending",
+            "last_error": error,
+            "next_attempt_at": time.time() + delay,
+            "lease_until": None,
+        })
+        self.metrics["retried"] += 1
+        logger.warning(f"⚠️ Outbox retry {record['id']} in {delay:.1f}s: {error}")
+
+    async def deliver(self, record: Dict, service) -> None:
+        """Send one claimed message and record the outcome"""
+        try:
+            from_number = await service.senders.acquire(record["from_number"], bulk=True)
+            # Persist the sender (needed to reconcile) and restart the lease after the pacing wait
+            await self._update(record["id"], {"sent_from": from_number, "lease_until": time.time() + self.lease_seconds})
+            tracker = get_delivery_tracker()
+            message = await service.client.create_message(
+                to=record["to_number"],
+                from_=from_number,
+                body=record["body"],
+                **tracker.callback_params(record["batch_id"]),
+            )
+        except TwilioAPIError as e:
+            if e.status == 429 or e.status >= 500:
+                await self._retry_or_fail(record, str(e))
+            else:
+                # Rejected outright (bad number, unverified sender...): retrying won't help
+                await self._update(record["id"], {"status": "failed", "last_error": str(e), "lease_until": None})
+                self.metrics["failed"] += 1
+                logger.error(f"❌ Outbox message {record['id']} rejected: {str(e)}")
+                if e.code == OPTED_OUT_ERROR_CODE:
+                    await asyncio.to_thread(get_suppression_store().add, [record["to_number"]], reason="opt_out")
+        except _NOT_SENT_ERRORS as e:
+            await self._retry_or_fail(record, f"{type(e).__name__}: {e}")
+        except Exception as e:
+            # May have reached Twilio: reconcile once the lease (shortened to the backoff) runs out
+            delay = self._backoff(record["attempts"])
+            await self._update(record["id"], {"last_error": f"{type(e).__name__}: {e}", "lease_until": time.time() + delay})
+            logger.warning(f"⚠️ Outbox send of {record['id']} unconfirmed, reconciling in {delay:.1f}s: {str(e)}")
+        else:
+            await self._update(record["id"], {"status": "sent", "sid": message["sid"], "last_error": None, "lease_until": None})
+            self.metrics["sent"] += 1
+            await asyncio.to_thread(tracker.track, message, record["batch_id"])
+
+    async def reconcile(self, record: Dict, service) -> None:
+        """
+        Settle a message whose lease expired mid-send: look for it in
+        Twilio's log first and only queue a resend if it isn't there
+        """
+        if record["sent_from"]:
+            try:
+                recent = await service.client.list_messages(to=record["to_number"], from_=record["sent_from"])
+            except Exception as e:
+                await self._update(record["id"], {"lease_until": time.time() + self._backoff(record["attempts"])})
+                logger.warning(f"⚠️ Could not reconcile {record['id']}, will retry: {str(e)}")
+                return
+            # Allow for clock skew between us and Twilio
+            since = (record["claimed_at"] or record["created_at"]) - 60
+            for message in recent:
+                created = message.get("date_created")
+                if message.get("body") == record["body"] and created and parsedate_to_datetime(created).timestamp() >= since:
+                    await self._update(record["id"], {"status": "sent", "sid": message["sid"], "lease_until": None})
+                    self.metrics["reconciled"] += 1
+                    logger.info(f"🔁 Outbox reconciled {record['id']} → {message['sid']} (already sent)")
+                    return
+        await self._retry_or_fail(record, record["last_error"] or "interrupted before Twilio confirmed the send")
+
+    async def run(self):
+        """Keep up to `concurrency` messages in flight; sleep until the next is due"""
+        from .twilio_service import get_twilio_service
+
+        service = self.service or get_twilio_service()
+        in_flight: Set[asyncio.Task] = set()
+        try:
+            await self._drain(service, in_flight)
+        finally:
+            # Interrupted sends keep their lease and are reconciled on the next start
+            for task in in_flight:
+                task.cancel()
+
+    def _claim(self, free: int) -> Tuple[List[Dict], List[Dict], Optional[float]]:
+        """
+        Claim up to `free` messages, expired leases first
+        Returns (to reconcile, to deliver, next due time); runs in a worker thread
+        """
+        now = time.time()
+        expired = self.store.claim_expired(free, now, self.lease_seconds) if free > 0 else []
+        free -= len(expired)
+        due = self.store.claim_due(free, now, self.lease_seconds) if free > 0 else []
+        return expired, due, self.store.next_due()
+
+    async def _drain(self, service, in_flight: Set[asyncio.Task]):
+        while True:
+            self._wakeup.clear()
+            try:
+                expired, due, next_due = await asyncio.to_thread(self._claim, self.concurrency - len(in_flight))
+                for record in expired:
+                    in_flight.add(asyncio.create_task(self.reconcile(record, service)))
+                for record in due:
+                    in_flight.add(asyncio.create_task(self.deliver(record, service)))
+            except Exception as e:
+                logger.error(f"❌ Outbox store error: {str(e)}")
+                next_due = None
+
+            if len(in_flight) >= self.concurrency:
+                timeout = None
+            elif next_due is None:
+                timeout = POLL_SECONDS
+            else:
+                timeout = min(POLL_SECONDS, max(0.05, next_due - time.time()))
+
+            wakeup = asyncio.create_task(self._wakeup.wait())
+            done, _ = await asyncio.wait(in_flight | {wakeup}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            wakeup.cancel()
+            for task in done - {wakeup}:
+                in_flight.discard(task)
+                if task.exception():
+                    logger.error(f"❌ Outbox worker task failed: {task.exception()}")
+
+    def start(self):
+        """Start draining on the running event loop (resumes work left by a previous run)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self.run())
+        logger.info(f"📤 SMS outbox worker started ({self.store.counts()['pending']} pending)")
+
+    async def stop(self):
+        """Cancel the worker; messages in flight are reconciled on the next start"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+        logger.info("✅ SMS outbox worker stopped")
+
+
+# Singleton instance
+_sms_outbox = None
+
+
+def get_sms_outbox() -> SmsOutbox:
+    """Get or create the SMS outbox (store chosen by SMS_OUTBOX_BACKEND)"""
+    global _sms_outbox
+    if _sms_outbox is None:
+        _sms_outbox = SmsOutbox(
+            create_outbox_store(),
+            concurrency=Config.TWILIO_BATCH_CONCURRENCY,
+            max_attempts=Config.SMS_OUTBOX_MAX_ATTEMPTS,
+            retry_base_seconds=Config.SMS_OUTBOX_RETRY_BASE_SECONDS,
+            retry_max_seconds=Config.SMS_OUTBOX_RETRY_MAX_SECONDS,
+            lease_seconds=Config.SMS_OUTBOX_LEASE_SECONDS,
+        )
+    return _sms_outbox
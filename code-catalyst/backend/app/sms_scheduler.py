@@ -0,0 +1,208 @@
+"""
+Outbound SMS Scheduler
+Paces sends at each sender number's messages-per-second limit with a
+token bucket per number, spreading load across the sender pool
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_sender_numbers(spec: str, default_mps: float) -> List[Tuple[str, float]]:
+    """Parse "+15550001111,+15550002222=10" into [(number, mps)]"""
+    senders = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        number, _, mps = item.partition("=")
+        try:
+            rate = float(mps) if mps else default_mps
+            if rate <= 0:
+                raise ValueError(rate)
+            senders.append((number.strip(), rate))
+        except ValueError:
+            logger.warning(f"⚠️ Ignoring malformed TWILIO_SENDER_NUMBERS entry: {item}")
+    return senders
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out future send slots
+
+    Reserving a slot always succeeds; tokens go negative and the caller
+    waits until its slot comes up, so reservations are served in order.
+    A reservation given up before its slot comes up is released.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Take the next slot; returns seconds until it may be used"""
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def release(self, now: float):
+        """Give back a reserved slot that was never used"""
+        self._refill(now)
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def delay(self, now: float) -> float:
+        """Seconds until a slot reserved now could be used"""
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        return max(0.0, (1 - tokens) / self.rate)
+
+    def backlog(self, now: float) -> float:
+        """Seconds until every reserved slot has been used"""
+        tokens = self.tokens + (now - self.updated) * self.rate
+        return max(0.0, -tokens / self.rate)
+
+
+class SenderPool:
+    """
+    Sender numbers with per-number rate limits
+
+    acquire() picks the number whose next slot comes up first (or the
+    requested number) and returns once that slot is due. Single sends
+    reserve their slot ahead; bulk sends (batches, outbox, campaigns) wait
+    for a free one, so a verification code never queues behind a batch.
+    """
+
+    def __init__(self, senders: List[Tuple[str, float]], default_mps: float = 1.0):
+        self.default_mps = default_mps
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.queued: Dict[str, int] = {}
+        self.bulk_waiting = 0
+        self.granted = 0
+        for number, mps in senders:
+            self.add_sender(number, mps)
+
+    def add_sender(self, number: str, mps: Optional[float] = None) -> TokenBucket:
+        bucket = self.buckets.get(number)
+        if bucket is None:
+            bucket = self.buckets[number] = TokenBucket(mps or self.default_mps)
+            self.queued[number] = 0
+        return bucket
+
+    @property
+    def total_mps(self) -> float:
+        return sum(bucket.rate for bucket in self.buckets.values())
+
+    def _pick(self, number: Optional[str], now: float) -> str:
+        if number is None:
+            if not self.buckets:
+                raise ValueError("No sender numbers configured")
+            return min(self.buckets, key=lambda n: self.buckets[n].delay(now))
+        self.add_sender(number)
+        return number
+
+    async def acquire(self, number: Optional[str] = None, bulk: bool = False) -> str:
+        """
+        Wait for a send slot
+
+        Args:
+            number: Pace this sender instead of choosing one (added to the
+                    pool at the default rate if unknown)
+            bulk: Wait until a slot is free instead of reserving the next
+                  one, yielding to single sends
+
+        Returns:
+            The sender number to use
+        """
+        number = await (self._acquire_free(number) if bulk else self._acquire_reserved(number))
+        self.granted += 1
+        return number
+
+    async def _acquire_reserved(self, number: Optional[str]) -> str:
+        now = time.monotonic()
+        number = self._pick(number, now)
+        bucket = self.buckets[number]
+        wait = bucket.reserve(now)
+
+        if wait > 0:
+            self.queued[number] += 1
+            slept = False
+            try:
+                await asyncio.sleep(wait)
+                slept = True
+            finally:
+                self.queued[number] -= 1
+                if not slept:
+                    # Cancelled while waiting: the slot would otherwise delay every later send
+                    bucket.release(time.monotonic())
+        return number
+
+    async def _acquire_free(self, number: Optional[str]) -> str:
+        self.bulk_waiting += 1
+        try:
+            while True:
+                now = time.monotonic()
+                chosen = self._pick(number, now)
+                bucket = self.buckets[chosen]
+                wait = bucket.delay(now)
+                if wait <= 0:
+                    bucket.reserve(now)
+                    return chosen
+                await asyncio.sleep(wait)
+        finally:
+            self.bulk_waiting -= 1
+
+    def estimate_seconds(self, count: int) -> float:
+        """Rough time for `count` more sends to go out, behind what is queued"""
+        if not self.buckets:
+            return 0.0
+        now = time.monotonic()
+        backlog = sum(bucket.backlog(now) * bucket.rate for bucket in self.buckets.values())
+        return (backlog + self.bulk_waiting + count) / self.total_mps
+
+    def stats(self) -> Dict:
+        """Queue depth and time to drain, overall and per sender number"""
+        now = time.monotonic()
+        senders = [
+            {
+                "number": number,
+                "mps": bucket.rate,
+                "queued": self.queued[number],
+                "eta_seconds": round(bucket.backlog(now), 3),
+            }
+            for number, bucket in self.buckets.items()
+        ]
+        return {
+            "senders": senders,
+            "total_mps": self.total_mps,
+            "queued": sum(self.queued.values()) + self.bulk_waiting,
+            "bulk_waiting": self.bulk_waiting,
+            "eta_seconds": round(
+                max((sender["eta_seconds"] for sender in senders), default=0.0)
+                + (self.bulk_waiting / self.total_mps if self.buckets else 0.0), 3
+            ),
+            "granted": self.granted,
+        }
+
+
+# Singleton instance
+_sender_pool = None
+
+
+def get_sender_pool() -> SenderPool:
+    """Get or create the shared sender pool (TWILIO_SENDER_NUMBERS, else TWILIO_PHONE_NUMBER)"""
+    global _sender_pool
+    if _sender_pool is None:
+        senders = _parse_sender_numbers(Config.TWILIO_SENDER_NUMBERS, Config.TWILIO_MPS_PER_NUMBER)
+        if not senders and Config.TWILIO_PHONE_NUMBER:
+            senders = [(Config.TWILIO_PHONE_NUMBER, Config.TWILIO_MPS_PER_NUMBER)]
+        _sender_pool = SenderPool(senders, default_mps=Config.TWILIO_MPS_PER_NUMBER)
+        logger.info(f"📶 SMS sender pool: {len(senders)} numbers, {_sender_pool.total_mps:g} msg/s")
+    return _sender_pool
@@ -0,0 +1,223 @@
+"""
+SMS Segments
+Encoding-aware segment counting (GSM-7 vs UCS-2), per-blast cost
+estimates, and a shortener that fits a message into a segment budget
+without cutting words or links
+"""
+
+import math
+import re
+import unicodedata
+from typing import Dict, List, Tuple
+
+from .config import Config
+
+# GSM 03.38 basic character set (one septet each)
+GSM_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Extension table: escape + character, two septets each
+GSM_EXTENDED = frozenset("^{}\\[~]|€\f")
+GSM_CHARSET = GSM_BASIC | GSM_EXTENDED
+
+GSM_SINGLE, GSM_MULTI = 160, 153
+UCS2_SINGLE, UCS2_MULTI = 70, 67
+
+# Look-alikes that would otherwise force UCS-2 (what Twilio's smart encoding swaps)
+SMART_REPLACEMENTS = str.maketrans({
+    "‘": "'", "’": "'", "‚": "'", "′": "'",
+    "“": '"', "”": '"', "„": '"', "″": '"',
+    "–": "-", "—": "-", "‒": "-", "−": "-",
+    "…": "...", "\u00a0": " ", "\u2009": " ", "\u200b": "",
+    "•": "-", "·": "-", "«": '"', "»": '"',
+})
+URL = re.compile(r"https?://\S+")
+ELLIPSIS = "..."
+
+
+def is_gsm(text: str) -> bool:
+    return set(text) <= GSM_CHARSET
+
+
+def _units(char: str, gsm: bool) -> int:
+    if gsm:
+        return 2 if char in GSM_EXTENDED else 1
+    return 2 if ord(char) > 0xFFFF else 1  # astral characters are UTF-16 surrogate pairs
+
+
+def _measure(text: str, chars: set) -> Tuple[bool, int, int]:
+    """(is GSM-7, units, segments) for text whose character set is chars"""
+    gsm = chars <= GSM_CHARSET
+    if gsm:
+        units = len(text) + sum(text.count(char) for char in chars & GSM_EXTENDED)
+        single, multi = GSM_SINGLE, GSM_MULTI
+    else:
+        units = len(text.encode("utf-16-le")) // 2
+        single, multi = UCS2_SINGLE, UCS2_MULTI
+
+    if units <= single:
+        segments = 1 if text else 0
+    elif units == len(text):
+        segments = math.ceil(units / multi)
+    else:
+        # A two-unit character can't straddle segments, so pack it exactly
+        segments, used = 1, 0
+        for char in text:
+            size = _units(char, gsm)
+            if used + size > multi:
+                segments, used = segments + 1, 0
+            used += size
+    return gsm, units, segments
+
+
+def segment_info(text: str) -> Dict:
+    """
+    How Twilio will encode and split a message
+
+    Returns:
+        Dict with: {encoding, units, segments, per_segment, non_gsm}; units
+        are septets (GSM-7) or UTF-16 code units (UCS-2), and non_gsm lists
+        the characters that forced UCS-2
+    """
+    chars = set(text)
+    gsm, units, segments = _measure(text, chars)
+    single, multi = (GSM_SINGLE, GSM_MULTI) if gsm else (UCS2_SINGLE, UCS2_MULTI)
+    return {
+        "encoding": "GSM-7" if gsm else "UCS-2",
+        "units": units,
+        "segments": segments,
+        "per_segment": single if segments <= 1 else multi,
+        "non_gsm": [] if gsm else sorted(chars - GSM_CHARSET),
+    }
+
+
+def count_segments(text: str) -> int:
+    return _measure(text, set(text))[2]
+
+
+def count_segments_many(texts: List[str]) -> List[int]:
+    """
+    Segments for each text; when the whole batch is plain GSM-7 (the usual
+    case) this is one character-set check plus a length per text
+    """
+    if set("".join(texts)) <= GSM_BASIC:
+        return [
+            (1 if length else 0) if length <= GSM_SINGLE else math.ceil(length / GSM_MULTI)
+            for length in map(len, texts)
+        ]
+    return [count_segments(text) for text in texts]
+
+
+def estimate_cost(text: str, recipients: int = 1, price_per_segment: float = None) -> Dict:
+    """
+    Projected segments and cost of sending text to `recipients` numbers
+
+    Returns:
+        Dict with: {encoding, segments_per_message, total_segments,
+        estimated_cost_usd, price_per_segment_usd, non_gsm}
+    """
+    price = Config.SMS_SEGMENT_PRICE_USD if price_per_segment is None else price_per_segment
+    info = segment_info(text)
+    total = info["segments"] * recipients
+    return {
+        "encoding": info["encoding"],
+        "segments_per_message": info["segments"],
+        "total_segments": total,
+        "estimated_cost_usd": round(total * price, 4),
+        "price_per_segment_usd": price,
+        "non_gsm": info["non_gsm"],
+    }
+
+
+def estimate_batch_cost(texts: List[str], price_per_segment: float = None) -> Dict:
+    """
+    Like estimate_cost() for personalized batches (one text per recipient);
+    segments_per_message is the largest of any text
+    """
+    price = Config.SMS_SEGMENT_PRICE_USD if price_per_segment is None else price_per_segment
+    segments = count_segments_many(texts)
+    non_gsm = set("".join(texts)) - GSM_CHARSET
+    total = sum(segments)
+    return {
+        "encoding": "UCS-2" if non_gsm else "GSM-7",
+        "segments_per_message": max(segments, default=0),
+        "total_segments": total,
+        "estimated_cost_usd": round(total * price, 4),
+        "price_per_segment_usd": price,
+        "non_gsm": sorted(non_gsm),
+    }
+
+
+def smart_encode(text: str) -> str:
+    """Swap typographic punctuation for GSM-7 equivalents and tidy whitespace"""
+    text = text.translate(SMART_REPLACEMENTS)
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" *\n[ \n]*\n *", "\n\n", text)
+    return text.strip()
+
+
+def _strip_symbols(text: str) -> str:
+    """Drop characters outside GSM-7 that carry no words (emoji, pictographs, joiners)"""
+    drop = {}
+    for char in set(text) - GSM_CHARSET:
+        category = unicodedata.category(char)
+        if category == "Zs":
+            drop[char] = " "
+        elif category[0] not in "LN":
+            drop[char] = None
+    if not drop:
+        return text
+    # "Hi Zoë 🌟!" → "Hi Zoë!"
+    return re.sub(r" +([!?.,;:])", r"\1", smart_encode(text.translate(str.maketrans(drop))))
+
+
+def _truncate(text: str, budget_segments: int) -> str:
+    """Cut prose at a word boundary, keeping the last link whole (text after it is dropped)"""
+    links: List[Tuple[int, str]] = [(match.start(), match.group()) for match in URL.finditer(text)]
+    tail = f" {links[-1][1]}" if links else ""
+    prose = text[: links[-1][0]].rstrip() if links else text
+
+    words = prose.split(" ")
+
+    def candidate(count: int) -> str:
+        return " ".join(words[:count]).rstrip(" ,;:-.\n") + ELLIPSIS + tail
+
+    # Longer prefixes never take fewer segments, so binary search the word count
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_segments(candidate(middle)) <= budget_segments:
+            low = middle
+        else:
+            high = middle - 1
+    if low:
+        return candidate(low)
+    # Nothing but the link fits (or not even that): hard cut
+    hard = tail.strip() or text
+    while count_segments(hard) > budget_segments:
+        hard = hard[:-1]
+    return hard
+
+
+def fit_segments(text: str, max_segments: int = 1) -> str:
+    """
+    Shorten text to at most max_segments segments, least destructive step first:
+    smart-encode punctuation, drop emoji/symbols, then cut at a word
+    boundary with "..." (keeping the last link whole)
+    """
+    max_segments = max(1, max_segments)
+    if count_segments(text) <= max_segments:
+        return text
+
+    text = smart_encode(text)
+    if count_segments(text) <= max_segments:
+        return text
+
+    if not is_gsm(text):
+        # Emoji cost two UCS-2 units each and may be all that forces UCS-2
+        text = _strip_symbols(text)
+        if count_segments(text) <= max_segments:
+            return text
+
+    return _truncate(text, max_segments)
@@ -0,0 +1,311 @@
+"""
+SMS Delivery Status
+Ingests Twilio status callbacks into a store keyed by message SID, with
+per-campaign counters, so delivery status and campaign delivery rates are
+answered locally instead of fetching each message from the API
+
+Backend: Config.SMS_STATUS_BACKEND, sqlite (default) or redis (store_backends)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from .config import Config
+from .store_backends import RedisStore, SQLiteStore, create_store
+
+logger = logging.getLogger(__name__)
+
+# Callbacks can arrive out of order; a status never replaces a later one
+STATUS_RANK = {
+    "accepted": 0, "scheduled": 0, "queued": 1, "sending": 2, "sent": 3,
+    "delivered": 4, "undelivered": 4, "failed": 4, "canceled": 4, "read": 5,
+}
+FINAL_STATUSES = ("delivered", "undelivered", "failed", "canceled", "read")
+
+
+def compute_signature(url: str, params: List[Tuple[str, str]], auth_token: str) -> str:
+    """X-Twilio-Signature: HMAC-SHA1 over the URL plus the sorted POST params"""
+    payload = url + "".join(key + value for key, value in sorted(params))
+    digest = hmac.new(auth_token.encode("utf-8"), payload.encode("utf-8"), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def validate_signature(url: str, params: List[Tuple[str, str]], signature: str, auth_token: str) -> bool:
+    return hmac.compare_digest(compute_signature(url, params, auth_token), signature or "")
+
+
+def apply_status(current: Optional[Dict], update: Dict) -> Optional[Dict]:
+    """
+    Merge a status update into the stored record
+
+    Returns:
+        The new record, or None if the update changes nothing (stale or repeated)
+    """
+    if current is None:
+        return {**update, "updated_at": time.time()}
+    record = dict(current)
+    if STATUS_RANK.get(update["status"], 0) > STATUS_RANK.get(current["status"], 0):
+        record["status"] = update["status"]
+        record["error_code"] = update.get("error_code") or current.get("error_code")
+    for field in ("campaign_id", "to_number"):
+        record[field] = current.get(field) or update.get(field)
+    if record == current:
+        return None
+    record["updated_at"] = time.time()
+    return record
+
+
+class DeliveryStore:
+    """Base class for delivery status storage; updates are atomic across workers"""
+
+    name = "base"
+
+    def record(self, update: Dict) -> Optional[Dict]:
+        """
+        Apply a status update ({sid, status, campaign_id, to_number, error_code})
+
+        Returns:
+            The stored record, or None if the update was stale or repeated
+        """
+        raise NotImplementedError
+
+    def get(self, sid: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def campaign_counts(self, campaign_id: str) -> Dict[str, int]:
+        """Messages per status for one campaign (from counters, not a scan)"""
+        raise NotImplementedError
+
+
+class SQLiteDeliveryStore(SQLiteStore, DeliveryStore):
+    """Counters move inside the same transaction as the status"""
+
+    def __init__(self, path: str):
+        super().__init__(
+            path,
+            """
+            CREATE TABLE IF NOT EXISTS sms_status (
+                sid TEXT PRIMARY KEY,
+                campaign_id TEXT,
+                to_number TEXT,
+                status TEXT NOT NULL,
+                error_code TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sms_status_campaign ON sms_status (campaign_id);
+            CREATE TABLE IF NOT EXISTS sms_campaign_counts (
+                campaign_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (campaign_id, status)
+            );
+            """,
+        )
+
+    def _count(self, campaign_id: Optional[str], status: str, delta: int):
+        if campaign_id is None:
+            return
+        self._conn.execute(
+            """
+            INSERT INTO sms_campaign_counts (campaign_id, status, count) VALUES (?, ?, ?)
+            ON CONFLICT (campaign_id, status) DO UPDATE SET count = count + excluded.count
+            """,
+            (campaign_id, status, delta),
+        )
+
+    def record(self, update: Dict) -> Optional[Dict]:
+        def work():
+            row = self._conn.execute("SELECT * FROM sms_status WHERE sid = ?", (update["sid"],)).fetchone()
+            current = dict(row) if row else None
+            record = apply_status(current, update)
+            if record is not None:
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO sms_status (sid, campaign_id, to_number, status, error_code, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (record["sid"], record.get("campaign_id"), record.get("to_number"),
+                     record["status"], record.get("error_code"), record["updated_at"]),
+                )
+                if current is not None:
+                    self._count(current["campaign_id"], current["status"], -1)
+                self._count(record.get("campaign_id"), record["status"], 1)
+            return record
+
+        return self._transaction(work)
+
+    def get(self, sid: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sms_status WHERE sid = ?", (sid,)).fetchone()
+        return dict(row) if row else None
+
+    def campaign_counts(self, campaign_id: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, count FROM sms_campaign_counts WHERE campaign_id = ? AND count > 0",
+                (campaign_id,),
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+
+class RedisDeliveryStore(RedisStore, DeliveryStore):
+    """
+    One key per SID and one counter hash per campaign; updates use
+    WATCH/MULTI so the status and the counters change together
+    """
+
+    def __init__(self, client, prefix: str = "sms_status"):
+        super().__init__(client, prefix)
+
+    def _key(self, sid: str) -> str:
+        return f"{self.prefix}:msg:{sid}"
+
+    def _counts_key(self, campaign_id: str) -> str:
+        return f"{self.prefix}:campaign:{campaign_id}"
+
+    def record(self, update: Dict) -> Optional[Dict]:
+        import redis
+
+        key = self._key(update["sid"])
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    current = json.loads(raw) if raw else None
+                    record = apply_status(current, update)
+                    if record is None:
+                        pipe.unwatch()
+                        return None
+                    pipe.multi()
+                    pipe.set(key, json.dumps(record))
+                    if current is not None and current.get("campaign_id"):
+                        pipe.hincrby(self._counts_key(current["campaign_id"]), current["status"], -1)
+                    if record.get("campaign_id"):
+                        pipe.hincrby(self._counts_key(record["campaign_id"]), record["status"], 1)
+                    pipe.execute()
+                    return record
+                except redis.WatchError:
+                    # Another callback for this SID landed first; re-read and retry
+                    continue
+
+    def get(self, sid: str) -> Optional[Dict]:
+        raw = self.client.get(self._key(sid))
+        return json.loads(raw) if raw else None
+
+    def campaign_counts(self, campaign_id: str) -> Dict[str, int]:
+        counts = self.client.hgetall(self._counts_key(campaign_id))
+        return {status: int(n) for status, n in counts.items() if int(n) > 0}
+
+
+def create_delivery_store(backend: Optional[str] = None) -> DeliveryStore:
+    """Build the store selected by Config.SMS_STATUS_BACKEND"""
+    return create_store("SMS delivery status", "SMS_STATUS_BACKEND", backend or Config.SMS_STATUS_BACKEND, {
+        "sqlite": lambda: SQLiteDeliveryStore(Config.SMS_STATUS_SQLITE_PATH),
+        "redis": RedisDeliveryStore,
+    })
+
+
+class DeliveryTracker:
+    """
+    Links outbound messages to campaigns and ingests their status callbacks
+
+    Sends are only tracked when a callback URL is configured; otherwise
+    Twilio would never report back and every message would stay "queued".
+    """
+
+    def __init__(self, callback_url: str = "", store: Optional[DeliveryStore] = None):
+        self.callback_url = callback_url
+        self._store = store
+        self.metrics = {"tracked": 0, "callbacks": 0, "stale_callbacks": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.callback_url)
+
+    @property
+    def store(self) -> DeliveryStore:
+        if self._store is None:
+            self._store = create_delivery_store()
+        return self._store
+
+    def callback_params(self, campaign_id: Optional[str] = None) -> Dict:
+        """Extra create_message params asking Twilio to report status changes"""
+        if not self.enabled:
+            return {}
+        query = "?" + urlencode({"campaign_id": campaign_id}) if campaign_id else ""
+        return {"StatusCallback": self.callback_url + query}
+
+    def track(self, message: Dict, campaign_id: Optional[str] = None):
+        """Record a message just created through the API (its first status)"""
+        if not self.enabled:
+            return
+        self.store.record({
+            "sid": message["sid"],
+            "status": message.get("status") or "queued",
+            "campaign_id": campaign_id,
+            "to_number": message.get("to"),
+            "error_code": None,
+        })
+        self.metrics["tracked"] += 1
+
+    def ingest(self, params: Dict[str, str], campaign_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Apply one status callback (Twilio's form fields)
+
+        Raises:
+            ValueError: If MessageSid or MessageStatus is missing
+        """
+        sid = params.get("MessageSid") or params.get("SmsSid")
+        status = params.get("MessageStatus") or params.get("SmsStatus")
+        if not sid or not status:
+            raise ValueError("MessageSid and MessageStatus are required")
+        self.metrics["callbacks"] += 1
+        record = self.store.record({
+            "sid": sid,
+            "status": status,
+            "campaign_id": campaign_id,
+            "to_number": params.get("To"),
+            "error_code": params.get("ErrorCode"),
+        })
+        if record is None:
+            self.metrics["stale_callbacks"] += 1
+        return record
+
+    def status(self, sid: str) -> Optional[Dict]:
+        return self.store.get(sid)
+
+    def summary(self, campaign_id: str) -> Optional[Dict]:
+        """Delivery counts and rate for one campaign, or None if nothing is tracked"""
+        counts = self.store.campaign_counts(campaign_id)
+        total = sum(counts.values())
+        if not total:
+            return None
+        final = sum(counts.get(status, 0) for status in FINAL_STATUSES)
+        delivered = counts.get("delivered", 0) + counts.get("read", 0)
+        return {
+            "campaign_id": campaign_id,
+            "total": total,
+            "statuses": counts,
+            "in_progress": total - final,
+            "delivered": delivered,
+            "delivery_rate": round(delivered / total, 4),
+        }
+
+
+# Singleton instance
+_delivery_tracker = None
+
+
+def get_delivery_tracker() -> DeliveryTracker:
+    """Get or create the delivery tracker (store chosen by SMS_STATUS_BACKEND)"""
+    global _delivery_tracker
+    if _delivery_tracker is None:
+        _delivery_tracker = DeliveryTracker(Config.TWILIO_STATUS_CALLBACK_URL)
+    return _delivery_tracker
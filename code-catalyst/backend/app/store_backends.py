@@ -0,0 +1,113 @@
+"""
+Store Backends
+Shared plumbing for the SMS outbox, delivery status, suppression list,
+campaign and handoff stores: the SQLite and Redis base classes, and the
+factory that picks one from the store's Config.*_BACKEND setting
+
+Backends:
+- sqlite: WAL-mode database file shared by workers on one node
+- redis:  Config.REDIS_URL, shared across nodes
+
+Store methods block (disk or network I/O); call them from async code
+through asyncio.to_thread.
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Callable, Dict
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteStore:
+    """
+    SQLite store in WAL mode: concurrent readers, one writer at a time
+    The connection is shared by the process's threads behind _lock;
+    _transaction() runs work inside BEGIN IMMEDIATE, so read-modify-write
+    is atomic across processes too
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, schema: str = ""):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if schema:
+            self._conn.executescript(schema)
+
+    def _transaction(self, work: Callable):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+
+class RedisStore:
+    """Redis store shared by every worker and node; keys start with prefix"""
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str):
+        self.client = client
+        self.prefix = prefix
+
+
+def connect_redis():
+    """
+    Sync client for Config.REDIS_URL (the stores are called from worker
+    threads), with the same settings as main.redis_client
+
+    Raises:
+        Exception: If redis isn't installed or the server doesn't answer a ping
+    """
+    import redis
+
+    client = redis.Redis.from_url(
+        Config.REDIS_URL,
+        encoding="utf8",
+        decode_responses=True,
+        socket_connect_timeout=5,
+        socket_keepalive=True,
+    )
+    client.ping()
+    return client
+
+
+def create_store(label: str, setting: str, backend: str, factories: Dict[str, Callable], fallback: str = "sqlite"):
+    """
+    Build the store for backend (the value of Config.<setting>)
+
+    factories maps backend names to store constructors; the "redis" one is
+    called with a connected client. Falls back to factories[fallback] (with
+    a warning) if Redis is unreachable or the backend is unknown.
+    """
+    backend = backend.lower()
+
+    if backend == "redis":
+        try:
+            store = factories["redis"](connect_redis())
+            logger.info(f"💾 {label}: Redis")
+            return store
+        except Exception as e:
+            logger.warning(f"⚠️ Redis {label} store unavailable, using {fallback}: {str(e)}")
+            backend = fallback
+
+    elif backend not in factories:
+        logger.warning(f"⚠️ Unknown {setting} '{backend}', using {fallback}")
+        backend = fallback
+
+    store = factories[backend]()
+    logger.info(f"💾 {label}: {backend}" + (f" ({store.path})" if isinstance(store, SQLiteStore) else ""))
+    return store
@@ -3,10 +3,23 @@ Twilio Communications Service
 SMS and voice capabilities for affiliate notifications, events, and alerts
 """
 
+import asyncio
 import logging
+import time
+from contextlib import nullcontext
 from typing import Optional, List, Dict
 from datetime import datetime
 
+from .config import Config
+from .message_templates import TEMPLATES, get_template, render
+from .recipients import clean_recipient_rows, clean_recipients
+from .sms_outbox import get_sms_outbox
+from .sms_scheduler import get_sender_pool
+from .sms_segments import estimate_batch_cost, estimate_cost, fit_segments
+from .sms_status import get_delivery_tracker
+from .twilio_transport import get_twilio_transport
+from .twiml import say_twiml
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,28 +28,18 @@ class TwilioService:
     
     def __init__(self):
         """Initialize Twilio service with credentials from config"""
-        try:
-            from twilio.rest import Client
-            from .config import Config
-            
-            self.client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
-            self.default_number = Config.TWILIO_PHONE_NUMBER
-            self.enabled = bool(Config.TWILIO_ACCOUNT_SID)
-            
-            if self.enabled:
-                logger.info("✅ Twilio service initialized")
-            else:
-                logger.warning("⚠️ Twilio not configured (SMS/Voice disabled)")
+        self.concurrency = max(1, Config.TWILIO_BATCH_CONCURRENCY)
+        self.default_number = Config.TWILIO_PHONE_NUMBER
+        # Async REST client shared with TwilioCapsule (pooled keep-alive connections)
+        self.client = get_twilio_transport()
+        self.enabled = self.client.configured
+        # Paces SMS at each sender number's MPS limit
+        self.senders = get_sender_pool()
         
-        except ImportError:
-            logger.error("❌ Twilio package not installed: pip install twilio")
-            self.enabled = False
-            self.client = None
-        
-        except Exception as e:
-            logger.error(f"❌ Twilio initialization failed: {str(e)}")
-            self.enabled = False
-            self.client = None
+        if self.enabled:
+            logger.info("✅ Twilio service initialized")
+        else:
+            logger.warning("⚠️ Twilio not configured (SMS/Voice disabled)")
     
     async def send_sms(
         self,
@@ -49,35 +52,52 @@ class TwilioService:
         
         Args:
             to_number: Recipient phone number (e.g., "+1-555-1234")
-            message: SMS message body (max 160 chars)
-            from_number: Override sender number (uses config default if None)
+            message: SMS message body (sent as-is; over 160 GSM-7 / 70 UCS-2
+                     chars it is billed as several segments)
+            from_number: Override sender number (picked from the sender pool if None)
         
         Returns:
-            Dict with: {status, sid, timestamp}
+            Dict with: {status, sid, from, timestamp}
         """
+        return await self._send_sms(to_number, message, from_number)
+    
+    async def _send_sms(
+        self,
+        to_number: str,
+        message: str,
+        from_number: Optional[str] = None,
+        campaign_id: Optional[str] = None,
+        bulk: bool = False,
+    ) -> Dict:
+        """Wait for a sender slot (after single sends if bulk), then send"""
         if not self.enabled or not self.client:
             logger.warning(f"⚠️ Twilio disabled, SMS not sent to {to_number}")
             return {
                 "status": "skipped",
                 "reason": "twilio_not_configured",
+                "to": to_number,
                 "timestamp": datetime.utcnow().isoformat(),
             }
         
         try:
-            from_num = from_number or self.default_number
+            from_num = await self.senders.acquire(from_number, bulk=bulk)
+            tracker = get_delivery_tracker()
             
-            message_obj = self.client.messages.create(
-                body=message,
-                from_=from_num,
+            message_obj = await self.client.create_message(
                 to=to_number,
+                from_=from_num,
+                body=message,
+                **tracker.callback_params(campaign_id),
             )
+            await asyncio.to_thread(tracker.track, message_obj, campaign_id)
             
-            logger.info(f"✅ SMS sent to {to_number} | SID: {message_obj.sid}")
+            logger.info(f"✅ SMS sent to {to_number} | SID: {message_obj['sid']}")
             
             return {
                 "status": "sent",
-                "sid": message_obj.sid,
+                "sid": message_obj["sid"],
                 "to": to_number,
+                "from": from_num,
                 "timestamp": datetime.utcnow().isoformat(),
             }
         
@@ -95,14 +115,16 @@ class TwilioService:
         to_number: str,
         message: str,
         from_number: Optional[str] = None,
+        in_flight: Optional[asyncio.Semaphore] = None,
     ) -> Dict:
         """
         Send voice call via Twilio with text-to-speech
         
         Args:
             to_number: Recipient phone number
-            message: Message to read via TTS
+            message: Message to read via TTS (escaped into cached TwiML)
             from_number: Override caller number
+            in_flight: Bound on concurrent call requests (batch sends)
         
         Returns:
             Dict with: {status, call_sid, timestamp}
@@ -118,20 +140,18 @@ class TwilioService:
         try:
             from_num = from_number or self.default_number
             
-            # Create TwiML (Twilio Markup Language) for voice
-            twiml_message = f'<Response><Say>{message}</Say></Response>'
-            
-            call = self.client.calls.create(
-                to=to_number,
-                from_=from_num,
-                twiml=twiml_message,
-            )
+            async with in_flight or nullcontext():
+                call = await self.client.create_call(
+                    to=to_number,
+                    from_=from_num,
+                    twiml=say_twiml(message),
+                )
             
-            logger.info(f"✅ Voice call initiated to {to_number} | Call SID: {call.sid}")
+            logger.info(f"✅ Voice call initiated to {to_number} | Call SID: {call['sid']}")
             
             return {
                 "status": "queued",
-                "call_sid": call.sid,
+                "call_sid": call["sid"],
                 "to": to_number,
                 "timestamp": datetime.utcnow().isoformat(),
             }
@@ -145,44 +165,274 @@ class TwilioService:
                 "timestamp": datetime.utcnow().isoformat(),
             }
     
+    async def send_voice_batch(
+        self,
+        recipients: List[str],
+        message: str,
+        from_number: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> Dict:
+        """
+        Call many recipients with the same text-to-speech message
+        
+        Recipients are cleaned like send_sms_batch(); the TwiML is built
+        once and up to `concurrency` call requests are in flight at once
+        (default and ceiling: TWILIO_VOICE_CONCURRENCY)
+        
+        Returns:
+            Dict with: {status, queued_count, failed_count, total, results,
+            recipients, concurrency, duration_seconds, timestamp}
+        """
+        recipients, report = await asyncio.to_thread(clean_recipients, recipients)
+        say_twiml(message)  # fail fast on an oversized message, before any call
+        limit = max(1, min(concurrency or Config.TWILIO_VOICE_CONCURRENCY, Config.TWILIO_VOICE_CONCURRENCY))
+        semaphore = asyncio.Semaphore(limit)
+        started = time.monotonic()
+        
+        logger.info(f"📞📞 Calling {len(recipients)} recipients ({limit} at a time)")
+        
+        results = await asyncio.gather(*(
+            self.send_voice(to_number, message, from_number, in_flight=semaphore)
+            for to_number in recipients
+        ))
+        queued_count = sum(result["status"] == "queued" for result in results)
+        duration = time.monotonic() - started
+        
+        logger.info(f"✅ Voice batch complete: {queued_count} queued, {len(results) - queued_count} failed in {duration:.2f}s")
+        
+        return {
+            "status": "batch_queued",
+            "queued_count": queued_count,
+            "failed_count": len(results) - queued_count,
+            "total": len(recipients),
+            "results": list(results),
+            "recipients": report,
+            "concurrency": limit,
+            "duration_seconds": round(duration, 3),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    
     async def send_sms_batch(
         self,
         recipients: List[str],
         message: str,
         from_number: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        campaign_id: Optional[str] = None,
+        max_segments: Optional[int] = None,
     ) -> Dict:
         """
         Send batch SMS to multiple recipients
         
+        Recipients are normalized to E.164 and duplicates and opted-out
+        numbers are dropped first (see recipients.clean_recipients). Up to
+        `concurrency` workers (default and ceiling: TWILIO_BATCH_CONCURRENCY)
+        take free sender-pool slots, so sends go out at the combined MPS of
+        the sender numbers (spread across them unless from_number is given)
+        while single sends keep priority. A batch that would take longer
+        than TWILIO_BATCH_MAX_ETA_SECONDS is rejected: queue it with
+        queue_sms_batch() or upload it as a campaign instead
+        
         Args:
             recipients: List of phone numbers
             message: SMS message body
             from_number: Override sender number
+            concurrency: Lower the parallelism for this batch
+            campaign_id: Group delivery status callbacks under this campaign
+            max_segments: Shorten the message to fit this many segments
+        
+        Raises:
+            ValueError: If the batch would outlast TWILIO_BATCH_MAX_ETA_SECONDS
         
         Returns:
-            Dict with: {status, sent_count, failed_count, timestamp}
+            Dict with: {status, sent_count, failed_count, total, results,
+            recipients, concurrency, segments, eta_seconds, duration_seconds,
+            timestamp}; results holds one send_sms result per recipient
+            sent to, in order, recipients reports the numbers dropped,
+            segments is the projected segment count and cost, and
+            eta_seconds is the estimate made when the batch was queued
+        """
+        if max_segments:
+            message = fit_segments(message, max_segments)
+        recipients, report = await asyncio.to_thread(clean_recipients, recipients)
+        result = await self._send_batch(
+            recipients, [message] * len(recipients), estimate_cost(message, len(recipients)),
+            from_number, concurrency, campaign_id,
+        )
+        result["recipients"] = report
+        return result
+    
+    async def send_template_batch(
+        self,
+        template: str,
+        recipients: List[Dict],
+        from_number: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        campaign_id: Optional[str] = None,
+    ) -> Dict:
         """
-        sent_count = 0
-        failed_count = 0
+        Send a personalized template message to each recipient
         
-        logger.info(f"📱 Sending batch SMS to {len(recipients)} recipients")
+        Recipients are cleaned like send_sms_batch(), then bodies are
+        rendered for the whole batch in one pass (see message_templates).
         
-        for to_number in recipients:
-            result = await self.send_sms(to_number, message, from_number)
-            if result["status"] == "sent":
-                sent_count += 1
-            else:
-                failed_count += 1
+        Args:
+            template: Template name (message_templates.TEMPLATES)
+            recipients: One dict per recipient: {"to": phone, <field>: value, ...}
         
-        logger.info(f"✅ Batch complete: {sent_count} sent, {failed_count} failed")
+        Returns:
+            Same shape as send_sms_batch(); segments covers every body
+        
+        Raises:
+            ValueError: If the template is unknown, a recipient lacks a field,
+                or the batch would outlast TWILIO_BATCH_MAX_ETA_SECONDS
+        """
+        rows, report = await asyncio.to_thread(clean_recipient_rows, recipients)
+        bodies = get_template(template).render_batch(rows)
+        result = await self._send_batch(
+            [row["to"] for row in rows], bodies, estimate_batch_cost(bodies),
+            from_number, concurrency, campaign_id,
+        )
+        result["recipients"] = report
+        return result
+    
+    async def _send_batch(
+        self,
+        recipients: List[str],
+        bodies: List[str],
+        segments: Dict,
+        from_number: Optional[str],
+        concurrency: Optional[int],
+        campaign_id: Optional[str],
+    ) -> Dict:
+        """Send bodies[i] to recipients[i] through the sender pool, `limit` workers at a time"""
+        limit = max(1, min(concurrency or self.concurrency, self.concurrency))
+        started = time.monotonic()
+        eta = self.senders.estimate_seconds(len(recipients)) if self.enabled else 0.0
+        if eta > Config.TWILIO_BATCH_MAX_ETA_SECONDS:
+            raise ValueError(
+                f"Batch of {len(recipients)} would take ~{eta:.0f}s at {self.senders.total_mps:g} msg/s "
+                f"(limit {Config.TWILIO_BATCH_MAX_ETA_SECONDS:g}s): queue it with POST /api/twilio/outbox "
+                f"or upload it to /api/twilio/campaigns"
+            )
+        
+        logger.info(
+            f"📱 Sending batch SMS to {len(recipients)} recipients "
+            f"({limit} at a time, {segments['total_segments']} {segments['encoding']} segments, "
+            f"ETA {eta:.0f}s at {self.senders.total_mps:g} msg/s)"
+        )
+        
+        results: List[Optional[Dict]] = [None] * len(recipients)
+        pending = iter(enumerate(zip(recipients, bodies)))
+        
+        async def worker():
+            # Workers take free slots one send at a time: the batch never reserves slots ahead
+            for i, (to_number, body) in pending:
+                results[i] = await self._send_sms(to_number, body, from_number, campaign_id=campaign_id, bulk=True)
+        
+        await asyncio.gather(*(worker() for _ in range(min(limit, len(recipients)))))
+        sent_count = sum(result["status"] == "sent" for result in results)
+        failed_count = len(results) - sent_count
+        duration = time.monotonic() - started
+        
+        logger.info(f"✅ Batch complete: {sent_count} sent, {failed_count} failed in {duration:.2f}s")
         
         return {
             "status": "batch_sent",
             "sent_count": sent_count,
             "failed_count": failed_count,
             "total": len(recipients),
+            "results": list(results),
+            "concurrency": limit,
+            "segments": segments,
+            "eta_seconds": round(eta, 3),
+            "duration_seconds": round(duration, 3),
             "timestamp": datetime.utcnow().isoformat(),
         }
+    
+    def queue_sms_batch(
+        self,
+        recipients: List[str],
+        message: str,
+        from_number: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        max_segments: Optional[int] = None,
+    ) -> Dict:
+        """
+        Queue batch SMS on the durable outbox and return immediately
+        
+        Messages survive restarts and are retried with backoff; each is
+        keyed by batch_id and recipient, so re-submitting a batch_id
+        (e.g. a client retry) never sends a recipient the message twice
+        
+        Args:
+            recipients: List of phone numbers
+            message: SMS message body
+            from_number: Override sender number
+            batch_id: Idempotency key for the batch (generated if omitted)
+            max_segments: Shorten the message to fit this many segments
+        
+        Returns:
+            Dict with: {batch_id, queued, duplicates, total, recipients,
+            segments, eta_seconds}; recipients reports the numbers dropped
+            before queueing (invalid, repeated in the list, opted out) and
+            segments projects the newly queued messages
+        """
+        if max_segments:
+            message = fit_segments(message, max_segments)
+        recipients, report = clean_recipients(recipients)
+        result = get_sms_outbox().enqueue(recipients, message, from_number, batch_id)
+        result["recipients"] = report
+        result["segments"] = estimate_cost(message, result["queued"])
+        result["eta_seconds"] = round(self.senders.estimate_seconds(result["queued"]), 3)
+        return result
+    
+    def preview_sms_batch(
+        self,
+        recipients: List[str],
+        message: str,
+        max_segments: Optional[int] = None,
+    ) -> Dict:
+        """
+        Dry run: the message as it would be sent, its segment count and
+        cost across the batch, and the send ETA; nothing is sent or queued
+        
+        Returns:
+            Dict with: {status, total, recipients, message, shortened,
+            segments, eta_seconds}
+        """
+        final = fit_segments(message, max_segments) if max_segments else message
+        recipients, report = clean_recipients(recipients)
+        return {
+            "status": "dry_run",
+            "total": len(recipients),
+            "recipients": report,
+            "message": final,
+            "shortened": final != message,
+            "segments": estimate_cost(final, len(recipients)),
+            "eta_seconds": round(self.senders.estimate_seconds(len(recipients)), 3),
+        }
+    
+    def preview_template_batch(self, template: str, recipients: List[Dict]) -> Dict:
+        """
+        Dry run of send_template_batch(): rendered bodies, segment count
+        and cost, and the send ETA; nothing is sent
+        
+        Returns:
+            Dict with: {status, template, total, recipients, messages,
+            segments, eta_seconds}
+        """
+        rows, report = clean_recipient_rows(recipients)
+        bodies = get_template(template).render_batch(rows)
+        return {
+            "status": "dry_run",
+            "template": template,
+            "total": len(bodies),
+            "recipients": report,
+            "messages": [{"to": row["to"], "message": body} for row, body in zip(rows, bodies)],
+            "segments": estimate_batch_cost(bodies),
+            "eta_seconds": round(self.senders.estimate_seconds(len(bodies)), 3),
+        }
 
 
 # Singleton instance
@@ -214,17 +464,13 @@ async def send_affiliate_notification(
     """
     service = get_twilio_service()
     
-    messages = {
-        "onboarding": f"Welcome to Influwealth, {affiliate_name}! Your AP2 affiliate account is ready. Visit https://influwealth.wixsite.com/influwealth-consult to get started.",
-        "payout": f"Hi {affiliate_name}, your AP2 payout is processing! Check your dashboard for details. Support: support@influwealth.com",
-        "alert": f"Alert for {affiliate_name}: Your affiliate account requires attention. Please contact support@influwealth.com",
-    }
-    
-    message_text = messages.get(notification_type, "Message from Influwealth")
+    template = f"affiliate_{notification_type}"
+    if template not in TEMPLATES:
+        template = "affiliate_default"
     
     return await service.send_sms(
         to_number=phone,
-        message=message_text[:160],  # SMS limit
+        message=render(template, affiliate_name=affiliate_name),
     )
 
 
@@ -253,9 +499,7 @@ async def send_event_confirmation(
     """
     service = get_twilio_service()
     
-    message = f"Confirmed! You're registered for {event_name} on {event_date}. Details: https://influwealth.wixsite.com/influwealth-consult"
-    
     return await service.send_sms(
         to_number=phone,
-        message=message[:160],
+        message=render("event_confirmation", event_name=event_name, event_date=event_date),
     )
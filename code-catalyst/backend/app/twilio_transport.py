@@ -0,0 +1,168 @@
+"""
+Twilio REST Transport
+Async Twilio API client over one pooled httpx.AsyncClient (keep-alive,
+HTTP/2 when h2 is installed), shared by TwilioService and TwilioCapsule
+"""
+
+import asyncio
+import importlib.util
+import logging
+import socket
+from typing import Dict, List, Optional
+
+import httpx
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = "2010-04-01"
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class TwilioAPIError(Exception):
+    """Non-2xx response from the Twilio API"""
+
+    def __init__(self, status: int, message: str, code: Optional[int] = None):
+        self.status = status
+        self.code = code
+        super().__init__(f"HTTP {status} error: {message}" + (f" (code {code})" if code else ""))
+
+
+class TwilioTransport:
+    """
+    Minimal Twilio REST client (Messages, Calls, Accounts)
+
+    The httpx client is created on first use and re-created if called from
+    a different event loop, since pooled connections belong to one loop;
+    the replaced client is closed rather than left holding its connections.
+    """
+
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        base_url: str = "https://api.twilio.com",
+        max_connections: int = 20,
+        timeout: float = 10.0,
+    ):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.account_sid and self.auth_token)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop or self._client.is_closed:
+            self._retire_client()
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.base_url}/{API_VERSION}/Accounts",
+                auth=(self.account_sid, self.auth_token),
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+            )
+            self._loop = loop
+            logger.info(
+                f"🔌 Twilio transport: {self.base_url} "
+                f"({'HTTP/2' if HTTP2_AVAILABLE else 'HTTP/1.1'}, {self.max_connections} connections)"
+            )
+        return self._client
+
+    def _retire_client(self):
+        """Close the client bound to another event loop before it is replaced"""
+        client, loop = self._client, self._loop
+        self._client = None
+        self._loop = None
+        if client is None or client.is_closed:
+            return
+        if loop.is_running():
+            # In use on another thread's loop: close it there
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        else:
+            # Its loop has stopped, so aclose() can't run: end the connections
+            # now; their sockets are closed when the client is collected
+            _shutdown_connections(client)
+
+    async def request(self, method: str, path: str, data: Optional[Dict] = None, params: Optional[Dict] = None) -> Dict:
+        """
+        Call an account-scoped endpoint (e.g. "/Messages.json")
+
+        Raises:
+            TwilioAPIError: On a non-2xx response
+            httpx.HTTPError: On connection failures and timeouts
+        """
+        response = await self._get_client().request(method, self.account_sid + path, data=data, params=params)
+        if response.status_code >= 400:
+            try:
+                error = response.json()
+            except ValueError:
+                error = {"message": response.reason_phrase}
+            raise TwilioAPIError(response.status_code, error.get("message", ""), error.get("code"))
+        return response.json()
+
+    async def create_message(self, to: str, from_: str, body: str, **params) -> Dict:
+        """Send an SMS; extra params use Twilio's names (StatusCallback, ...)"""
+        return await self.request("POST", "/Messages.json", {"To": to, "From": from_, "Body": body, **params})
+
+    async def create_call(self, to: str, from_: str, twiml: str, **params) -> Dict:
+        """Start a voice call that plays the given TwiML"""
+        return await self.request("POST", "/Calls.json", {"To": to, "From": from_, "Twiml": twiml, **params})
+
+    async def fetch_message(self, sid: str) -> Dict:
+        return await self.request("GET", f"/Messages/{sid}.json")
+
+    async def list_messages(self, to: str, from_: str, page_size: int = 20) -> List[Dict]:
+        """Most recent messages from one number to another, newest first"""
+        payload = await self.request("GET", "/Messages.json", params={"To": to, "From": from_, "PageSize": page_size})
+        return payload.get("messages", [])
+
+    async def fetch_account(self) -> Dict:
+        return await self.request("GET", ".json")
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._retire_client()
+
+
+def _shutdown_connections(client: httpx.AsyncClient):
+    pool = getattr(client._transport, "_pool", None)  # httpcore pool behind AsyncHTTPTransport
+    for connection in getattr(pool, "connections", []):
+        stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+        sock = stream.get_extra_info("socket") if stream is not None else None
+        if sock is None:
+            continue
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # already closed by the server
+
+
+# Singleton instance
+_twilio_transport = None
+
+
+def get_twilio_transport() -> TwilioTransport:
+    """Get or create the shared Twilio transport"""
+    global _twilio_transport
+    if _twilio_transport is None:
+        _twilio_transport = TwilioTransport(
+            account_sid=Config.TWILIO_ACCOUNT_SID,
+            auth_token=Config.TWILIO_AUTH_TOKEN,
+            base_url=Config.TWILIO_API_BASE_URL,
+            max_connections=Config.TWILIO_BATCH_CONCURRENCY,
+            timeout=Config.TWILIO_HTTP_TIMEOUT_SECONDS,
+        )
+    return _twilio_transport
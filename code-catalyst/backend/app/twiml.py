@@ -0,0 +1,90 @@
+"""
+TwiML
+Builds the XML documents Twilio plays on voice calls. Text and attribute
+values are escaped (and characters XML can't carry are dropped), so an
+"&" or "<" in a hotline update no longer produces an invalid document.
+Rendered text-to-speech documents are cached by message, so a broadcast
+of one update to many numbers builds its TwiML once.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+TWIML_CACHE_SIZE = 256
+# Twilio rejects inline Twiml parameters longer than this
+MAX_TWIML_LENGTH = 4000
+CONFIRM_PROMPT = "Press 1 to confirm, or hang up."
+
+# Control characters are not allowed anywhere in an XML 1.0 document
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _clean(value) -> str:
+    return _INVALID_XML.sub("", str(value))
+
+
+class VoiceResponse:
+    """
+    A <Response> document built verb by verb
+
+    Example:
+        VoiceResponse().say("Payments resume Monday & Tuesday").pause(1).to_xml()
+    """
+
+    def __init__(self):
+        self._verbs: List[str] = []
+
+    def _verb(self, name: str, text: Optional[str] = None, **attributes) -> "VoiceResponse":
+        attrs = "".join(
+            f" {key}={quoteattr(_clean(value))}" for key, value in attributes.items() if value is not None
+        )
+        if text is None:
+            self._verbs.append(f"<{name}{attrs}/>")
+        else:
+            self._verbs.append(f"<{name}{attrs}>{escape(_clean(text))}</{name}>")
+        return self
+
+    def say(self, text: str, voice: Optional[str] = None, language: Optional[str] = None) -> "VoiceResponse":
+        return self._verb("Say", text, voice=voice, language=language)
+
+    def pause(self, length: int = 1) -> "VoiceResponse":
+        return self._verb("Pause", length=length)
+
+    def play(self, url: str, loop: Optional[int] = None) -> "VoiceResponse":
+        return self._verb("Play", url, loop=loop)
+
+    def hangup(self) -> "VoiceResponse":
+        return self._verb("Hangup")
+
+    def to_xml(self, declaration: bool = True) -> str:
+        """
+        Raises:
+            ValueError: If the document is longer than Twilio accepts inline
+        """
+        header = '<?xml version="1.0" encoding="UTF-8"?>' if declaration else ""
+        document = f"{header}<Response>{''.join(self._verbs)}</Response>"
+        if len(document) > MAX_TWIML_LENGTH:
+            raise ValueError(f"TwiML is {len(document)} characters (Twilio accepts {MAX_TWIML_LENGTH})")
+        return document
+
+
+@lru_cache(maxsize=TWIML_CACHE_SIZE)
+def say_twiml(message: str, confirm_prompt: bool = False) -> str:
+    """
+    TwiML that reads message aloud, optionally followed by the confirm
+    prompt; cached, so repeated broadcasts reuse the document
+
+    Raises:
+        ValueError: If the message is too long for an inline document
+    """
+    response = VoiceResponse().say(message)
+    if confirm_prompt:
+        response.pause(1).say(CONFIRM_PROMPT)
+    return response.to_xml()
+
+
+def cache_stats() -> Dict:
+    info = say_twiml.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
@@ -60,9 +60,9 @@ Provide clean, well-documented Python code.""",
     async def call_claude(prompt: str, code_context: str = "", language: str = "dart") -> str:
         """Call Anthropic Claude for code suggestions"""
         try:
-            from anthropic import Anthropic
+            from anthropic import AsyncAnthropic
             
-            client = Anthropic()
+            client = AsyncAnthropic()
             system_prompt = LLMProcessor.SYSTEM_PROMPTS.get(language, LLMProcessor.SYSTEM_PROMPTS["dart"])
             
             messages = [
@@ -72,7 +72,7 @@ Provide clean, well-documented Python code.""",
                 }
             ]
             
-            response = client.messages.create(
+            response = await client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=2048,
                 system=system_prompt,
@@ -89,12 +89,12 @@ Provide clean, well-documented Python code.""",
     async def call_openai(prompt: str, code_context: str = "", language: str = "dart") -> str:
         """Call OpenAI GPT-4 for code suggestions"""
         try:
-            from openai import OpenAI
+            from openai import AsyncOpenAI
             
-            client = OpenAI()
+            client = AsyncOpenAI()
             system_prompt = LLMProcessor.SYSTEM_PROMPTS.get(language, LLMProcessor.SYSTEM_PROMPTS["dart"])
             
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model="gpt-4",
                 max_tokens=2048,
                 system=system_prompt,
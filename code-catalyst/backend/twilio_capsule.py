@@ -9,19 +9,38 @@ This capsule handles all SMS and voice communication needs:
 - Verification codes
 """
 
+import asyncio
 import os
+from contextlib import nullcontext
 from typing import Dict, Optional, List
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 import logging
 from enum import Enum
 
-# Try to import Twilio, fallback gracefully
+# Async Twilio REST transport shared with the backend's TwilioService: the
+# capsule runs on the backend's app package (from code-catalyst/backend, or
+# with that directory on PYTHONPATH), which needs httpx for the transport
 try:
-    from twilio.rest import Client
+    from app.message_templates import render
+    from app.recipients import clean_recipients
+    from app.twiml import say_twiml
+    from app.sms_outbox import get_sms_outbox
+    from app.sms_scheduler import SenderPool, get_sender_pool
+    from app.sms_segments import estimate_cost, segment_info
+    from app.sms_status import get_delivery_tracker
+    from app.twilio_transport import TwilioTransport, get_twilio_transport
     TWILIO_AVAILABLE = True
-except ImportError:
+except ImportError as e:
+    if not e.name:
+        raise
+    if e.name.split(".")[0] == "app":
+        raise ImportError(
+            "twilio_capsule needs the WealthBridge backend's app package: run it from "
+            "code-catalyst/backend or add that directory to PYTHONPATH"
+        ) from e
     TWILIO_AVAILABLE = False
-    logging.warning("⚠️ Twilio SDK not installed. Install: pip install twilio")
+    logging.warning(f"⚠️ Twilio transport not available. Install: pip install {e.name}")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -58,6 +77,8 @@ class TwilioCapsule:
     
     Handles SMS and voice communications
     Integrates with VaultGemma for credential management
+    All sends are async and go through the shared pooled transport; SMS
+    are paced per sender number by the shared sender pool
     """
     
     def __init__(self):
@@ -66,6 +87,7 @@ class TwilioCapsule:
         self.account_sid = None
         self.auth_token = None
         self.phone_number = None
+        self.senders = None
         self.initialized = False
         
         self._initialize_client()
@@ -73,7 +95,7 @@ class TwilioCapsule:
     def _initialize_client(self):
         """Initialize Twilio client from VaultGemma credentials"""
         if not TWILIO_AVAILABLE:
-            logger.warning("Twilio SDK not available - SMS disabled")
+            logger.warning("Twilio transport not available - SMS disabled")
             return
         
         try:
@@ -83,7 +105,14 @@ class TwilioCapsule:
             self.phone_number = os.getenv("TWILIO_PHONE_NUMBER")
             
             if all([self.account_sid, self.auth_token, self.phone_number]):
-                self.client = Client(self.account_sid, self.auth_token)
+                shared = get_twilio_transport()
+                if (shared.account_sid, shared.auth_token) == (self.account_sid, self.auth_token):
+                    self.client = shared
+                    self.senders = get_sender_pool()
+                else:
+                    # Credentials injected after the backend config was loaded
+                    self.client = TwilioTransport(self.account_sid, self.auth_token, base_url=shared.base_url)
+                    self.senders = SenderPool([(self.phone_number, get_sender_pool().default_mps)])
                 self.initialized = True
                 logger.info("✅ Twilio capsule initialized")
             else:
@@ -92,7 +121,7 @@ class TwilioCapsule:
         except Exception as e:
             logger.error(f"❌ Twilio initialization failed: {e}")
     
-    def send_sms(
+    async def send_sms(
         self,
         to: str,
         message: str,
@@ -105,7 +134,8 @@ class TwilioCapsule:
         
         Args:
             to: Recipient phone number (E.164 format: +1234567890)
-            message: Message body (max 160 chars, or SMS will be split)
+            message: Message body (split into segments past 160 GSM-7 chars,
+                     or 70 if it contains emoji or other non-GSM characters)
             message_type: Type of message for logging/analytics
             campaign_id: Optional campaign reference
             metadata: Optional metadata for tracking
@@ -113,6 +143,18 @@ class TwilioCapsule:
         Returns:
             Dict with status, SID, and delivery info
         """
+        return await self._send_sms(to, message, message_type, campaign_id, metadata)
+    
+    async def _send_sms(
+        self,
+        to: str,
+        message: str,
+        message_type: MessageType,
+        campaign_id: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        in_flight: Optional[asyncio.Semaphore] = None
+    ) -> Dict:
+        """Wait for a sender slot, then send (holding in_flight only for the API call)"""
         
         if not self.initialized:
             logger.error("❌ Twilio not initialized - SMS not sent")
@@ -124,30 +166,34 @@ class TwilioCapsule:
         
         try:
             logger.info(f"📤 Sending SMS to {to}")
+            segments = segment_info(message)
             logger.info(f"   Type: {message_type.value}")
-            logger.info(f"   Length: {len(message)} chars")
+            logger.info(f"   Length: {len(message)} chars ({segments['segments']} {segments['encoding']} segments)")
             
-            # Send SMS via Twilio
-            msg = self.client.messages.create(
-                from_=self.phone_number,
-                to=to,
-                body=message,
-                # Optional: Add tags for analytics
-                tags={
-                    "campaign_id": campaign_id or "none",
-                    "message_type": message_type.value,
-                    "platform": "influwealth"
-                }
-            )
+            # Wait for a slot on the least-busy sender number
+            from_number = await self.senders.acquire()
             
-            logger.info(f"✅ SMS sent: {msg.sid}")
+            # Send SMS via Twilio (asking for status callbacks when configured)
+            tracker = get_delivery_tracker()
+            async with in_flight or nullcontext():
+                msg = await self.client.create_message(
+                    from_=from_number,
+                    to=to,
+                    body=message,
+                    **tracker.callback_params(campaign_id)
+                )
+            await asyncio.to_thread(tracker.track, msg, campaign_id)
+            
+            logger.info(f"✅ SMS sent: {msg['sid']}")
             
             return {
                 "status": "sent",
-                "sid": msg.sid,
+                "sid": msg["sid"],
                 "to": to,
+                "from": from_number,
                 "message_type": message_type.value,
                 "campaign_id": campaign_id,
+                "segments": segments["segments"],
                 "sent_at": datetime.now().isoformat(),
                 "delivery_status": DeliveryStatus.SENT.value,
                 "metadata": metadata or {}
@@ -163,7 +209,7 @@ class TwilioCapsule:
                 "campaign_id": campaign_id
             }
     
-    def send_voice_call(
+    async def send_voice_call(
         self,
         to: str,
         message: str,
@@ -193,26 +239,18 @@ class TwilioCapsule:
         try:
             logger.info(f"📞 Making voice call to {to}")
             
-            # Create TwiML for message
-            twiml = f'''<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say>{message}</Say>
-    <Pause length="1"/>
-    <Say>Press 1 to confirm, or hang up.</Say>
-</Response>'''
-            
-            # Initiate call
-            call = self.client.calls.create(
+            # Initiate call (message escaped into TwiML, cached per message)
+            call = await self.client.create_call(
                 from_=self.phone_number,
                 to=to,
-                twiml=twiml
+                twiml=say_twiml(message, confirm_prompt=True)
             )
             
-            logger.info(f"✅ Voice call initiated: {call.sid}")
+            logger.info(f"✅ Voice call initiated: {call['sid']}")
             
             return {
                 "status": "initiated",
-                "sid": call.sid,
+                "sid": call["sid"],
                 "to": to,
                 "message_type": message_type.value,
                 "campaign_id": campaign_id,
@@ -227,7 +265,7 @@ class TwilioCapsule:
                 "to": to
             }
     
-    def send_bulk_sms(
+    async def send_bulk_sms(
         self,
         recipients: List[str],
         message: str,
@@ -237,6 +275,11 @@ class TwilioCapsule:
         """
         Send SMS to multiple recipients
         
+        Invalid, repeated and opted-out numbers are dropped first (reported
+        under "recipients"). Every remaining recipient is queued on the
+        sender pool up front, so sends go out at the pool's combined MPS;
+        API calls in flight are bounded by the transport's connection pool
+        
         Args:
             recipients: List of phone numbers
             message: Message to send to all
@@ -247,24 +290,29 @@ class TwilioCapsule:
             Dict with results and statistics
         """
         
+        report = None
+        if TWILIO_AVAILABLE:
+            recipients, report = await asyncio.to_thread(clean_recipients, recipients)
+        
         results = {
             "campaign_id": campaign_id,
             "message_type": message_type.value,
             "total": len(recipients),
+            "recipients": report,
             "sent": 0,
             "failed": 0,
+            "segments": estimate_cost(message, len(recipients)) if TWILIO_AVAILABLE else None,
             "messages": [],
             "started_at": datetime.now().isoformat()
         }
         
-        for phone in recipients:
-            result = self.send_sms(
-                to=phone,
-                message=message,
-                message_type=message_type,
-                campaign_id=campaign_id
-            )
-            
+        semaphore = asyncio.Semaphore(self.client.max_connections if self.client else 1)
+        sends = (
+            self._send_sms(phone, message, message_type, campaign_id, in_flight=semaphore)
+            for phone in recipients
+        )
+        
+        for result in await asyncio.gather(*sends):
             results["messages"].append(result)
             
             if result["status"] == "sent":
@@ -279,10 +327,38 @@ class TwilioCapsule:
         
         return results
     
-    def get_message_status(self, message_sid: str) -> Dict:
+    def queue_bulk_sms(
+        self,
+        recipients: List[str],
+        message: str,
+        campaign_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Queue a campaign on the backend's durable SMS outbox
+        
+        Sends are made by the outbox worker with the backend's Twilio
+        credentials, retried with backoff and resumed after a restart;
+        queuing the same campaign_id again skips recipients already queued
+        
+        Returns:
+            Dict with: {batch_id, queued, duplicates, total, recipients}
+        """
+        if not TWILIO_AVAILABLE:
+            return {"status": "failed", "error": "Twilio transport not available"}
+        
+        recipients, report = clean_recipients(recipients)
+        result = get_sms_outbox().enqueue(recipients, message, batch_id=campaign_id)
+        result["recipients"] = report
+        logger.info(f"📥 Campaign {result['batch_id']} queued: {result['queued']}/{result['total']} messages")
+        return result
+    
+    async def get_message_status(self, message_sid: str) -> Dict:
         """
         Get delivery status of a specific message
         
+        Answered from ingested status callbacks when the message is
+        tracked; only untracked messages are fetched from the API
+        
         Args:
             message_sid: Twilio message SID
         
@@ -293,18 +369,30 @@ class TwilioCapsule:
         if not self.initialized:
             return {"status": "unknown", "error": "twilio_not_initialized"}
         
+        tracked = get_delivery_tracker().status(message_sid)
+        if tracked:
+            return {
+                "sid": message_sid,
+                "status": tracked["status"],
+                "to": tracked["to_number"],
+                "campaign_id": tracked["campaign_id"],
+                "error_code": tracked["error_code"],
+                "source": "status_callback"
+            }
+        
         try:
-            msg = self.client.messages(message_sid).fetch()
+            msg = await self.client.fetch_message(message_sid)
+            body = msg.get("body") or ""
             
             return {
-                "sid": msg.sid,
-                "status": msg.status,
-                "from": msg.from_,
-                "to": msg.to,
-                "body": msg.body[:50] + "..." if len(msg.body) > 50 else msg.body,
-                "sent": msg.date_sent.isoformat() if msg.date_sent else None,
-                "error_code": msg.error_code,
-                "error_message": msg.error_message
+                "sid": msg["sid"],
+                "status": msg.get("status"),
+                "from": msg.get("from"),
+                "to": msg.get("to"),
+                "body": body[:50] + "..." if len(body) > 50 else body,
+                "sent": parsedate_to_datetime(msg["date_sent"]).isoformat() if msg.get("date_sent") else None,
+                "error_code": msg.get("error_code"),
+                "error_message": msg.get("error_message")
             }
         
         except Exception as e:
@@ -315,7 +403,17 @@ class TwilioCapsule:
                 "error": str(e)
             }
     
-    def send_verification_code(
+    def get_campaign_delivery(self, campaign_id: str) -> Dict:
+        """
+        Delivery summary for a campaign from ingested status callbacks
+        (no API calls; requires TWILIO_STATUS_CALLBACK_URL)
+        """
+        if not TWILIO_AVAILABLE:
+            return {"campaign_id": campaign_id, "status": "unknown", "error": "Twilio transport not available"}
+        
+        return get_delivery_tracker().summary(campaign_id) or {"campaign_id": campaign_id, "total": 0}
+    
+    async def send_verification_code(
         self,
         to: str,
         code: str,
@@ -333,17 +431,15 @@ class TwilioCapsule:
             Dict with delivery status
         """
         
-        message = f"Your Influwealth verification code is: {code}\n\n" \
-                 f"This code expires in {expires_in_minutes} minutes.\n" \
-                 f"Do not share this code with anyone."
+        message = render("verification_code", code=code, expires_in_minutes=expires_in_minutes)
         
-        return self.send_sms(
+        return await self.send_sms(
             to=to,
             message=message,
             message_type=MessageType.VERIFICATION
         )
     
-    def send_welcome_message(
+    async def send_welcome_message(
         self,
         to: str,
         client_name: str,
@@ -363,18 +459,15 @@ class TwilioCapsule:
             Dict with delivery status
         """
         
-        message = f"Welcome to Influwealth, {client_name}! 🌟\n\n" \
-                 f"Your personal wealth dashboard is ready.\n\n" \
-                 f"👉 {portal_url}\n\n" \
-                 f"Questions? Reply HELP or contact support."
+        message = render("welcome", client_name=client_name, portal_url=portal_url)
         
-        return self.send_sms(
+        return await self.send_sms(
             to=to,
             message=message,
             message_type=MessageType.WELCOME
         )
     
-    def send_reminder(
+    async def send_reminder(
         self,
         to: str,
         reminder_text: str,
@@ -392,17 +485,18 @@ class TwilioCapsule:
             Dict with delivery status
         """
         
-        message = f"📝 Reminder: {reminder_text}"
         if action_url:
-            message += f"\n\n👉 {action_url}"
+            message = render("reminder_with_link", reminder_text=reminder_text, action_url=action_url)
+        else:
+            message = render("reminder", reminder_text=reminder_text)
         
-        return self.send_sms(
+        return await self.send_sms(
             to=to,
             message=message,
             message_type=MessageType.REMINDER
         )
     
-    def health_check(self) -> Dict:
+    async def health_check(self) -> Dict:
         """
         Health check for Twilio connection
         
@@ -419,12 +513,12 @@ class TwilioCapsule:
         
         try:
             # Try to fetch account info
-            account = self.client.api.accounts(self.account_sid).fetch()
+            account = await self.client.fetch_account()
             
             return {
                 "status": "healthy",
                 "account_sid": self.account_sid[:20] + "...",
-                "account_status": account.status,
+                "account_status": account.get("status"),
                 "phone_number": self.phone_number,
                 "timestamp": datetime.now().isoformat()
             }
@@ -448,36 +542,36 @@ from twilio_capsule import TwilioCapsule
 capsule = TwilioCapsule()
 
 @router.post("/twilio/send-sms")
-def send_sms(to: str, message: str, campaign_id: str = None):
-    return capsule.send_sms(to, message, campaign_id=campaign_id)
+async def send_sms(to: str, message: str, campaign_id: str = None):
+    return await capsule.send_sms(to, message, campaign_id=campaign_id)
 
 @router.post("/twilio/send-voice")
-def send_voice(to: str, message: str):
-    return capsule.send_voice_call(to, message)
+async def send_voice(to: str, message: str):
+    return await capsule.send_voice_call(to, message)
 
 @router.post("/twilio/bulk-sms")
-def bulk_sms(recipients: List[str], message: str, campaign_id: str = None):
-    return capsule.send_bulk_sms(recipients, message, campaign_id=campaign_id)
+async def bulk_sms(recipients: List[str], message: str, campaign_id: str = None):
+    return await capsule.send_bulk_sms(recipients, message, campaign_id=campaign_id)
 
 @router.get("/twilio/status/{sid}")
-def message_status(sid: str):
-    return capsule.get_message_status(sid)
+async def message_status(sid: str):
+    return await capsule.get_message_status(sid)
 
 @router.get("/twilio/health")
-def health():
-    return capsule.health_check()
+async def health():
+    return await capsule.health_check()
 """
 
 # ============================================================================
 # USAGE EXAMPLES
 # ============================================================================
 
-if __name__ == "__main__":
+async def main():
     # Initialize
     twilio = TwilioCapsule()
     
     # Send welcome SMS
-    result = twilio.send_welcome_message(
+    result = await twilio.send_welcome_message(
         to="+12025551234",
         client_name="John Doe",
         affiliate_key="abc123def456",
@@ -486,7 +580,7 @@ if __name__ == "__main__":
     print("Welcome SMS:", result)
     
     # Send bulk campaign
-    campaign_result = twilio.send_bulk_sms(
+    campaign_result = await twilio.send_bulk_sms(
         recipients=["+12025551234", "+12025555678"],
         message="New wealth strategies available in your dashboard!",
         message_type=MessageType.CAMPAIGN,
@@ -495,6 +589,10 @@ if __name__ == "__main__":
     print("Campaign results:", campaign_result)
     
     # Health check
-    health = twilio.health_check()
+    health = await twilio.health_check()
     print("Capsule health:", health)
 
+
+if __name__ == "__main__":
+    asyncio.run(main())
+
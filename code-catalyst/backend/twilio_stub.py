@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Twilio Stub Server - Local Twilio-compatible REST API for load testing
+
+Speaks the subset of the Twilio REST API the backend uses:
+- POST /2010-04-01/Accounts/{sid}/Messages.json   (create SMS)
+- GET  /2010-04-01/Accounts/{sid}/Messages.json   (list, To/From/PageSize)
+- GET  /2010-04-01/Accounts/{sid}/Messages/{sid}.json
+- POST /2010-04-01/Accounts/{sid}/Calls.json      (create call)
+- GET  /2010-04-01/Accounts/{sid}.json            (account / health check)
+- GET  /stats                                     (stub counters, not Twilio)
+
+Fault injection: fixed response latency, a random 500 rate, a random 429
+rate, and Twilio's per-sender queue (sends to a number whose queue holds
+more than --queue-seconds of backlog at --mps get 429). To "+15005550001"
+is rejected as invalid (21211), like Twilio's test credentials. Messages
+with a StatusCallback get signed sent/delivered callbacks.
+
+Usage:
+    python twilio_stub.py --port 8099 --latency-ms 50
+    python twilio_stub.py --port 8099 --error-rate 0.01 --throttle-rate 0.05 --mps 1
+
+Then point the backend at it:
+    TWILIO_API_BASE_URL=http://127.0.0.1:8099
+    TWILIO_ACCOUNT_SID=AC00000000000000000000000000000000
+    TWILIO_AUTH_TOKEN=stub
+"""
+
+import argparse
+import base64
+import heapq
+import json
+import logging
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Oldest messages are forgotten past this many (bounds memory on long runs)
+MAX_STORED = 100_000
+# To numbers Twilio's test credentials treat as invalid
+INVALID_NUMBERS = {"+15005550001"}
+ROUTE = re.compile(r"^/2010-04-01/Accounts/(?P<account>[^/.]+)(?P<rest>(/[^?]*)?\.json)$")
+
+
+class StubState:
+    """Messages, calls, counters and fault settings shared by handler threads"""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        mps: float = 0.0,
+        queue_seconds: float = 1.0,
+        delivery_delay: float = 1.0,
+        undelivered_rate: float = 0.0,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.mps = mps
+        self.queue_seconds = queue_seconds
+        self.delivery_delay = delivery_delay
+        self.undelivered_rate = undelivered_rate
+        self.messages: "OrderedDict[str, Dict]" = OrderedDict()
+        self.calls: "OrderedDict[str, Dict]" = OrderedDict()
+        self.drains_at: Dict[str, float] = {}
+        self.counters = {"messages": 0, "calls": 0, "throttled": 0, "errors": 0, "rejected": 0, "callbacks": 0}
+        self.lock = threading.Lock()
+        self.callbacks = CallbackDispatcher(self)
+
+    def count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def sender_over_limit(self, sender: str) -> bool:
+        """Twilio queues each sender's messages at mps and rejects past queue_seconds"""
+        if not self.mps:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            drains_at = max(now, self.drains_at.get(sender, now)) + 1 / self.mps
+            if drains_at - now > self.queue_seconds:
+                return True
+            self.drains_at[sender] = drains_at
+            return False
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {**self.counters, "stored_messages": len(self.messages), "stored_calls": len(self.calls)}
+
+
+class CallbackDispatcher:
+    """Posts signed status callbacks (sent, then delivered/undelivered) on a schedule"""
+
+    def __init__(self, state: StubState, workers: int = 4):
+        self.state = state
+        self._heap: List[Tuple[float, int, Dict]] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def schedule(self, message: Dict, url: str, auth_token: str):
+        final = "undelivered" if random.random() < self.state.undelivered_rate else "delivered"
+        now = time.monotonic()
+        with self._cond:
+            for delay, status in ((0.0, "sent"), (self.state.delivery_delay, final)):
+                self._seq += 1
+                heapq.heappush(self._heap, (now + delay, self._seq, {
+                    "message": message, "status": status, "url": url, "auth_token": auth_token,
+                }))
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, job = heapq.heappop(self._heap)
+            self._pool.submit(self._post, job)
+
+    def _post(self, job: Dict):
+        # Imported here so loading the stub doesn't load (and freeze) the backend Config
+        from app.sms_status import compute_signature
+
+        message = job["message"]
+        with self.state.lock:
+            message["status"] = job["status"]
+            if job["status"] == "undelivered":
+                message["error_code"] = 30003
+                message["error_message"] = "Unreachable destination handset"
+        params = [
+            ("AccountSid", message["account_sid"]),
+            ("MessageSid", message["sid"]),
+            ("SmsSid", message["sid"]),
+            ("MessageStatus", job["status"]),
+            ("SmsStatus", job["status"]),
+            ("To", message["to"]),
+            ("From", message["from"]),
+            ("ApiVersion", "2010-04-01"),
+        ]
+        if job["status"] == "undelivered":
+            params.append(("ErrorCode", "30003"))
+        request = urllib.request.Request(job["url"], data=urlencode(params).encode("utf-8"), headers={
+            "Content-Type": "application/x-www-form-urlencoded",
+            "X-Twilio-Signature": compute_signature(job["url"], params, job["auth_token"]),
+        })
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+            self.state.count("callbacks")
+        except Exception as e:
+            logger.warning(f"⚠️ Status callback to {job['url']} failed: {e}")
+
+
+class TwilioStubHandler(BaseHTTPRequestHandler):
+    """Routes Twilio REST calls to the stub state on self.server.state"""
+
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment (split writes hit delayed ACKs)
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    def _send(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, code: int, message: str):
+        self._send(status, {
+            "code": code,
+            "message": message,
+            "more_info": f"https://www.twilio.com/docs/errors/{code}",
+            "status": status,
+        })
+
+    def _auth_token(self, account: str) -> Optional[str]:
+        """Basic auth password, if the username matches the account in the URL"""
+        scheme, _, encoded = self.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "basic":
+            return None
+        try:
+            username, _, password = base64.b64decode(encoded).decode("utf-8").partition(":")
+        except ValueError:
+            return None
+        return password if username == account and password else None
+
+    def _route(self, method: str):
+        url = urlsplit(self.path)
+        if method == "GET" and url.path == "/stats":
+            return self._send(200, self.state.stats())
+
+        form = []
+        if method == "POST":
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qsl(self.rfile.read(length).decode("utf-8"), keep_blank_values=True)
+
+        match = ROUTE.match(url.path)
+        if not match:
+            return self._error(404, 20404, f"The requested resource {url.path} was not found")
+        account, rest = match.group("account"), match.group("rest")
+        auth_token = self._auth_token(account)
+        if auth_token is None:
+            return self._error(401, 20003, "Authentication Error - invalid username")
+
+        time.sleep(self.state.latency)
+        if random.random() < self.state.error_rate:
+            self.state.count("errors")
+            return self._error(500, 20500, "Internal Server Error")
+        if random.random() < self.state.throttle_rate:
+            self.state.count("throttled")
+            return self._error(429, 20429, "Too Many Requests")
+
+        params = dict(form)
+        query = dict(parse_qsl(url.query))
+        if method == "POST" and rest == "/Messages.json":
+            return self._create_message(account, params, auth_token)
+        if method == "GET" and rest == "/Messages.json":
+            return self._list_messages(account, query)
+        if method == "GET" and rest.startswith("/Messages/"):
+            message = self.state.messages.get(rest[len("/Messages/"):-len(".json")])
+            if message is None:
+                return self._error(404, 20404, "The requested resource was not found")
+            return self._send(200, message)
+        if method == "POST" and rest == "/Calls.json":
+            return self._create_call(account, params)
+        if method == "GET" and rest == ".json":
+            return self._send(200, {"sid": account, "friendly_name": "Twilio stub", "status": "active", "type": "Full"})
+        return self._error(404, 20404, f"The requested resource {url.path} was not found")
+
+    def _create_message(self, account: str, params: Dict[str, str], auth_token: str):
+        to, sender, body = params.get("To"), params.get("From"), params.get("Body")
+        if not to or not sender or body is None:
+            self.state.count("rejected")
+            return self._error(400, 21604, "A 'To', 'From' and 'Body' parameter is required")
+        if to in INVALID_NUMBERS:
+            self.state.count("rejected")
+            return self._error(400, 21211, f"The 'To' number {to} is not a valid phone number.")
+        if self.state.sender_over_limit(sender):
+            self.state.count("throttled")
+            return self._error(429, 20429, "Too Many Requests")
+
+        sid = "SM" + uuid.uuid4().hex
+        now = formatdate(usegmt=True)
+        message = {
+            "sid": sid,
+            "account_sid": account,
+            "to": to,
+            "from": sender,
+            "body": body,
+            "status": "queued",
+            "direction": "outbound-api",
+            "num_segments": "1",
+            "date_created": now,
+            "date_updated": now,
+            "date_sent": None,
+            "error_code": None,
+            "error_message": None,
+            "uri": f"/2010-04-01/Accounts/{account}/Messages/{sid}.json",
+        }
+        with self.state.lock:
+            self.state.messages[sid] = message
+            if len(self.state.messages) > MAX_STORED:
+                self.state.messages.popitem(last=False)
+            self.state.counters["messages"] += 1
+        if params.get("StatusCallback"):
+            self.state.callbacks.schedule(message, params["StatusCallback"], auth_token)
+        self._send(201, message)
+
+    def _list_messages(self, account: str, query: Dict[str, str]):
+        page_size = int(query.get("PageSize", 50))
+        with self.state.lock:
+            matches = [
+                message for message in reversed(list(self.state.messages.values()))
+                if message["account_sid"] == account
+                and query.get("To", message["to"]) == message["to"]
+                and query.get("From", message["from"]) == message["from"]
+            ][:page_size]
+        self._send(200, {"messages": matches, "page": 0, "page_size": page_size})
+
+    def _create_call(self, account: str, params: Dict[str, str]):
+        if not params.get("To") or not params.get("From"):
+            self.state.count("rejected")
+            return self._error(400, 21201, "A 'To' and 'From' parameter is required")
+        sid = "CA" + uuid.uuid4().hex
+        call = {
+            "sid": sid,
+            "account_sid": account,
+            "to": params["To"],
+            "from": params["From"],
+            "status": "queued",
+            "direction": "outbound-api",
+            "date_created": formatdate(usegmt=True),
+            "uri": f"/2010-04-01/Accounts/{account}/Calls/{sid}.json",
+        }
+        with self.state.lock:
+            self.state.calls[sid] = call
+            if len(self.state.calls) > MAX_STORED:
+                self.state.calls.popitem(last=False)
+            self.state.counters["calls"] += 1
+        self._send(201, call)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(host: str = "127.0.0.1", port: int = 0, **settings) -> ThreadingHTTPServer:
+    """Build a stub server (port 0 picks a free port); call serve_forever() to run it"""
+    server = ThreadingHTTPServer((host, port), TwilioStubHandler)
+    server.daemon_threads = True
+    server.state = StubState(**settings)
+    return server
+
+
+def serve(settings: Dict, ready=None, host: str = "127.0.0.1", port: int = 0):
+    """Run a stub until killed; puts the bound port on `ready` (multiprocessing target)"""
+    server = create_server(host, port, **settings)
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Twilio-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Delay before every response")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered 500")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered 429")
+    parser.add_argument("--mps", type=float, default=0, help="Per-sender messages per second (0 = unlimited)")
+    parser.add_argument("--queue-seconds", type=float, default=1, help="Per-sender backlog before 429")
+    parser.add_argument("--delivery-delay", type=float, default=1, help="Seconds from sent to delivered callback")
+    parser.add_argument("--undelivered-rate", type=float, default=0, help="Fraction of messages reported undelivered")
+    args = parser.parse_args()
+
+    server = create_server(
+        args.host,
+        args.port,
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        mps=args.mps,
+        queue_seconds=args.queue_seconds,
+        delivery_delay=args.delivery_delay,
+        undelivered_rate=args.undelivered_rate,
+    )
+    logger.info(f"📡 Twilio stub listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("🛑 Twilio stub stopped")
+
+
+if __name__ == "__main__":
+    main()
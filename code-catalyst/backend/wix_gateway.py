@@ -20,6 +20,8 @@ import logging
 import json
 from enum import Enum
 
+from app.message_templates import render
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -136,10 +138,7 @@ def send_welcome_sms(
 ) -> Dict:
     """Send welcome SMS via Twilio capsule"""
     
-    message = f"Welcome to Influwealth, {client_name}! 🌟\n\n" \
-             f"Your personal wealth dashboard is ready.\n\n" \
-             f"👉 {portal_url}\n\n" \
-             f"Questions? Reply HELP or contact support."
+    message = render("welcome", client_name=client_name, portal_url=portal_url)
     
     logger.info(f"📱 Sending welcome SMS to {phone}")
     
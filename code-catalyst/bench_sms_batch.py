@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Batch SMS Benchmark
+Sends a batch through TwilioService against the local Twilio stub
+(backend/twilio_stub.py) and reports throughput and the longest
+event-loop stall seen during each run
+
+Without --mps: once serially (concurrency 1), once at --concurrency
+With --mps: like Twilio, the stub queues each sender number's messages
+at that rate and rejects sends once a number's queue holds more than
+--queue-seconds of backlog (HTTP 429); the batch runs once unpaced and
+once through the sender pool's token buckets
+
+Usage:
+    python bench_sms_batch.py
+    python bench_sms_batch.py --recipients 5000 --latency-ms 40 --concurrency 50
+    python bench_sms_batch.py --recipients 300 --senders 3 --mps 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import multiprocessing
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from twilio_stub import serve
+
+
+async def run_batch(service, recipients, concurrency):
+    """Send one batch while a ticker measures how long the loop is blocked"""
+    max_stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_stall
+        while not done.is_set():
+            started = time.monotonic()
+            await asyncio.sleep(0.01)
+            max_stall = max(max_stall, time.monotonic() - started - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    started = time.monotonic()
+    result = await service.send_sms_batch(recipients, "Benchmark message", concurrency=concurrency)
+    elapsed = time.monotonic() - started
+    done.set()
+    await tick
+    return result, elapsed, max_stall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TwilioService.send_sms_batch")
+    parser.add_argument("--recipients", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Stub API response delay")
+    parser.add_argument("--concurrency", type=int, default=20, help="TWILIO_BATCH_CONCURRENCY")
+    parser.add_argument("--senders", type=int, default=1, help="Sender numbers in the pool")
+    parser.add_argument("--mps", type=float, default=0, help="Per-number limit enforced by the stub (0 = none)")
+    parser.add_argument("--queue-seconds", type=float, default=1, help="Backlog per number before the stub rejects")
+    args = parser.parse_args()
+
+    # Stub in its own process so it doesn't compete for the client's GIL
+    settings = {"latency": args.latency_ms / 1000, "mps": args.mps, "queue_seconds": args.queue_seconds}
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(settings, ready), daemon=True)
+    server.start()
+    port = ready.get(timeout=10)
+
+    numbers = [f"+1555000{i:04d}" for i in range(args.senders)]
+    # Config reads the environment at import time
+    os.environ.update({
+        "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+        "TWILIO_AUTH_TOKEN": "bench",
+        "TWILIO_PHONE_NUMBER": numbers[0],
+        "TWILIO_SENDER_NUMBERS": ",".join(numbers),
+        "TWILIO_MPS_PER_NUMBER": str(args.mps or 1e6),
+        "TWILIO_BATCH_CONCURRENCY": str(args.concurrency),
+        "TWILIO_BATCH_MAX_ETA_SECONDS": "inf",  # measure any batch size
+        "TWILIO_API_BASE_URL": f"http://127.0.0.1:{port}",
+    })
+    import logging
+    logging.disable(logging.ERROR)
+    from app.sms_scheduler import SenderPool
+    from app.twilio_service import TwilioService
+
+    service = TwilioService()
+    paced = service.senders
+    unpaced = SenderPool([(number, 1e6) for number in numbers])
+    recipients = [f"+1555{i:07d}" for i in range(args.recipients)]
+
+    if args.mps:
+        print(
+            f"📱 {args.recipients} recipients, {args.senders} senders x {args.mps:g} msg/s "
+            f"(max {args.senders * args.mps:g} msg/s), {args.latency_ms:g} ms stub API latency"
+        )
+        runs = (("unpaced", args.concurrency, unpaced), ("paced", args.concurrency, paced))
+    else:
+        print(f"📱 {args.recipients} recipients, {args.latency_ms:g} ms stub API latency")
+        runs = (("serial", 1, unpaced), ("concurrent", args.concurrency, unpaced))
+
+    first_rate = None
+    for label, concurrency, pool in runs:
+        if args.mps and first_rate:
+            time.sleep(args.queue_seconds)  # let the stub's sender queues drain after the previous run
+        service.senders = pool
+        result, elapsed, max_stall = asyncio.run(run_batch(service, recipients, concurrency))
+        rate = result["sent_count"] / elapsed
+        first_rate = first_rate or rate
+        print(
+            f"  {label:<10} concurrency={result['concurrency']:<4} "
+            f"sent={result['sent_count']:<5} failed={result['failed_count']:<4} "
+            f"{elapsed:7.2f}s (ETA {result['eta_seconds']:.1f}s)  {rate:8.1f} msg/s  x{rate / first_rate:.1f}  "
+            f"max loop stall {max_stall * 1000:.1f} ms"
+        )
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ Command-line interface for Code Catalyst backend
 import typer
 import httpx
 import json
-from typing import Optional
+from typing import List, Optional
 from rich.console import Console
 from rich.table import Table
 from rich.syntax import Syntax
@@ -235,11 +235,17 @@ def config():
 
 
 @app.command()
-def status(task_id: str = typer.Argument(..., help="Task ID to check")):
+def status(
+    task_id: str = typer.Argument(..., help="Task ID to check"),
+    wait: bool = typer.Option(False, "--wait", "-w", help="Wait for completion via the task event stream"),
+):
     """Check task status"""
     console.print(f"📋 Checking task {task_id}...", style="cyan")
     
     try:
+        if wait:
+            wait_for_task(task_id)
+        
         with httpx.Client(timeout=TIMEOUT) as client:
             response = client.get(f"{get_backend_url()}/api/task/{task_id}")
             response.raise_for_status()
@@ -254,5 +260,84 @@ def status(task_id: str = typer.Argument(..., help="Task ID to check")):
         raise typer.Exit(code=1)
 
 
+def wait_for_task(task_id: str):
+    """Block on the server-sent event stream until the task's final event"""
+    # Server sends a keepalive every ~15s, so a silent minute means it's gone
+    timeout = httpx.Timeout(TIMEOUT, read=60.0)
+    
+    with httpx.Client(timeout=timeout) as client:
+        with client.stream("GET", f"{get_backend_url()}/api/task/{task_id}/events") as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                console.print(f"⏳ {event['event']}: {event['status']} ({event.get('agent')})", style="yellow")
+                if event["final"]:
+                    return
+
+
+@app.command()
+def review_repo(
+    paths: Optional[List[str]] = typer.Argument(None, help="Paths under the WealthBridge root (default: lib)"),
+    issues: bool = typer.Option(False, "--issues", "-i", help="Show issues for files that fail review"),
+):
+    """Review every Dart file under the given paths"""
+    console.print(f"📋 Reviewing Dart files under {', '.join(paths or ['lib'])}...", style="cyan")
+    
+    try:
+        with httpx.Client(timeout=120.0) as client:
+            response = client.post(
+                f"{get_backend_url()}/api/agents/dart/review-repo",
+                json={"paths": paths or ["lib"], "include_issues": issues},
+            )
+            response.raise_for_status()
+            result = response.json()
+        
+        # Create table
+        table = Table(title="📋 Dart Review by Directory")
+        table.add_column("Directory", style="cyan")
+        table.add_column("Files", style="magenta")
+        table.add_column("Avg Score", style="green")
+        table.add_column("Min", style="yellow")
+        table.add_column("Errors", style="red")
+        table.add_column("Warnings", style="yellow")
+        
+        for directory, summary in result["directories"].items():
+            table.add_row(
+                directory,
+                str(summary["files"]),
+                str(summary["average_score"]),
+                str(summary["min_score"]),
+                str(summary["errors"]),
+                str(summary["warnings"]),
+            )
+        
+        console.print(table)
+        console.print(
+            f"Files: {result['total_files']} ({result['reviewed_files']} reviewed, "
+            f"{result['cached_files']} cached) in {result['duration_seconds']}s",
+            style="blue",
+        )
+        console.print(f"Average score: {result['average_score']}", style="magenta")
+        
+        for entry in result["files"]:
+            if entry["pass_review"] and not entry.get("issues"):
+                continue
+            style = "red" if not entry["pass_review"] else "yellow"
+            console.print(f"\n{entry['path']} ({entry['code_quality_score']})", style=style)
+            for issue in entry.get("issues", []):
+                console.print(f"  - line {issue['line']}: {issue['message']}", style=style)
+        
+        if result["pass_review"]:
+            console.print("✅ All files pass review", style="green")
+        else:
+            console.print("⚠️ Some files fail review", style="yellow")
+    
+    except Exception as e:
+        console.print(f"❌ Error: {str(e)}", style="red")
+        raise typer.Exit(code=1)
+
+
 if __name__ == "__main__":
     app()
@@ -7,20 +7,69 @@ Usage:
     codecatalyst notify --channel sms --message "Hello from CodeCatalyst"
     codecatalyst notify --channel email --to support@team.com --subject "Deployment complete"
     codecatalyst notify --channel slack --webhook-url https://hooks.slack.com/... --text "Build succeeded"
+
+With --channel all, channels are sent to concurrently over one pooled
+HTTP session, so the command takes as long as the slowest channel.
+
+Daemon mode (for CI pipelines that notify once per event):
+    codecatalyst notify --daemon --window 5 &
+    codecatalyst notify --channel slack --text "Step 3 passed"
+
+While a daemon listens on the notify socket, each call hands its
+notification over and exits; bursts for the same channel and destination
+are coalesced into one digest per window and sent over warm connections.
+Console output stays local, and --direct (or no daemon) sends as before.
 """
 
 import argparse
 import sys
 import os
 import json
-import requests
-from typing import Dict, Optional
+import time
+import signal
+import socket
+import socketserver
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 from datetime import datetime
 import logging
 
+# requests is imported where it is first used: handing a notification to
+# the daemon never touches HTTP and should not pay for loading it
+if TYPE_CHECKING:
+    import requests
+
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
+# Request timeout per channel in seconds (--timeout overrides all of them)
+CHANNEL_TIMEOUTS = {"sms": 10, "email": 10, "slack": 5, "discord": 5}
+# Results counted as delivered
+DELIVERED_STATUSES = ("sent", "printed")
+ALL_CHANNELS = ["sms", "email", "slack", "discord", "console"]
+
+# Daemon socket and coalescing window (--socket and --window override)
+DAEMON_SOCKET = os.getenv("NOTIFY_SOCKET", "/tmp/codecatalyst-notify.sock")
+COALESCE_WINDOW_SECONDS = float(os.getenv("NOTIFY_COALESCE_SECONDS", "5"))
+# A burst this large is sent at once instead of waiting out the window
+DIGEST_MAX_ITEMS = 50
+# Notifications share a digest only when these fields match as well as the channel
+DIGEST_KEY_FIELDS = ("to", "webhook_url", "title", "color")
+# Field holding each channel's text
+DIGEST_TEXT_FIELDS = {"sms": "message", "console": "message", "slack": "text", "discord": "text", "email": "body"}
+
+def create_session(pool_size: int = 8) -> "requests.Session":
+    """HTTP session whose keep-alive connections are shared by every channel"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 # ============================================================================
 # NOTIFICATION CHANNELS
 # ============================================================================
@@ -28,9 +77,14 @@ logger = logging.getLogger(__name__)
 class NotificationChannel:
     """Base class for notification channels"""
     
-    def __init__(self):
+    def __init__(self, session: Optional["requests.Session"] = None, timeout: float = 10):
         self.name = "base"
         self.required_fields = []
+        if session is None:
+            import requests
+            session = requests
+        self.session = session
+        self.timeout = timeout
     
     def send(self, **kwargs) -> Dict:
         raise NotImplementedError
@@ -38,8 +92,8 @@ class NotificationChannel:
 class SMSChannel(NotificationChannel):
     """SMS notifications via Twilio"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: Optional["requests.Session"] = None, timeout: float = 10):
+        super().__init__(session, timeout)
         self.name = "sms"
         self.required_fields = ["message"]
         self.api_endpoint = "http://localhost:8000/twilio/send-sms"
@@ -55,10 +109,10 @@ class SMSChannel(NotificationChannel):
         try:
             logger.info(f"📱 Sending SMS to {phone}...")
             
-            response = requests.post(
+            response = self.session.post(
                 self.api_endpoint,
                 json={"to": phone, "message": message},
-                timeout=10
+                timeout=self.timeout
             )
             
             if response.ok:
@@ -80,8 +134,8 @@ class SMSChannel(NotificationChannel):
 class EmailChannel(NotificationChannel):
     """Email notifications"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: Optional["requests.Session"] = None, timeout: float = 10):
+        super().__init__(session, timeout)
         self.name = "email"
         self.required_fields = ["subject", "body"]
         self.api_endpoint = "http://localhost:8000/email/send"
@@ -92,7 +146,7 @@ class EmailChannel(NotificationChannel):
         logger.info(f"📧 Sending email to {to}...")
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_endpoint,
                 json={
                     "to": to,
@@ -100,7 +154,7 @@ class EmailChannel(NotificationChannel):
                     "body": body,
                     "html": True
                 },
-                timeout=10
+                timeout=self.timeout
             )
             
             if response.ok:
@@ -117,8 +171,8 @@ class EmailChannel(NotificationChannel):
 class SlackChannel(NotificationChannel):
     """Slack notifications via webhook"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: Optional["requests.Session"] = None, timeout: float = 10):
+        super().__init__(session, timeout)
         self.name = "slack"
         self.required_fields = ["text"]
     
@@ -145,7 +199,7 @@ class SlackChannel(NotificationChannel):
                 }]
             }
             
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             
             if response.ok:
                 logger.info("✅ Slack notification sent")
@@ -161,8 +215,8 @@ class SlackChannel(NotificationChannel):
 class DiscordChannel(NotificationChannel):
     """Discord notifications"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: Optional["requests.Session"] = None, timeout: float = 10):
+        super().__init__(session, timeout)
         self.name = "discord"
         self.required_fields = ["text"]
     
@@ -184,7 +238,7 @@ class DiscordChannel(NotificationChannel):
                 "avatar_url": "https://platform.slack-edge.com/img/default_application_icon.png"
             }
             
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             
             if response.ok:
                 logger.info("✅ Discord notification sent")
@@ -200,8 +254,10 @@ class DiscordChannel(NotificationChannel):
 class ConsoleChannel(NotificationChannel):
     """Local console output"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: Optional["requests.Session"] = None, timeout: float = 10):
+        # Prints locally, so it needs no HTTP session
+        self.session = session
+        self.timeout = timeout
         self.name = "console"
         self.required_fields = ["message"]
     
@@ -219,16 +275,35 @@ class ConsoleChannel(NotificationChannel):
 # ============================================================================
 
 class NotificationBuilder:
-    """Build and send notifications to multiple channels"""
+    """
+    Build and send notifications to multiple channels
+    
+    Channels share one pooled HTTP session; send_all() runs them in
+    parallel, each bounded by its own timeout (CHANNEL_TIMEOUTS, or
+    `timeout` for all of them)
+    """
     
-    def __init__(self):
+    def __init__(self, timeout: Optional[float] = None, session: Optional["requests.Session"] = None):
+        self.session = session or create_session()
+        
+        def limit(name: str) -> float:
+            return timeout or CHANNEL_TIMEOUTS.get(name, 10)
+        
         self.channels = {
-            "sms": SMSChannel(),
-            "email": EmailChannel(),
-            "slack": SlackChannel(),
-            "discord": DiscordChannel(),
-            "console": ConsoleChannel()
+            "sms": SMSChannel(self.session, limit("sms")),
+            "email": EmailChannel(self.session, limit("email")),
+            "slack": SlackChannel(self.session, limit("slack")),
+            "discord": DiscordChannel(self.session, limit("discord")),
+            "console": ConsoleChannel(self.session, limit("console"))
         }
+        self._pool: Optional[ThreadPoolExecutor] = None
+    
+    def close(self):
+        """Release the worker threads and pooled connections"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self.session.close()
     
     def send(self, channel: str, **kwargs) -> Dict:
         """Send notification to specified channel"""
@@ -247,19 +322,307 @@ class NotificationBuilder:
         
         return ch.send(**kwargs)
     
-    def send_all(self, channels: list, **kwargs) -> Dict:
-        """Send to multiple channels"""
+    def _timed_send(self, channel: str, kwargs: Dict) -> Dict:
+        started = time.monotonic()
+        try:
+            result = self.send(channel, **kwargs)
+        except Exception as e:
+            logger.error(f"❌ {channel} error: {e}")
+            result = {"status": "error", "channel": channel, "error": str(e)}
+        result["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return result
+    
+    def send_all(self, channels: List[str], **kwargs) -> Dict:
+        """
+        Send to multiple channels concurrently
+        
+        Returns:
+            Dict with: {timestamp, status, sent, failed, duration_ms,
+            channels}; status is "sent", "partial" or "error" and channels
+            holds {channel: result} in the order given
+        """
+        
+        started = time.monotonic()
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=len(self.channels), thread_name_prefix="notify")
+        futures = [self._pool.submit(self._timed_send, ch, kwargs) for ch in channels]
+        outcomes = [future.result() for future in futures]
+        
+        sent = sum(result.get("status") in DELIVERED_STATUSES for result in outcomes)
+        failed = len(outcomes) - sent
         
-        results = {
+        return {
             "timestamp": datetime.now().isoformat(),
-            "channels": []
+            "status": "error" if channels and not sent else ("partial" if failed else "sent"),
+            "sent": sent,
+            "failed": failed,
+            "duration_ms": round((time.monotonic() - started) * 1000, 1),
+            "channels": [{ch: result} for ch, result in zip(channels, outcomes)]
         }
+
+# ============================================================================
+# DAEMON MODE
+# ============================================================================
+
+def build_digest(channel: str, notifications: List[Dict]) -> Dict:
+    """
+    Fold a burst of notifications for one channel and destination into
+    the fields of a single message (a lone notification passes unchanged)
+    """
+    if len(notifications) == 1:
+        return dict(notifications[0])
+    
+    digest = dict(notifications[-1])
+    count = len(notifications)
+    
+    if channel == "email":
+        digest["subject"] = f"{count} notifications: {notifications[0]['subject']}"
+        digest["body"] = "<hr>".join(
+            f"<p><b>{n['subject']}</b></p>{n['body']}" for n in notifications
+        )
+    else:
+        field = DIGEST_TEXT_FIELDS.get(channel, "message")
+        # "-" rather than "•", which is outside GSM-7 and would make SMS digests UCS-2
+        digest[field] = f"{count} notifications:\n" + "\n".join(f"- {n[field]}" for n in notifications)
+    
+    return digest
+
+class Coalescer:
+    """
+    Buffers notifications per channel and destination, sending each burst
+    as one digest once `window` seconds have passed since its first
+    notification (or as soon as it reaches `max_items`)
+    
+    Sends never run in the caller's thread: add() is called from the
+    daemon's socket handler, which has to reply before the client times out
+    """
+    
+    def __init__(self, builder: NotificationBuilder, window: float = COALESCE_WINDOW_SECONDS,
+                 max_items: int = DIGEST_MAX_ITEMS):
+        self.builder = builder
+        self.window = window
+        self.max_items = max_items
+        self.stats = {"received": 0, "digests": 0, "sent": 0, "failed": 0}
+        self._pending: Dict[Tuple, List[Dict]] = {}
+        self._timers: Dict[Tuple, threading.Timer] = {}
+        self._senders: Set[threading.Thread] = set()
+        self._lock = threading.Lock()
+    
+    def add(self, channel: str, kwargs: Dict):
+        key = (channel,) + tuple(kwargs.get(field) for field in DIGEST_KEY_FIELDS)
+        ready = None
+        
+        with self._lock:
+            self.stats["received"] += 1
+            burst = self._pending.setdefault(key, [])
+            burst.append(kwargs)
+            
+            if self.window <= 0 or len(burst) >= self.max_items:
+                ready = self._take(key)
+            elif key not in self._timers:
+                timer = threading.Timer(self.window, self._flush_key, (key,))
+                timer.daemon = True
+                self._timers[key] = timer
+                timer.start()
+        
+        if ready:
+            sender = threading.Thread(target=self._send, args=(channel, ready), daemon=True)
+            with self._lock:
+                self._senders.add(sender)
+            sender.start()
+    
+    def flush(self):
+        """Send everything still buffered and wait for sends in progress (used on shutdown)"""
+        with self._lock:
+            bursts = [(key[0], self._take(key)) for key in list(self._pending)]
+            senders = list(self._senders)
+        for channel, burst in bursts:
+            self._deliver(channel, burst)
+        for sender in senders:
+            sender.join()
+    
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(burst) for burst in self._pending.values())
+    
+    def _take(self, key: Tuple) -> List[Dict]:
+        # Caller holds the lock
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        return self._pending.pop(key, [])
+    
+    def _flush_key(self, key: Tuple):
+        # Runs on the window timer's thread; registered like add()'s senders so flush() waits for it
+        with self._lock:
+            self._timers.pop(key, None)
+            burst = self._pending.pop(key, [])
+            if burst:
+                self._senders.add(threading.current_thread())
+        if burst:
+            self._send(key[0], burst)
+    
+    def _send(self, channel: str, burst: List[Dict]):
+        try:
+            self._deliver(channel, burst)
+        finally:
+            with self._lock:
+                self._senders.discard(threading.current_thread())
+    
+    def _deliver(self, channel: str, burst: List[Dict]):
+        result = self.builder._timed_send(channel, build_digest(channel, burst))
+        delivered = result.get("status") in DELIVERED_STATUSES
         
-        for ch in channels:
-            result = self.send(ch, **kwargs)
-            results["channels"].append({ch: result})
+        with self._lock:
+            self.stats["digests"] += 1
+            self.stats["sent" if delivered else "failed"] += len(burst)
         
-        return results
+        if len(burst) > 1:
+            logger.info(f"📦 {channel}: {len(burst)} notifications sent as one digest ({result.get('status')})")
+
+class NotifyDaemon:
+    """
+    Long-running notifier listening on a Unix socket
+    
+    Clients write one JSON request per line, {"channels": [...],
+    "kwargs": {...}}, and get a reply line as soon as it is queued.
+    One NotificationBuilder is kept for the daemon's lifetime, so digests
+    go out over already-open connections. {"op": "stats"} reports counters
+    and {"op": "flush"} sends everything buffered.
+    """
+    
+    def __init__(self, socket_path: str = DAEMON_SOCKET, window: float = COALESCE_WINDOW_SECONDS,
+                 timeout: Optional[float] = None, builder: Optional[NotificationBuilder] = None):
+        self.socket_path = socket_path
+        self.builder = builder or NotificationBuilder(timeout=timeout)
+        self.coalescer = Coalescer(self.builder, window)
+        self._server: Optional[socketserver.BaseServer] = None
+    
+    def handle(self, request: Dict) -> Dict:
+        """Validate and queue one request; returns the reply for the client"""
+        
+        op = request.get("op", "send")
+        if op == "stats":
+            return {"status": "ok", "pending": self.coalescer.pending(), **self.coalescer.stats}
+        if op == "flush":
+            self.coalescer.flush()
+            return {"status": "ok", **self.coalescer.stats}
+        if op != "send":
+            return {"status": "error", "error": f"Unknown op: {op}"}
+        
+        channels = request.get("channels") or []
+        kwargs = request.get("kwargs") or {}
+        if not isinstance(channels, list) or not isinstance(kwargs, dict):
+            return {"status": "error", "error": "channels must be a list and kwargs an object"}
+        
+        queued, errors = [], {}
+        for channel in channels:
+            ch = self.builder.channels.get(channel)
+            if ch is None:
+                errors[channel] = f"Unknown channel: {channel}"
+                continue
+            missing = [field for field in ch.required_fields if field not in kwargs]
+            if missing:
+                errors[channel] = f"Missing: {', '.join(missing)}"
+                continue
+            self.coalescer.add(channel, kwargs)
+            queued.append(channel)
+        
+        reply = {
+            "status": "error" if not queued else ("partial" if errors else "queued"),
+            "queued": queued,
+            "errors": errors,
+            "window_seconds": self.coalescer.window
+        }
+        if not queued:
+            reply["error"] = "; ".join(f"{ch}: {error}" for ch, error in errors.items()) or "No channels"
+        return reply
+    
+    def serve_forever(self):
+        """
+        Listen until interrupted, then send whatever is still buffered
+        
+        Raises:
+            RuntimeError: If Unix sockets are unavailable or another daemon
+            already owns the socket
+        """
+        if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+            raise RuntimeError("Daemon mode needs Unix domain sockets")
+        
+        if os.path.exists(self.socket_path):
+            if _daemon_listening(self.socket_path):
+                raise RuntimeError(f"A notify daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)  # left behind by a daemon that did not exit cleanly
+        
+        daemon = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        reply = daemon.handle(json.loads(line))
+                    except ValueError as e:
+                        reply = {"status": "error", "error": f"Invalid request: {e}"}
+                    self.wfile.write((json.dumps(reply) + "\n").encode())
+        
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"🚀 Notify daemon listening on {self.socket_path} (window {self.coalescer.window}s)")
+        
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.coalescer.flush()
+            self.builder.close()
+            logger.info(f"👋 Notify daemon stopped: {self.coalescer.stats}")
+    
+    def shutdown(self):
+        """Stop serve_forever() from another thread"""
+        if self._server is not None:
+            self._server.shutdown()
+
+def _daemon_listening(socket_path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def send_via_daemon(channels: List[str], kwargs: Dict, socket_path: str = DAEMON_SOCKET,
+                    timeout: float = 2.0) -> Optional[Dict]:
+    """
+    Hand a notification to a running daemon
+    
+    Returns:
+        The daemon's reply, or None when no daemon is listening (the
+        caller then sends directly)
+    """
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+            sock.sendall((json.dumps({"channels": channels, "kwargs": kwargs}) + "\n").encode())
+        except OSError as e:
+            logger.debug(f"Notify daemon unavailable: {e}")
+            return None
+        
+        # Once sent, the daemon may have queued it: report rather than send twice
+        try:
+            reply = sock.makefile("rb").readline()
+        except OSError as e:
+            return {"status": "error", "error": f"No reply from notify daemon: {e}"}
+    
+    if not reply:
+        return {"status": "error", "error": "Notify daemon closed the connection"}
+    return json.loads(reply)
 
 # ============================================================================
 # CLI INTERFACE
@@ -328,6 +691,37 @@ Examples:
         help="Message title"
     )
     
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Request timeout per channel in seconds (default: 10 for SMS/email, 5 for Slack/Discord)"
+    )
+    
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run as a daemon that coalesces notifications arriving on --socket"
+    )
+    
+    parser.add_argument(
+        "--socket",
+        default=DAEMON_SOCKET,
+        help=f"Daemon socket path (default: $NOTIFY_SOCKET or {DAEMON_SOCKET})"
+    )
+    
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=COALESCE_WINDOW_SECONDS,
+        help="Daemon coalescing window in seconds; 0 sends each notification as it arrives (default: 5)"
+    )
+    
+    parser.add_argument(
+        "--direct",
+        action="store_true",
+        help="Send directly even if a daemon is listening"
+    )
+    
     parser.add_argument(
         "--json",
         action="store_true",
@@ -336,6 +730,19 @@ Examples:
     
     args = parser.parse_args()
     
+    if args.daemon:
+        daemon = NotifyDaemon(args.socket, window=args.window, timeout=args.timeout)
+        # Stop on SIGTERM like on Ctrl+C, sending what is still buffered
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        except RuntimeError as e:
+            logger.error(f"❌ {e}")
+            sys.exit(1)
+        sys.exit(0)
+    
     # Build notification parameters
     kwargs = {}
     
@@ -356,16 +763,27 @@ Examples:
     if args.title:
         kwargs["title"] = args.title
     
-    # Send notification
-    builder = NotificationBuilder()
+    channels = ALL_CHANNELS if args.channel == "all" else [args.channel]
     
-    if args.channel == "all":
-        result = builder.send_all(
-            ["sms", "email", "slack", "discord", "console"],
-            **kwargs
-        )
-    else:
-        result = builder.send(args.channel, **kwargs)
+    # Hand off to a running daemon; console output still belongs to this process
+    result = None
+    remote = [ch for ch in channels if ch != "console"]
+    if remote and not args.direct:
+        result = send_via_daemon(remote, kwargs, args.socket)
+        if result is not None and "console" in channels and "message" in kwargs:
+            ConsoleChannel().send(**kwargs)
+    
+    # Send notification
+    if result is None:
+        builder = NotificationBuilder(timeout=args.timeout)
+        
+        try:
+            if args.channel == "all":
+                result = builder.send_all(channels, **kwargs)
+            else:
+                result = builder.send(args.channel, **kwargs)
+        finally:
+            builder.close()
     
     # Output result
     if args.json:
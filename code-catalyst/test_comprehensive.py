@@ -65,8 +65,38 @@ class TestRunner:
         print("\n\n🤖 SECTION 3: AGENT HANDOFF TESTS")
         print("-" * 70)
         self.test_agent_prediction()
+        self.test_agent_ranking()
         self.test_agent_delegation()
         self.test_agent_handback()
+        self.test_handoff_eviction()
+        self.test_handoff_stores()
+        self.test_delegation_reaper()
+        self.test_agent_queues()
+        self.test_handoff_metrics()
+        self.test_task_events()
+        self.test_orchestration_graph()
+        self.test_dart_code_review()
+        self.test_dart_review_benchmark()
+        self.test_dart_review_files_endpoint()
+        self.test_dart_capsule_templates()
+        self.test_capsule_bundle()
+        self.test_dart_repo_review()
+        self.test_sms_batch_concurrency()
+        self.test_sms_sender_pacing()
+        self.test_sms_sender_priority()
+        self.test_sms_outbox()
+        self.test_sms_outbox_redis()
+        self.test_sms_delivery_status()
+        self.test_twilio_stub()
+        self.test_twilio_transport()
+        self.test_sms_segments()
+        self.test_message_templates()
+        self.test_recipient_filter()
+        self.test_sms_campaigns()
+        self.test_twiml()
+        self.test_notify_fanout()
+        self.test_notify_daemon()
+        self.test_notify_daemon_slow_channel()
 
         # Integration Tests
         print("\n\n🔗 SECTION 4: INTEGRATION TESTS")
@@ -265,6 +295,30 @@ function withdraw(uint amount) public {
         
         return self.test("Agent Prediction", "Predict correct specialized agent for tasks", run)
 
+    def test_agent_ranking(self) -> bool:
+        """Test ranked agent candidates with confidence scores"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.agent_handoff import handoff_coordinator
+                
+                candidates = handoff_coordinator.rank_agents(
+                    "Fix security issues in Dart code", "dart"
+                )
+                fallback = handoff_coordinator.rank_agents("hello world")
+                
+                return (
+                    candidates[0]["agent"] == "dart-capsule" and
+                    candidates[0]["confidence"] > candidates[1]["confidence"] and
+                    abs(sum(c["confidence"] for c in candidates) - 1.0) < 0.01 and
+                    fallback == []
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Agent Ranking", "Rank candidate agents with confidence scores", run)
+
     def test_agent_delegation(self) -> bool:
         """Test agent delegation system"""
         def run():
@@ -323,6 +377,1718 @@ function withdraw(uint amount) public {
         
         return self.test("Agent Handback", "Successfully receive delegated work back", run)
 
+    def test_handoff_eviction(self) -> bool:
+        """Test bounded handoff log and delegation eviction"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.agent_handoff import AgentHandoff
+                
+                coordinator = AgentHandoff(log_capacity=10, delegation_ttl_seconds=0)
+                for i in range(100):
+                    coordinator.delegate("code-catalyst", f"evict-{i}", "Test eviction", timeout_seconds=0)
+                    coordinator.handback(f"evict-{i}", "deepagent", {"ok": True})
+                
+                stats = coordinator.get_storage_stats()
+                exported = coordinator.export_handoff_log(limit=4)
+                
+                return (
+                    stats["log_size"] == 10 and
+                    stats["active_delegations"] == 0 and
+                    len(exported.splitlines()) == 4
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Handoff Eviction", "Bounded log and TTL eviction of delegations", run)
+
+    def test_handoff_stores(self) -> bool:
+        """Test handoff store backends and lazy, off-loop store access"""
+        def run():
+            try:
+                import asyncio
+                import os
+                import tempfile
+                import threading
+                import time
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.agent_handoff import AgentHandoff
+                from app.config import Config
+                from app.handoff_store import MemoryHandoffStore, RedisHandoffStore, SQLiteHandoffStore
+                
+                stores = [
+                    MemoryHandoffStore(5),
+                    SQLiteHandoffStore(os.path.join(tempfile.mkdtemp(), "handoff.db"), 5),
+                ]
+                client = None
+                try:
+                    import redis
+                    client = redis.Redis.from_url(Config.REDIS_URL, decode_responses=True, socket_connect_timeout=1)
+                    client.ping()
+                    stores.append(RedisHandoffStore(client, 5, prefix=f"handoff-test-{os.getpid()}"))
+                except Exception:
+                    client = None
+                    print("   ⚠️ Redis not reachable at REDIS_URL, skipping the Redis store")
+                
+                def bump(record):
+                    record["attempts"] += 1
+                    return record
+                
+                def exercise(store) -> bool:
+                    now = time.time()
+                    for i, status in enumerate(["delegated", "in_progress", "handed_back"]):
+                        store.put_delegation({"task_id": f"s-{i}", "status": status, "attempts": 0, "evict_at": now + 60})
+                    store.put_delegation({"task_id": "s-old", "status": "failed", "attempts": 0, "evict_at": now + 0.5})
+                    
+                    # 8 threads x 25 read-modify-writes of one record: none may be lost
+                    threads = [
+                        threading.Thread(target=lambda: [store.update_delegation("s-0", bump) for _ in range(25)])
+                        for _ in range(8)
+                    ]
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    
+                    declined = store.update_delegation("s-1", lambda record: None)
+                    missing = store.update_delegation("s-missing", bump)
+                    open_ids = sorted(record["task_id"] for record in store.iter_open_delegations())
+                    for i in range(8):
+                        store.append_log({"seq": i})
+                    pages = [[record["seq"] for record in page] for page in store.iter_log(offset=1, page_size=2)]
+                    evicted = store.evict_expired(now + 1)
+                    stats = store.stats()
+                    
+                    passed = (
+                        store.get_delegation("s-0")["attempts"] == 200 and
+                        declined is None and missing is None and
+                        store.get_delegation("s-1")["status"] == "in_progress" and
+                        open_ids == ["s-0", "s-1"] and
+                        pages == [[4, 5], [6, 7]] and
+                        evicted == 1 and stats["log_size"] == 5 and stats["active_delegations"] == 3
+                    )
+                    if not passed:
+                        print(f"   ❌ {store.name} store")
+                    return passed
+                
+                try:
+                    backends_ok = all([exercise(store) for store in stores])
+                finally:
+                    if client is not None:
+                        keys = client.keys(f"handoff-test-{os.getpid()}*")
+                        if keys:
+                            client.delete(*keys)
+                
+                # Nothing is connected until the store is first used
+                lazy = AgentHandoff()
+                
+                # Store I/O in a worker thread, listeners still on the loop
+                coordinator = AgentHandoff(store=stores[1])
+                listener_threads = []
+                coordinator.subscribe(lambda event, record: listener_threads.append(threading.current_thread()))
+                
+                async def delegate_off_loop():
+                    coordinator.bind_loop(asyncio.get_running_loop())
+                    await asyncio.to_thread(coordinator.delegate, "code-catalyst", "s-loop", "Send SMS notification")
+                    return threading.current_thread()
+                
+                loop_thread = asyncio.run(delegate_off_loop())
+                
+                return (
+                    backends_ok and
+                    lazy._store is None and
+                    listener_threads == [loop_thread] and
+                    stores[1].get_delegation("s-loop")["status"] == "delegated"
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Handoff Stores", "Memory/SQLite/Redis atomic updates, lazy store, off-loop I/O", run)
+
+    def test_delegation_reaper(self) -> bool:
+        """Test overdue delegations are re-delegated to deepagent, then failed"""
+        def run():
+            try:
+                import asyncio
+                import time
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.agent_handoff import AgentHandoff
+                from app.handoff_reaper import DelegationReaper
+                from app.handoff_store import MemoryHandoffStore
+                
+                coordinator = AgentHandoff(store=MemoryHandoffStore(100))
+                reaper = DelegationReaper(coordinator)
+                events = []
+                coordinator.subscribe(lambda event, record: events.append((event, record["task_id"])))
+                
+                now = time.time()
+                coordinator.delegate("code-catalyst", "reap-1", "Create a Dart capsule", "dart", timeout_seconds=60)
+                coordinator.delegate("code-catalyst", "reap-2", "Send SMS notification", timeout_seconds=60)
+                coordinator.handback("reap-2", "twilio-integrator", {"ok": True})
+                
+                not_due = reaper.reap(now=now + 30)
+                # First miss: same task_id handed to the generalist with a fresh deadline
+                first = reaper.reap(now=now + 61)
+                redelegated = coordinator.get_task_status("reap-1")
+                # Second miss: deepagent has nowhere to fall back to
+                second = reaper.reap(now=now + 122)
+                failed = coordinator.get_task_status("reap-1")
+                
+                coordinator.delegate("code-catalyst", "reap-3", "Audit Solidity contract", "solidity", timeout_seconds=60)
+                early = coordinator.expire("reap-3", now=now + 30, policy="fail")
+                fail_policy = coordinator.expire("reap-3", now=now + 61, policy="fail")
+                
+                async def deadline_loop():
+                    # A zero timeout is due immediately: the loop wakes for it twice
+                    reaper.start()
+                    coordinator.delegate("code-catalyst", "reap-4", "Review GitHub PR", timeout_seconds=0)
+                    await asyncio.sleep(0.1)
+                    await reaper.stop()
+                    return coordinator.get_task_status("reap-4")
+                
+                looped = asyncio.run(deadline_loop())
+                metrics = reaper.get_metrics()
+                
+                return (
+                    not_due == 0 and first == 1 and second == 1 and
+                    redelegated["status"] == "delegated" and redelegated["to_agent"] == "deepagent" and
+                    redelegated["redelegated_from"] == "dart-capsule" and redelegated["attempts"] == 2 and
+                    redelegated["expected_handback_at"] == now + 61 + 60 and
+                    failed["status"] == "failed" and "timeout" in failed["error"] and
+                    early is None and fail_policy == "failed" and
+                    coordinator.get_task_status("reap-3")["to_agent"] == "solidity-auditor" and
+                    looped["status"] == "failed" and looped["attempts"] == 2 and
+                    ("redelegated", "reap-1") in events and ("expired", "reap-1") in events and
+                    metrics["completed_in_time"] == 1 and metrics["redelegated"] == 2 and
+                    metrics["failed"] == 2 and not metrics["running"]
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Delegation Reaper", "Deadline heap, deepagent fallback and fail policy", run)
+
+    def test_agent_queues(self) -> bool:
+        """Test per-agent priority queues, backpressure and re-delegation"""
+        def run():
+            try:
+                import asyncio
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app import agent_queues
+                from app.agent_handoff import AgentHandoff, AgentType
+                from app.agent_queues import AgentQueueManager, QueueFullError
+                from app.config import Config
+                from app.handoff_store import MemoryHandoffStore
+                from app.worker import LLMProcessor
+                
+                coordinator = AgentHandoff(store=MemoryHandoffStore(100))
+                manager = AgentQueueManager(coordinator)
+                twilio = manager.queues[AgentType.TWILIO_INTEGRATOR]
+                twilio.concurrency = 1
+                ran = []
+                
+                async def handler(delegation):
+                    ran.append(delegation["task_id"])
+                    if delegation["context"].get("explode"):
+                        raise RuntimeError("handler failed")
+                    return {"ok": True}
+                
+                manager.register_handler(AgentType.TWILIO_INTEGRATOR, handler)
+                
+                def delegate(task_id, priority, **context):
+                    delegation = coordinator.delegate(
+                        "code-catalyst", task_id, "Send SMS notification", context=context
+                    )
+                    manager.submit(delegation, priority=priority)
+                
+                async def drain():
+                    # Queued before the workers start, so priority decides the order
+                    delegate("q-low", 9)
+                    delegate("q-high", 1)
+                    delegate("q-boom", 5, explode=True)
+                    manager.start()
+                    await asyncio.wait_for(twilio.queue.join(), timeout=2)
+                    await manager.stop()
+                
+                asyncio.run(drain())
+                stats = manager.get_stats(AgentType.TWILIO_INTEGRATOR)
+                
+                # Backpressure: a full queue rejects with a Retry-After estimate
+                solidity = manager.queues[AgentType.SOLIDITY_AUDITOR]
+                solidity.queue = asyncio.PriorityQueue(1)
+                delegate_full = coordinator.delegate("code-catalyst", "q-full-1", "Audit Solidity contract", "solidity")
+                manager.submit(delegate_full)
+                try:
+                    manager.check_capacity(AgentType.SOLIDITY_AUDITOR)
+                    rejected = None
+                except QueueFullError as e:
+                    rejected = e
+                
+                # A timed-out task whose deepagent queue is full is failed, and expire says so
+                manager.queues[AgentType.DEEPAGENT].queue = asyncio.PriorityQueue(1)
+                manager.queues[AgentType.DEEPAGENT].submit("someone-else")
+                outcome = coordinator.expire("q-full-1", now=delegate_full["expected_handback_at"])
+                expired = coordinator.get_task_status("q-full-1")
+                
+                # On the loop, failing the dropped re-delegation is left to a worker thread
+                async def expire_on_loop():
+                    coordinator.bind_loop(asyncio.get_running_loop())
+                    delegation = coordinator.delegate("code-catalyst", "q-full-2", "Audit Solidity contract", "solidity")
+                    await asyncio.to_thread(coordinator.expire, "q-full-2", now=delegation["expected_handback_at"])
+                    scheduled = len(manager._expiring)
+                    await asyncio.gather(*manager._expiring)
+                    return scheduled
+                
+                scheduled = asyncio.run(expire_on_loop())
+                expired_on_loop = coordinator.get_task_status("q-full-2")
+                
+                # The LLM handler awaits LLMProcessor on the caller's loop
+                loops = []
+                
+                async def fake_claude(prompt, code_context="", language="dart"):
+                    loops.append(asyncio.get_running_loop())
+                    return f"echo: {prompt}"
+                
+                original, provider = LLMProcessor.call_claude, Config.LLM_PROVIDER
+                LLMProcessor.call_claude = staticmethod(fake_claude)
+                Config.LLM_PROVIDER = "claude"
+                
+                async def call_llm():
+                    return await agent_queues._llm_handler({"task_description": "hi"}), asyncio.get_running_loop()
+                
+                try:
+                    llm_result, loop = asyncio.run(call_llm())
+                finally:
+                    LLMProcessor.call_claude = original
+                    Config.LLM_PROVIDER = provider
+                
+                return (
+                    ran == ["q-high", "q-boom", "q-low"] and
+                    stats["completed"] == 2 and stats["failed"] == 1 and stats["depth"] == 0 and
+                    coordinator.get_task_status("q-boom")["status"] == "failed" and
+                    coordinator.get_task_status("q-high")["status"] == "handed_back" and
+                    rejected is not None and rejected.retry_after > 0 and
+                    outcome == "failed" and expired["status"] == "failed" and
+                    expired["to_agent"] == "deepagent" and
+                    scheduled == 1 and expired_on_loop["status"] == "failed" and not manager._expiring and
+                    llm_result == {"output": "echo: hi"} and loops == [loop]
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Agent Queues", "Priority order, backpressure, failed re-delegation", run)
+
+    def test_handoff_metrics(self) -> bool:
+        """Test per-agent latency histograms and outcome counters"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.agent_handoff import AgentHandoff
+                from app.handoff_metrics import HandoffMetrics
+                
+                coordinator = AgentHandoff()
+                metrics = HandoffMetrics(coordinator)
+                coordinator.delegate("code-catalyst", "metrics-001", "Build a dart widget", code_language="dart")
+                coordinator.mark_in_progress("metrics-001", "dart-capsule")
+                coordinator.handback("metrics-001", "dart-capsule", {"ok": True})
+                
+                summary = metrics.get_summary("dart-capsule")
+                exposition = metrics.render_prometheus()
+                
+                return (
+                    summary["delegated"] == 1 and
+                    summary["completed"] == 1 and
+                    summary["latency"]["count"] == 1 and
+                    summary["queue_wait"]["count"] == 1 and
+                    'codecatalyst_handoff_latency_seconds_count{agent="dart-capsule"} 1' in exposition
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Handoff Metrics", "Per-agent latency histograms and counters", run)
+
+    def test_task_events(self) -> bool:
+        """Test task event broadcaster subscribe, fan-out and unsubscribe"""
+        def run():
+            try:
+                import asyncio
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.agent_handoff import AgentHandoff
+                from app.handoff_events import TaskEventBroadcaster
+                from app.handoff_store import MemoryHandoffStore
+                
+                class FlakyRedis:
+                    """Stands in for the async Redis client: the second publish fails"""
+                    def __init__(self):
+                        self.published = []
+                    
+                    async def publish(self, channel, message):
+                        await asyncio.sleep(0.01)
+                        if len(self.published) == 1:
+                            self.published.append(None)
+                            raise ConnectionError("connection reset")
+                        self.published.append(channel)
+                
+                coordinator = AgentHandoff(store=MemoryHandoffStore(100))
+                broadcaster = TaskEventBroadcaster(coordinator)
+                
+                async def collect(task_id, heartbeats=0):
+                    events = []
+                    async for event in broadcaster.stream(task_id, heartbeat_seconds=0.05):
+                        if event is None:
+                            heartbeats -= 1
+                            if heartbeats < 0:
+                                break
+                            continue
+                        events.append(event)
+                    return events
+                
+                async def scenario():
+                    broadcaster.start()
+                    coordinator.delegate("code-catalyst", "ev-1", "Send SMS notification")
+                    coordinator.delegate("code-catalyst", "ev-2", "Review GitHub PR")
+                    # Two subscribers on ev-1 (fan-out), one on ev-2 that only sees heartbeats
+                    streams = [asyncio.create_task(collect("ev-1")) for _ in range(2)]
+                    quiet = asyncio.create_task(collect("ev-2", heartbeats=2))
+                    while broadcaster.get_stats()["active_subscriptions"] < 3:
+                        await asyncio.sleep(0.01)
+                    
+                    coordinator.mark_in_progress("ev-1", "twilio-integrator")
+                    coordinator.handback("ev-1", "twilio-integrator", {"sid": "SM1"})
+                    fanned_out = await asyncio.wait_for(asyncio.gather(*streams), timeout=2)
+                    quiet_events = await asyncio.wait_for(quiet, timeout=2)
+                    after_unsubscribe = broadcaster.get_stats()["active_subscriptions"]
+                    
+                    # A finished task replays one final snapshot and closes
+                    replay = await asyncio.wait_for(collect("ev-1"), timeout=2)
+                    
+                    # Redis publishes are tracked until done; a failed one is delivered locally
+                    redis = FlakyRedis()
+                    broadcaster._redis = redis
+                    local = asyncio.create_task(collect("ev-2"))
+                    while broadcaster.get_stats()["active_subscriptions"] < 1:
+                        await asyncio.sleep(0.01)
+                    coordinator.mark_in_progress("ev-2", "github-app-agent")
+                    coordinator.handback("ev-2", "github-app-agent", {"ok": True})
+                    await asyncio.sleep(0)
+                    in_flight = len(broadcaster._publishes)
+                    fallback = await asyncio.wait_for(local, timeout=2)
+                    await broadcaster.stop()
+                    return fanned_out, quiet_events, after_unsubscribe, replay, redis, in_flight, fallback
+                
+                fanned_out, quiet_events, after_unsubscribe, replay, redis, in_flight, fallback = asyncio.run(scenario())
+                sequence = [[event["event"] for event in events] for events in fanned_out]
+                
+                return (
+                    sequence == [["snapshot", "started", "handed_back"]] * 2 and
+                    fanned_out[0][-1]["final"] and fanned_out[0][-1]["result"] == {"sid": "SM1"} and
+                    [event["event"] for event in quiet_events] == ["snapshot"] and
+                    after_unsubscribe == 0 and
+                    [event["event"] for event in replay] == ["snapshot"] and replay[0]["final"] and
+                    in_flight == 2 and not broadcaster._publishes and
+                    redis.published == ["handoff:events:ev-2", None] and
+                    # started went to Redis (no relay listener here); handed_back fell back to local delivery
+                    [event["event"] for event in fallback] == ["snapshot", "handed_back"] and
+                    broadcaster.get_stats()["active_subscriptions"] == 0
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Task Events", "Subscribe, fan-out, unsubscribe, tracked Redis publishes", run)
+
+    def test_orchestration_graph(self) -> bool:
+        """Test subtask DAG validation for sima2-bridge orchestration"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.agent_orchestrator import OrchestrationError, capsule_pipeline, validate_graph
+                
+                order = validate_graph(capsule_pipeline("AP2Affiliate"))
+                
+                try:
+                    validate_graph([
+                        {"id": "a", "task": "x", "depends_on": ["b"]},
+                        {"id": "b", "task": "y", "depends_on": ["a"]},
+                    ])
+                    cycle_rejected = False
+                except OrchestrationError:
+                    cycle_rejected = True
+                
+                return (
+                    order.index("generate") < order.index("review") and
+                    order.index("generate") < order.index("audit") and
+                    cycle_rejected
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Orchestration Graph", "Capsule pipeline order and cycle detection", run)
+
+    def test_dart_code_review(self) -> bool:
+        """Test outline-based Dart review rules and line numbers"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.dart_review import review_source
+                
+                code = "\n".join([
+                    "// class Ignored extends StatelessWidget {}",
+                    "class Card extends StatelessWidget {",
+                    "  Card({Key? key}) : super(key: key);",
+                    "  final label = 'print(not code)';",
+                    "}",
+                    "class CardState extends State<Other> {",
+                    "  Widget build(BuildContext context) { print('x'); return Container(); }",
+                    "}",
+                ])
+                result = review_source(code, "Card")
+                found = {(issue["type"], issue["line"]) for issue in result["issues"]}
+                
+                return (
+                    found == {("missing_build", 2), ("missing_const", 3), ("naming_convention", 6)} and
+                    result["suggestions"][0]["lines"] == [7] and
+                    [cls["name"] for cls in result["outline"]] == ["Card", "CardState"]
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Dart Code Review", "Outline rules, line numbers, comments/strings skipped", run)
+
+    def test_dart_review_benchmark(self) -> bool:
+        """Benchmark the cold single-pass outline on 5k-line files"""
+        def run():
+            try:
+                import time
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.dart_agent import CapsuleType, dart_agent
+                from app.dart_review import build_outline
+                
+                widgets = "".join(
+                    dart_agent.generate_capsule(f"bench_{i}", capsule_type)["generated_code"]
+                    for i in range(40) for capsule_type in (CapsuleType.STATEFUL, CapsuleType.STATELESS)
+                ).split("\n")
+                
+                def source(line_count):
+                    return "\n".join((widgets * (line_count // len(widgets) + 1))[:line_count])
+                
+                def best_ms(fn, code, rounds=20):
+                    timings = []
+                    for _ in range(rounds):
+                        start = time.perf_counter()
+                        fn(code)
+                        timings.append(time.perf_counter() - start)
+                    return min(timings) * 1000
+                
+                def substring_checks(code):
+                    """The review used to be these `in` checks (no positions, no comment/string skipping)"""
+                    return [
+                        "StatelessWidget" in code and "const " not in code,
+                        "build(BuildContext context)" not in code,
+                        "Key?" not in code and "StatelessWidget" in code,
+                        "State<" in code and not code.count("_"),
+                        "setState" in code, "Future.delayed" in code, "print(" in code,
+                        "password" in code.lower() and "VaultGemma" not in code,
+                        "try {" in code and "catch" not in code,
+                    ]
+                
+                code_5k, code_10k = source(5000), source(10000)
+                # __wrapped__ skips the outline cache: every round lexes the whole file
+                cold_5k = best_ms(build_outline.__wrapped__, code_5k)
+                cold_10k = best_ms(build_outline.__wrapped__, code_10k)
+                build_outline(code_5k)
+                cached_5k = best_ms(build_outline, code_5k)
+                checks_5k = best_ms(substring_checks, code_5k)
+                print(f"   5k lines: {cold_5k:.2f} ms cold, {cached_5k * 1000:.1f} us cached, "
+                      f"{checks_5k:.2f} ms substring checks; 10k lines: {cold_10k:.2f} ms cold")
+                
+                return (
+                    len(build_outline(code_5k)["classes"]) > 300 and
+                    cold_5k < 25 and
+                    cold_10k < cold_5k * 3 and
+                    cached_5k < checks_5k
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Dart Review Benchmark", "Cold pass linear and within budget, cached reviews skip it", run)
+
+    def test_dart_review_files_endpoint(self) -> bool:
+        """Test multi-file reviews run off the event loop and are capped"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import asyncio
+                from fastapi import HTTPException
+                from app.api import ReviewDartCodeRequest, review_dart_code_endpoint
+                from app.config import Config
+                
+                widget = (
+                    "class Tile extends StatelessWidget {\n"
+                    "  const Tile({super.key});\n"
+                    "  @override\n"
+                    "  Widget build(BuildContext context) => const Text('hi');\n"
+                    "}\n"
+                ) * 400
+                files = [{"path": f"lib/widgets/tile_{i}.dart", "code": widget} for i in range(Config.DART_REVIEW_MAX_FILES)]
+                
+                async def review_while_ticking():
+                    ticks = 0
+                    review = asyncio.create_task(review_dart_code_endpoint(ReviewDartCodeRequest(files=files)))
+                    while not review.done():
+                        ticks += 1
+                        await asyncio.sleep(0.005)
+                    return await review, ticks
+                
+                result, ticks = asyncio.run(review_while_ticking())
+                try:
+                    asyncio.run(review_dart_code_endpoint(ReviewDartCodeRequest(files=files + files[:1])))
+                    over_limit = None
+                except HTTPException as e:
+                    over_limit = e.status_code
+                
+                print(f"   {len(files)} files reviewed while the loop ticked {ticks} times")
+                return (
+                    result["status"] == "reviewed" and result["total_files"] == len(files) and
+                    ticks > 1 and over_limit == 400
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Dart Review Files Endpoint", "Multi-file review off the event loop, file cap", run)
+
+    def test_dart_capsule_templates(self) -> bool:
+        """Test precompiled capsule templates, cached renders and type parsing"""
+        def run():
+            try:
+                import asyncio
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from fastapi import HTTPException
+                from app.api import GenerateDartCapsuleRequest, generate_dart_capsule_endpoint
+                from app.dart_agent import (
+                    CapsuleType, CompiledTemplate, DartAgentSpecialization, parse_capsule_type
+                )
+                
+                agent = DartAgentSpecialization()
+                template = CompiledTemplate("{Name}: 100% done {{literal}}")
+                expected = {
+                    CapsuleType.DATA_PROVIDER: "class LedgerSyncProvider extends ChangeNotifier {",
+                    CapsuleType.MODEL: "factory LedgerSync.fromJson(Map<String, dynamic> json) {",
+                    CapsuleType.UTILITY: "class LedgerSyncUtils {",
+                    CapsuleType.SERVICE: "static final LedgerSyncService _instance = LedgerSyncService._();",
+                }
+                rendered = {
+                    capsule_type: agent.generate_capsule("ledger_sync", capsule_type)["generated_code"]
+                    for capsule_type in expected
+                }
+                
+                # Cached renders must not hand out shared lists
+                first = agent.generate_capsule("ledger_sync", CapsuleType.MODEL)
+                first["next_steps"].append("7. Mutated by a caller")
+                first["best_practices"].clear()
+                second = agent.generate_capsule("ledger_sync", CapsuleType.MODEL)
+                cache = agent._render_capsule.cache_info()
+                
+                def status_for(capsule_type):
+                    request = GenerateDartCapsuleRequest(capsule_name="LedgerSync", capsule_type=capsule_type)
+                    try:
+                        return asyncio.run(generate_dart_capsule_endpoint(request))["type"]
+                    except HTTPException as e:
+                        return e.status_code
+                
+                return (
+                    template.render({"Name": "Build"}) == "Build: 100% done {literal}" and
+                    template.field_names == {"Name"} and
+                    all(expected[t] in rendered[t] and "{ClassName}" not in rendered[t] for t in expected) and
+                    len(second["next_steps"]) == 6 and len(second["best_practices"]) == 9 and
+                    second["generated_code"] is first["generated_code"] and cache.hits >= 2 and
+                    parse_capsule_type("data-provider") is CapsuleType.DATA_PROVIDER and
+                    parse_capsule_type("Stateful_Widget") is CapsuleType.STATEFUL and
+                    status_for("utility") == "utility" and
+                    status_for("widget") == 400
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Dart Capsule Templates", "Compiled templates, cached renders, capsule type 400", run)
+
+    def test_capsule_bundle(self) -> bool:
+        """Test bulk capsule archives and applying their registry patch"""
+        def run():
+            try:
+                import asyncio
+                import io
+                import os
+                import shutil
+                import subprocess
+                import tarfile
+                import tempfile
+                import zipfile
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from fastapi import HTTPException
+                from app.api import BulkDartCapsuleRequest, generate_dart_capsules_bulk
+                from app.capsule_bundle import (
+                    REGISTRY_PATH, RegistryError, build_registry_patch, iter_bundle_files,
+                    prepare_capsules, stream_bundle
+                )
+                from app.config import Config
+                
+                # Work on a copy of the real registry
+                root = tempfile.mkdtemp()
+                registry = os.path.join(root, REGISTRY_PATH)
+                os.makedirs(os.path.dirname(registry))
+                repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                shutil.copy(os.path.join(repo_root, REGISTRY_PATH), registry)
+                
+                specs = [
+                    {"capsule_name": "treasury_sweep", "capsule_type": "stateful", "category": "Treasury",
+                     "description": "Sweeps idle cash into the partner's $USDC vault"},
+                    {"capsule_name": "payout_service", "capsule_type": "service"},
+                ]
+                capsules = prepare_capsules(specs)
+                patch = build_registry_patch(capsules, root)
+                
+                archive = zipfile.ZipFile(io.BytesIO(b"".join(
+                    stream_bundle(iter_bundle_files(capsules, registry_patch=patch), "zip")
+                )))
+                names = archive.namelist()
+                with open(os.path.join(root, "capsule_registry.patch"), "wb") as f:
+                    f.write(archive.read("capsule_registry.patch"))
+                applied = subprocess.run(
+                    ["git", "apply", "capsule_registry.patch"], cwd=root, capture_output=True, text=True
+                )
+                with open(registry, encoding="utf-8") as f:
+                    patched = f.read()
+                
+                tar_names = tarfile.open(fileobj=io.BytesIO(b"".join(
+                    stream_bundle(iter_bundle_files(capsules, include_tests=False), "tar.gz")
+                )), mode="r:gz").getnames()
+                
+                # A registry the patch can't be placed in fails before streaming
+                broken = tempfile.mkdtemp()
+                os.makedirs(os.path.join(broken, os.path.dirname(REGISTRY_PATH)))
+                with open(os.path.join(broken, REGISTRY_PATH), "w", encoding="utf-8") as f:
+                    f.write("import 'package:flutter/material.dart';\n\nclass CapsuleRegistry {}\n")
+                try:
+                    build_registry_patch(capsules, broken)
+                    layout_error = None
+                except RegistryError as e:
+                    layout_error = str(e)
+                
+                original_root, Config.WEALTHBRIDGE_ROOT = Config.WEALTHBRIDGE_ROOT, broken
+                try:
+                    asyncio.run(generate_dart_capsules_bulk(BulkDartCapsuleRequest(capsules=specs)))
+                    status = 200
+                except HTTPException as e:
+                    status = e.status_code
+                finally:
+                    Config.WEALTHBRIDGE_ROOT = original_root
+                
+                return (
+                    names == [
+                        "lib/widgets/treasury_sweep_capsule.dart", "test/widgets/treasury_sweep_capsule_test.dart",
+                        "lib/widgets/payout_service_capsule.dart", "test/widgets/payout_service_capsule_test.dart",
+                        "capsule_registry.patch", "MANIFEST.json",
+                    ] and
+                    applied.returncode == 0 and
+                    "import 'package:wealthbridge/widgets/treasury_sweep_capsule.dart';" in patched and
+                    "widget: const TreasurySweepCapsule()," in patched and
+                    "partner\\'s \\$USDC vault" in patched and
+                    "PayoutServiceCapsule" not in patched and
+                    build_registry_patch(capsules, root) is None and
+                    tar_names == [
+                        "lib/widgets/treasury_sweep_capsule.dart", "lib/widgets/payout_service_capsule.dart",
+                        "MANIFEST.json",
+                    ] and
+                    layout_error is not None and "capsules = [" in layout_error and
+                    status == 500
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Capsule Bundle", "Zip/tar.gz bundles, applied registry patch, registry errors", run)
+
+    def test_dart_repo_review(self) -> bool:
+        """Test directory review aggregation and the content-hash cache"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import os
+                import tempfile
+                from app.dart_repo_review import RepoReviewer
+                
+                with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as elsewhere:
+                    os.makedirs(os.path.join(root, "lib", "widgets"))
+                    for name, body in (("ok.dart", "class A {}"), ("bad.dart", "class B extends StatelessWidget {}")):
+                        with open(os.path.join(root, "lib", "widgets", name), "w") as f:
+                            f.write(body)
+                    # A .dart symlink inside the tree pointing out of it is not read
+                    with open(os.path.join(elsewhere, "secret.dart"), "w") as f:
+                        f.write("class Secret {}")
+                    os.symlink(os.path.join(elsewhere, "secret.dart"), os.path.join(root, "lib", "widgets", "link.dart"))
+                    
+                    reviewer = RepoReviewer(workers=1)
+                    first = reviewer.review(["lib"], root=root)
+                    second = reviewer.review(["lib"], root=root)
+                    
+                    try:
+                        reviewer.review([".."], root=root)
+                        escape_rejected = False
+                    except ValueError:
+                        escape_rejected = True
+                
+                widgets = first["directories"]["lib/widgets"]
+                return (
+                    first["reviewed_files"] == 2 and second["cached_files"] == 2 and
+                    widgets["files"] == 2 and widgets["failing_files"] == 1 and
+                    escape_rejected
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Dart Repo Review", "Per-directory scores, cache hits, root confinement", run)
+
+    def test_sms_batch_concurrency(self) -> bool:
+        """Test batch SMS runs sends concurrently with per-recipient results"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import asyncio
+                import time
+                from types import SimpleNamespace
+                from app.sms_scheduler import SenderPool
+                from app.twilio_service import TwilioService
+                
+                async def create_message(to, from_, body):
+                    await asyncio.sleep(0.05)
+                    if to == "+15550000003":
+                        raise RuntimeError("invalid number")
+                    return {"sid": f"SM{to[-4:]}"}
+                
+                service = TwilioService()
+                service.client = SimpleNamespace(create_message=create_message)
+                service.senders = SenderPool([("+15559990000", 1e6)])
+                service.enabled = True
+                recipients = [f"+1555000000{i}" for i in range(10)]
+                
+                started = time.monotonic()
+                result = asyncio.run(service.send_sms_batch(recipients, "Hello", concurrency=10))
+                elapsed = time.monotonic() - started
+                
+                statuses = [r["status"] for r in result["results"]]
+                return (
+                    result["sent_count"] == 9 and result["failed_count"] == 1 and
+                    [r["to"] for r in result["results"]] == recipients and
+                    statuses[3] == "failed" and result["results"][0]["sid"] == "SM0000" and
+                    elapsed < 0.3  # serially: 10 x 50 ms
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("SMS Batch Concurrency", "Bounded parallel sends, ordered per-recipient results", run)
+
+    def test_sms_sender_pacing(self) -> bool:
+        """Test per-number token buckets pace and spread sends"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import asyncio
+                import time
+                from collections import Counter
+                from app.sms_scheduler import SenderPool, _parse_sender_numbers
+                
+                senders = _parse_sender_numbers("+15550001111, +15550002222=20, bad=x", default_mps=20)
+                pool = SenderPool(senders)
+                
+                async def campaign():
+                    tasks = [asyncio.create_task(pool.acquire()) for _ in range(12)]
+                    await asyncio.sleep(0)
+                    queued = pool.stats()
+                    return queued, await asyncio.gather(*tasks)
+                
+                started = time.monotonic()
+                queued, numbers = asyncio.run(campaign())
+                elapsed = time.monotonic() - started
+                
+                # 12 sends over 2 numbers at 20 msg/s: first slot on each is free, then 5 x 50 ms
+                return (
+                    senders == [("+15550001111", 20.0), ("+15550002222", 20.0)] and
+                    Counter(numbers) == {"+15550001111": 6, "+15550002222": 6} and
+                    queued["queued"] == 10 and 0.2 <= queued["eta_seconds"] <= 0.3 and
+                    0.2 <= elapsed < 0.5
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("SMS Sender Pacing", "Token bucket per sender number, queue depth and ETA", run)
+
+    def test_sms_sender_priority(self) -> bool:
+        """Test cancelled waits give slots back and single sends skip batch traffic"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import asyncio
+                import time
+                from types import SimpleNamespace
+                from app.sms_scheduler import SenderPool
+                from app.twilio_service import TwilioService
+                
+                async def cancelled_waits():
+                    pool = SenderPool([("+15550001111", 10)])
+                    await pool.acquire()
+                    waiting = [asyncio.create_task(pool.acquire()) for _ in range(50)]
+                    await asyncio.sleep(0)
+                    for task in waiting:
+                        task.cancel()
+                    await asyncio.gather(*waiting, return_exceptions=True)
+                    started = time.monotonic()
+                    await pool.acquire()
+                    return time.monotonic() - started
+                
+                async def single_during_bulk():
+                    pool = SenderPool([("+15550001111", 20)])
+                    bulk = [asyncio.create_task(pool.acquire(bulk=True)) for _ in range(10)]
+                    await asyncio.sleep(0)
+                    started = time.monotonic()
+                    await pool.acquire()
+                    single = time.monotonic() - started
+                    await asyncio.gather(*bulk)
+                    return single, time.monotonic() - started
+                
+                sent, peak = [], []
+                
+                async def create_message(to, from_, body):
+                    sent.append(to)
+                    return {"sid": f"SM{to[-4:]}"}
+                
+                service = TwilioService()
+                service.client = SimpleNamespace(create_message=create_message)
+                service.senders = SenderPool([("+15559990000", 50)])
+                service.enabled = True
+                recipients = [f"+1555201{i:04d}" for i in range(30)]
+                
+                async def batch():
+                    sending = asyncio.create_task(service.send_sms_batch(recipients, "Hello", concurrency=5))
+                    while not sending.done():
+                        peak.append(service.senders.stats()["queued"])
+                        await asyncio.sleep(0.01)
+                    return await sending
+                
+                after_cancel = asyncio.run(cancelled_waits())
+                single, bulk = asyncio.run(single_during_bulk())
+                result = asyncio.run(batch())
+                
+                service.senders = SenderPool([("+15559990000", 1)])
+                try:
+                    asyncio.run(service.send_sms_batch([f"+1555301{i:04d}" for i in range(500)], "Hello"))
+                    rejected = ""
+                except ValueError as e:
+                    rejected = str(e)
+                
+                print(f"   After 50 cancelled waits: {after_cancel * 1000:.0f}ms; single send {single * 1000:.0f}ms behind 10 bulk ({bulk * 1000:.0f}ms)")
+                return (
+                    after_cancel < 0.2 and
+                    single < 0.12 and bulk >= 0.4 and
+                    result["sent_count"] == 30 and sorted(sent) == recipients and max(peak) <= 5 and
+                    "outbox" in rejected
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("SMS Sender Priority", "Cancelled slots released, single sends first, bounded batch, ETA cap", run)
+
+    def test_sms_outbox(self) -> bool:
+        """Test the outbox dedupes, retries and reconciles interrupted sends"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import asyncio
+                import os
+                import tempfile
+                import time
+                from email.utils import formatdate
+                from types import SimpleNamespace
+                from app.sms_outbox import SQLiteOutboxStore, SmsOutbox, new_message
+                from app.sms_scheduler import SenderPool
+                from app.twilio_transport import TwilioAPIError
+                
+                sent = []
+                
+                class FlakyClient:
+                    async def create_message(self, to, from_, body):
+                        sent.append(to)
+                        if sent.count(to) == 1 and to == "+15550000002":
+                            raise TwilioAPIError(503, "Service Unavailable")
+                        return {"sid": f"SM{len(sent)}"}
+                    
+                    async def list_messages(self, to, from_, page_size=20):
+                        # The crashed worker's send did reach Twilio
+                        return [{"sid": "SMcrashed", "body": "Hello", "date_created": formatdate(time.time())}]
+                
+                with tempfile.TemporaryDirectory() as tmp:
+                    store = SQLiteOutboxStore(os.path.join(tmp, "outbox.db"))
+                    service = SimpleNamespace(client=FlakyClient(), senders=SenderPool([("+15559990000", 1e6)]))
+                    outbox = SmsOutbox(store, concurrency=4, retry_base_seconds=0.05, service=service)
+                    
+                    # A previous worker died mid-send: row left "sending" with an expired lease
+                    crashed = new_message("old", "+15550000009", "Hello")
+                    crashed.update(status="sending", attempts=1, lease_until=time.time() - 1,
+                                   claimed_at=time.time() - 5, sent_from="+15559990000")
+                    store.enqueue([crashed])
+                    
+                    recipients = ["+15550000001", "+15550000002", "+15550000001"]
+                    first = outbox.enqueue(recipients, "Hello", batch_id="b1")
+                    again = outbox.enqueue(recipients, "Hello", batch_id="b1")
+                    
+                    async def drain():
+                        outbox.start()
+                        for _ in range(100):
+                            if outbox.store.counts()["sent"] == 3:
+                                break
+                            await asyncio.sleep(0.02)
+                        await outbox.stop()
+                    
+                    asyncio.run(drain())
+                    batch = outbox.batch_status("b1")
+                    retried = store.get("b1:+15550000002")
+                    recovered = store.get("old:+15550000009")
+                    store._conn.close()
+                
+                return (
+                    first["queued"] == 2 and first["duplicates"] == 1 and again["queued"] == 0 and
+                    batch["done"] and batch["sent"] == 2 and
+                    retried["attempts"] == 2 and retried["sid"] and
+                    recovered["status"] == "sent" and recovered["sid"] == "SMcrashed" and
+                    "+15550000009" not in sent and len(sent) == 3
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("SMS Outbox", "Idempotent enqueue, backoff retry, crash reconciliation", run)
+
+    def test_sms_outbox_redis(self) -> bool:
+        """Test the Redis outbox: atomic enqueue and claims under concurrent workers"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import os
+                import threading
+                import time
+                from app.config import Config
+                from app.sms_outbox import RedisOutboxStore, new_message
+                
+                try:
+                    import redis
+                    client = redis.Redis.from_url(Config.REDIS_URL, decode_responses=True, socket_connect_timeout=1)
+                    client.ping()
+                except Exception:
+                    print("   ⚠️ Redis not reachable at REDIS_URL, skipping the Redis outbox")
+                    return True
+                
+                prefix = f"sms-outbox-test-{os.getpid()}"
+                
+                def worker_store():
+                    """One client per worker, like separate processes"""
+                    return RedisOutboxStore(
+                        redis.Redis.from_url(Config.REDIS_URL, decode_responses=True, socket_connect_timeout=1),
+                        prefix=prefix,
+                    )
+                
+                def in_threads(work, count=8):
+                    results = [None] * count
+                    def target(i):
+                        results[i] = work(worker_store())
+                    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    return results
+                
+                try:
+                    store = worker_store()
+                    records = [new_message("b1", f"+1555000{i:04d}", "Hello") for i in range(40)]
+                    # 8 workers enqueue the same batch: each message goes in once
+                    inserted = in_threads(lambda worker: worker.enqueue(records))
+                    again = store.enqueue(records[:5])
+                    
+                    # 8 workers claim until nothing is due: no message is leased twice
+                    now = time.time() + 1
+                    
+                    def claim_all(worker):
+                        claimed = []
+                        while worker.client.zcount(worker.due_key, "-inf", now):
+                            claimed += worker.claim_due(5, now, lease_seconds=30)
+                        return claimed
+                    
+                    claims = in_threads(claim_all)
+                    claimed_ids = [record["id"] for claim in claims for record in claim]
+                    after_claims = store.counts("b1")
+                    
+                    first = records[0]["id"]
+                    store.update(first, {"status": "sent", "sid": "SM1", "lease_until": None})
+                    store.update(records[1]["id"], {"status": "pending", "next_attempt_at": now, "lease_until": None})
+                    expired = store.claim_expired(100, now + 60, lease_seconds=30)
+                    retried = store.claim_due(10, now, lease_seconds=30)
+                    missing = store.update("b1:+19999999999", {"status": "sent"})
+                    
+                    return (
+                        sum(inserted) == 40 and again == 0 and
+                        sorted(claimed_ids) == sorted(record["id"] for record in records) and
+                        all(record["attempts"] == 1 for claim in claims for record in claim) and
+                        after_claims == {"pending": 0, "sending": 40, "sent": 0, "failed": 0} and
+                        len(expired) == 38 and all(record["attempts"] == 1 for record in expired) and
+                        [record["id"] for record in retried] == [records[1]["id"]] and retried[0]["attempts"] == 2 and
+                        store.get(first)["status"] == "sent" and missing is None and
+                        store.counts() == {"pending": 0, "sending": 39, "sent": 1, "failed": 0}
+                    )
+                finally:
+                    for key in client.scan_iter(f"{prefix}:*"):
+                        client.delete(key)
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("SMS Outbox Redis", "Atomic enqueue/claims across concurrent Redis workers", run)
+
+    def test_sms_delivery_status(self) -> bool:
+        """Test status callbacks update per-SID status and campaign counters"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import os
+                import tempfile
+                from app.sms_status import DeliveryTracker, SQLiteDeliveryStore, compute_signature, validate_signature
+                
+                url = "https://api.influwealth.io/api/twilio/status-callback"
+                with tempfile.TemporaryDirectory() as tmp:
+                    store = SQLiteDeliveryStore(os.path.join(tmp, "status.db"))
+                    tracker = DeliveryTracker(url, store)
+                    
+                    params = tracker.callback_params("summit")
+                    for sid in ("SM1", "SM2", "SM3"):
+                        tracker.track({"sid": sid, "status": "queued", "to": "+15550000001"}, "summit")
+                    tracker.ingest({"MessageSid": "SM1", "MessageStatus": "delivered"}, "summit")
+                    # Late "sent" after "delivered" must not move SM1 back
+                    stale = tracker.ingest({"MessageSid": "SM1", "MessageStatus": "sent"}, "summit")
+                    tracker.ingest({"MessageSid": "SM2", "MessageStatus": "undelivered", "ErrorCode": "30003"}, "summit")
+                    # Callback that beats track(): counted once tracking catches up
+                    tracker.ingest({"MessageSid": "SM4", "MessageStatus": "sent"}, "summit")
+                    tracker.track({"sid": "SM4", "status": "queued"}, "summit")
+                    summary = tracker.summary("summit")
+                    sm2 = tracker.status("SM2")
+                    unknown = tracker.summary("unknown")
+                    store._conn.close()
+                
+                form = [("MessageSid", "SM1"), ("MessageStatus", "delivered")]
+                signature = compute_signature(params["StatusCallback"], form, "token")
+                
+                return (
+                    params == {"StatusCallback": url + "?campaign_id=summit"} and
+                    stale is None and sm2["status"] == "undelivered" and sm2["error_code"] == "30003" and
+                    summary["total"] == 4 and summary["delivered"] == 1 and summary["in_progress"] == 2 and
+                    summary["statuses"] == {"delivered": 1, "undelivered": 1, "queued": 1, "sent": 1} and
+                    summary["delivery_rate"] == 0.25 and
+                    validate_signature(params["StatusCallback"], form, signature, "token") and
+                    not validate_signature(url, form, signature, "token") and
+                    unknown is None
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("SMS Delivery Status", "Status callbacks, out-of-order updates, campaign counters", run)
+
+    def test_twilio_stub(self) -> bool:
+        """Test the Twilio transport against the local stub server"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import asyncio
+                import threading
+                from twilio_stub import create_server
+                from app.twilio_transport import TwilioAPIError, TwilioTransport
+                
+                server = create_server(latency=0, mps=2, queue_seconds=1)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                base_url = f"http://127.0.0.1:{server.server_address[1]}"
+                
+                async def exercise():
+                    client = TwilioTransport("AC" + "0" * 32, "stub", base_url=base_url)
+                    statuses = []
+                    for to in ("+15550000001", "+15550000002", "+15550000003", "+15005550001"):
+                        try:
+                            await client.create_message(to=to, from_="+15559990000", body="Hello")
+                            statuses.append(201)
+                        except TwilioAPIError as e:
+                            statuses.append(e.status)
+                    listed = await client.list_messages(to="+15550000002", from_="+15559990000")
+                    account = await client.fetch_account()
+                    unauthorized = TwilioTransport("AC" + "0" * 32, "", base_url=base_url)
+                    try:
+                        await unauthorized.fetch_account()
+                        denied = False
+                    except TwilioAPIError as e:
+                        denied = e.status == 401
+                    await client.aclose()
+                    await unauthorized.aclose()
+                    return statuses, listed, account, denied
+                
+                statuses, listed, account, denied = asyncio.run(exercise())
+                stats = server.state.stats()
+                server.shutdown()
+                
+                # 2 msg/s with 1 s of queue: the third send to one sender is throttled
+                return (
+                    statuses == [201, 201, 429, 400] and
+                    len(listed) == 1 and listed[0]["to"] == "+15550000002" and
+                    account["sid"] == "AC" + "0" * 32 and denied and
+                    stats["messages"] == 2 and stats["throttled"] == 1 and stats["rejected"] == 1
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Twilio Stub", "Local Twilio API: messages, throttling, invalid numbers, auth", run)
+
+    def test_twilio_transport(self) -> bool:
+        """Test TwilioTransport error mapping and per-loop client re-creation"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import asyncio
+                import socket
+                import threading
+                import httpx
+                from twilio_stub import create_server
+                from app.twilio_transport import TwilioAPIError, TwilioTransport
+                
+                server = create_server(latency=0)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                base_url = f"http://127.0.0.1:{server.server_address[1]}"
+                transport = TwilioTransport("AC" + "0" * 32, "stub", base_url=base_url)
+                
+                # A port nobody listens on
+                with socket.socket() as probe:
+                    probe.bind(("127.0.0.1", 0))
+                    closed_port = probe.getsockname()[1]
+                unreachable = TwilioTransport("AC" + "0" * 32, "stub", base_url=f"http://127.0.0.1:{closed_port}")
+                
+                async def send_and_fail():
+                    sent = await transport.create_message(to="+15550000001", from_="+15559990000", body="Hello")
+                    errors = []
+                    for call in (
+                        transport.create_message(to="+15005550001", from_="+15559990000", body="Hello"),
+                        transport.fetch_message("SM" + "f" * 32),
+                    ):
+                        try:
+                            await call
+                        except TwilioAPIError as e:
+                            errors.append((e.status, e.code, str(e)))
+                    try:
+                        await unreachable.fetch_account()
+                        connection_error = False
+                    except httpx.HTTPError:
+                        connection_error = True
+                    # A second handle on the pooled socket, to see it shut down later
+                    pooled = transport._client._transport._pool.connections[0]
+                    held = pooled._connection._network_stream.get_extra_info("socket").dup()
+                    return sent, errors, connection_error, transport._client, held
+                
+                async def fetch_again(sid):
+                    # New loop: the client bound to the closed one must be replaced
+                    fetched = await transport.fetch_message(sid)
+                    client = transport._client
+                    await transport.aclose()
+                    return fetched, client
+                
+                def shut_down(sock) -> bool:
+                    try:
+                        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+                    except BlockingIOError:
+                        return False  # still open, nothing to read
+                
+                sent, errors, connection_error, first_client, held = asyncio.run(send_and_fail())
+                open_before = not shut_down(held)
+                fetched, second_client = asyncio.run(fetch_again(sent["sid"]))
+                closed_after = shut_down(held)
+                held.close()
+                
+                # Client last used on a loop still running in another thread
+                other_loop = asyncio.new_event_loop()
+                threading.Thread(target=other_loop.run_forever, daemon=True).start()
+                asyncio.run_coroutine_threadsafe(transport.fetch_message(sent["sid"]), other_loop).result(5)
+                other_client = transport._client
+                
+                async def fetch_here():
+                    await transport.fetch_message(sent["sid"])
+                    await asyncio.sleep(0.1)  # the other loop closes its client meanwhile
+                    await transport.aclose()
+                
+                asyncio.run(fetch_here())
+                other_loop.call_soon_threadsafe(other_loop.stop)
+                server.shutdown()
+                
+                (invalid_status, invalid_code, invalid_text), (missing_status, missing_code, _) = errors
+                return (
+                    invalid_status == 400 and invalid_code == 21211 and
+                    "not a valid phone number" in invalid_text and invalid_text.endswith("(code 21211)") and
+                    missing_status == 404 and missing_code == 20404 and
+                    connection_error and
+                    fetched["sid"] == sent["sid"] and
+                    second_client is not first_client and transport._client is None and
+                    open_before and closed_after and other_client.is_closed
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Twilio Transport", "API error mapping, connection errors, client per event loop, old clients closed", run)
+
+    def test_sms_segments(self) -> bool:
+        """Test GSM-7/UCS-2 segment counting, cost estimates and the shortener"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.sms_segments import count_segments, estimate_cost, fit_segments, segment_info
+                
+                welcome = (
+                    "Welcome to Influwealth, John Doe! 🌟\n\nYour personal wealth dashboard is ready.\n\n"
+                    "👉 https://portal.influwealth.io?key=abc123\n\nQuestions? Reply HELP or contact support."
+                )
+                long_link = "Hi Alexandra, your AP2 payout is processing and will land in your account within three business days, see details " \
+                            "https://influwealth.wixsite.com/influwealth-consult"
+                fitted_welcome = fit_segments(welcome)
+                fitted_link = fit_segments(long_link)
+                cost = estimate_cost("x" * 200, recipients=1000, price_per_segment=0.01)
+                
+                return (
+                    count_segments("a" * 160) == 1 and count_segments("a" * 161) == 2 and
+                    segment_info("{" * 80)["units"] == 160 and count_segments("{" * 81) == 2 and
+                    segment_info("Hi 👋")["encoding"] == "UCS-2" and count_segments("é" * 160) == 1 and
+                    # 134 UTF-16 units, but the emoji's surrogate pair can't straddle a 67-unit boundary
+                    count_segments("a" * 68 + "😀") == 1 and count_segments("a" * 66 + "😀" + "a" * 66) == 3 and
+                    segment_info(welcome)["segments"] == 3 and
+                    "🌟" not in fitted_welcome and segment_info(fitted_welcome)["encoding"] == "GSM-7" and
+                    count_segments(fitted_welcome) == 1 and
+                    count_segments(fitted_link) == 1 and
+                    fitted_link.endswith("... https://influwealth.wixsite.com/influwealth-consult") and
+                    fit_segments("Short and sweet") == "Short and sweet" and
+                    cost["total_segments"] == 2000 and cost["estimated_cost_usd"] == 20.0
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("SMS Segments", "GSM-7/UCS-2 segments, cost estimate, one-segment shortener", run)
+
+    def test_message_templates(self) -> bool:
+        """Test template compilation, load-time segment budgets and batch rendering"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                from app.message_templates import MessageTemplate, TEMPLATES, render
+                from app.sms_segments import count_segments
+                
+                try:
+                    MessageTemplate("too_long", "Hi {name}, " + "x" * 150, limits={"name": 20})
+                    budget_checked = False
+                except ValueError:
+                    budget_checked = True
+                try:
+                    render("event_confirmation", event_name="Summit")
+                    missing_checked = False
+                except ValueError:
+                    missing_checked = True
+                
+                template = TEMPLATES["affiliate_payout"]
+                bodies = template.render_batch(
+                    [{"affiliate_name": f"Affiliate {i}"} for i in range(1000)] +
+                    [{"affiliate_name": "Łukasz " * 20}]  # forces UCS-2 and overflows
+                )
+                
+                return (
+                    budget_checked and missing_checked and
+                    template.fields == ["affiliate_name"] and "support@influwealth.com" in template._format and
+                    all(t.worst_case_segments <= t.max_segments for t in TEMPLATES.values()) and
+                    bodies[7] == render("affiliate_payout", affiliate_name="Affiliate 7") and
+                    bodies[7].startswith("Hi Affiliate 7, your AP2 payout") and
+                    count_segments(bodies[-1]) == 1 and bodies[-1].endswith("...") and
+                    render("reminder", reminder_text="Call {back}") == "Reminder: Call {back}"
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Message Templates", "Compiled templates, segment budget at load, batch render", run)
+
+    def test_recipient_filter(self) -> bool:
+        """Test E.164 normalization, dedupe and suppression before bulk sends"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import os
+                import tempfile
+                from app.recipients import BloomFilter, Deduplicator, RecipientFilter, SQLiteSuppressionStore, normalize_number
+                
+                with tempfile.TemporaryDirectory() as tmp:
+                    store = SQLiteSuppressionStore(os.path.join(tmp, "suppression.db"))
+                    added = store.add(["+15552010004", "+15552010004"])
+                    recipient_filter = RecipientFilter(store, chunk_size=2)
+                    clean = list(recipient_filter.filter([
+                        "+1 (555) 201-0001", "5552010001", "+1-555-1234", "15552010002",
+                        "+15552010004", "+44 20 7946 0958", "555.201.0003",
+                    ]))
+                    report = recipient_filter.report
+                    store._conn.close()
+                
+                dedupe = Deduplicator(threshold=100, bloom_capacity=10000)
+                repeats = sum(dedupe.seen(f"+1555{i % 2000:07d}") for i in range(4000))
+                bloom = BloomFilter(1000)
+                bloom.add("+15552010001")
+                
+                return (
+                    normalize_number("(555) 201-0001") == "+15552010001" and
+                    normalize_number("0044 20 7946 0958") == "+442079460958" and
+                    normalize_number("+1-555-1234") is None and normalize_number("call me") is None and
+                    added == 1 and
+                    clean == ["+15552010001", "+15552010002", "+442079460958", "+15552010003"] and
+                    report["received"] == 7 and report["accepted"] == 4 and
+                    report["dropped"] == {"invalid": 1, "duplicate": 1, "suppressed": 1} and
+                    report["samples"]["suppressed"] == ["+15552010004"] and
+                    dedupe.mode == "bloom" and repeats >= 2000 and
+                    "+15552010001" in bloom and "+15552010002" not in bloom
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Recipient Filter", "E.164 normalization, dedupe, suppression list, drop report", run)
+
+    def test_sms_campaigns(self) -> bool:
+        """Test streamed campaign uploads run through the send pipeline"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import asyncio
+                import os
+                import tempfile
+                from types import SimpleNamespace
+                from app.recipients import SQLiteSuppressionStore
+                from app.sms_campaigns import CampaignEngine, SQLiteCampaignStore
+                
+                sent = []
+                
+                async def send(to, body, from_number=None, campaign_id=None, bulk=False):
+                    await asyncio.sleep(0.001)
+                    sent.append((to, body, campaign_id))
+                    return {"status": "failed", "error": "invalid"} if to.endswith("0003") else {"status": "sent"}
+                
+                upload = (
+                    "phone,event_name,event_date\n"
+                    "555-201-0001,Summit,Nov 20\n"
+                    "+15552010002,Summit,Nov 21\n"
+                    "(555) 201-0001,Summit,Nov 20\n"  # duplicate
+                    "+1-555-1234,Summit,Nov 20\n"  # invalid
+                    "5552010003,Summit,Nov 22\n"
+                    "5552010004,Summit,Nov 22\n"  # opted out
+                    "5552010005,Summit\n"  # missing event_date
+                ).encode()
+                
+                async def chunks():
+                    for start in range(0, len(upload), 16):
+                        yield upload[start:start + 16]
+                
+                with tempfile.TemporaryDirectory() as tmp:
+                    suppression = SQLiteSuppressionStore(os.path.join(tmp, "suppression.db"))
+                    suppression.add(["+15552010004"])
+                    store = SQLiteCampaignStore(os.path.join(tmp, "campaigns.db"))
+                    engine = CampaignEngine(
+                        store, upload_dir=os.path.join(tmp, "uploads"), concurrency=3,
+                        service=SimpleNamespace(_send_sms=send), suppression=suppression,
+                    )
+                    
+                    async def scenario():
+                        received = await engine.receive(chunks(), "csv", template="event_confirmation", campaign_id="summit")
+                        await engine.start("summit")
+                        return received
+                    
+                    received = asyncio.run(scenario())
+                    record = store.get("summit")
+                    leftovers = os.listdir(os.path.join(tmp, "uploads"))
+                    suppression._conn.close()
+                    store._conn.close()
+                
+                return (
+                    received["status"] == "queued" and received["upload_bytes"] == len(upload) and
+                    record["status"] == "completed" and record["progress"] == 100 and
+                    record["rows"] == 7 and record["sent"] == 2 and record["failed"] == 2 and
+                    record["recipients"]["dropped"] == {"invalid": 1, "duplicate": 1, "suppressed": 1} and
+                    sorted(to for to, _, _ in sent) == ["+15552010001", "+15552010002", "+15552010003"] and
+                    all(body.startswith("Confirmed! You're registered for Summit") and campaign == "summit"
+                        for _, body, campaign in sent) and
+                    {error["to"] for error in record["errors"]} == {"+15552010003", "+15552010005"} and
+                    leftovers == []
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("SMS Campaigns", "Streamed CSV upload → normalize → render → send, progress record", run)
+
+    def test_twiml(self) -> bool:
+        """Test escaped TwiML, the per-message cache and bounded batch voice"""
+        def run():
+            try:
+                sys.path.insert(0, "c:\\Users\\VICTOR MORALES\\Documents\\WealthBridge\\code-catalyst\\backend")
+                import asyncio
+                from types import SimpleNamespace
+                from xml.dom.minidom import parseString
+                from app.twilio_service import TwilioService
+                from app.twiml import VoiceResponse, say_twiml
+                
+                twiml = say_twiml("Relief Q&A moved <today> \x07", confirm_prompt=True)
+                spoken = parseString(twiml).getElementsByTagName("Say")[0].firstChild.data
+                before = say_twiml.cache_info().hits
+                say_twiml("Relief Q&A moved <today> \x07", confirm_prompt=True)
+                cached = say_twiml.cache_info().hits == before + 1
+                try:
+                    VoiceResponse().say("x" * 5000).to_xml()
+                    oversized = False
+                except ValueError:
+                    oversized = True
+                
+                in_flight, peak, documents = [0], [0], set()
+                
+                async def create_call(to, from_, twiml):
+                    in_flight[0] += 1
+                    peak[0] = max(peak[0], in_flight[0])
+                    await asyncio.sleep(0.01)
+                    in_flight[0] -= 1
+                    documents.add(twiml)
+                    return {"sid": f"CA{to[-4:]}"}
+                
+                service = TwilioService()
+                service.client = SimpleNamespace(create_call=create_call)
+                service.enabled = True
+                service.default_number = "+15559990000"
+                result = asyncio.run(service.send_voice_batch(
+                    [f"+1555201{i:04d}" for i in range(20)], "Payments & updates", concurrency=50,
+                ))
+                
+                return (
+                    spoken == "Relief Q&A moved <today> " and "&amp;" in twiml and "&lt;today&gt;" in twiml and
+                    cached and oversized and
+                    result["queued_count"] == 20 and 1 < peak[0] <= result["concurrency"] and
+                    len(documents) == 1
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("TwiML", "Escaped builder, cached per message, bounded batch voice", run)
+
+    def test_notify_fanout(self) -> bool:
+        """Test notify sends to all channels concurrently over one session"""
+        def run():
+            try:
+                import os
+                import time
+                from types import SimpleNamespace
+                sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli"))
+                from notify import NotificationBuilder
+                
+                class SlowSession:
+                    """Stands in for requests.Session: every POST takes 200 ms"""
+                    def __init__(self):
+                        self.calls = []
+                    
+                    def post(self, url, json=None, timeout=None):
+                        self.calls.append((url, timeout))
+                        time.sleep(0.2)
+                        if "discord" in url:
+                            raise TimeoutError("read timed out")
+                        return SimpleNamespace(ok=True, json=lambda: {"sid": "SM1"}, status_code=200, text="")
+                    
+                    def close(self):
+                        pass
+                
+                session = SlowSession()
+                builder = NotificationBuilder(session=session)
+                kwargs = {
+                    "message": "Deploy done", "text": "Deploy done", "to": "+15550000001",
+                    "subject": "Deploy", "body": "Done",
+                }
+                os.environ["SLACK_WEBHOOK_URL"] = "http://hooks.local/slack"
+                os.environ["DISCORD_WEBHOOK_URL"] = "http://hooks.local/discord"
+                try:
+                    started = time.monotonic()
+                    result = builder.send_all(["sms", "email", "slack", "discord"], **kwargs)
+                    elapsed = time.monotonic() - started
+                finally:
+                    del os.environ["SLACK_WEBHOOK_URL"], os.environ["DISCORD_WEBHOOK_URL"]
+                    builder.close()
+                
+                return (
+                    elapsed < 0.5 and  # one after another: 4 x 200 ms
+                    len(session.calls) == 4 and
+                    dict(session.calls)["http://hooks.local/slack"] == 5 and
+                    result["status"] == "partial" and result["sent"] == 3 and result["failed"] == 1 and
+                    [list(channel)[0] for channel in result["channels"]] == ["sms", "email", "slack", "discord"] and
+                    result["channels"][3]["discord"]["status"] == "error"
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Notify Fan-out", "Concurrent channels, shared session, per-channel timeouts", run)
+
+    def test_notify_daemon(self) -> bool:
+        """Test notify daemon coalesces a burst from clients into one digest"""
+        def run():
+            try:
+                import os
+                import tempfile
+                import threading
+                import time
+                from types import SimpleNamespace
+                sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli"))
+                from notify import NotificationBuilder, NotifyDaemon, send_via_daemon
+                
+                class RecordingSession:
+                    """Stands in for requests.Session and keeps every payload"""
+                    def __init__(self):
+                        self.payloads = []
+                    
+                    def post(self, url, json=None, timeout=None):
+                        self.payloads.append((url, json))
+                        return SimpleNamespace(ok=True, json=lambda: {}, status_code=200, text="")
+                    
+                    def close(self):
+                        pass
+                
+                session = RecordingSession()
+                socket_path = os.path.join(tempfile.mkdtemp(), "notify.sock")
+                daemon = NotifyDaemon(socket_path, window=0.3, builder=NotificationBuilder(session=session))
+                server = threading.Thread(target=daemon.serve_forever, daemon=True)
+                server.start()
+                for _ in range(50):
+                    if os.path.exists(socket_path):
+                        break
+                    time.sleep(0.02)
+                
+                hook = {"webhook_url": "http://hooks.local/slack"}
+                try:
+                    replies = [
+                        send_via_daemon(["slack"], {"text": f"step {i}", **hook}, socket_path)
+                        for i in range(5)
+                    ]
+                    rejected = send_via_daemon(["email"], {"subject": "No body"}, socket_path)
+                    buffered = len(session.payloads)
+                    time.sleep(0.6)
+                finally:
+                    daemon.shutdown()
+                    server.join(5)
+                
+                digest = session.payloads[0][1]["attachments"][0]["text"] if session.payloads else ""
+                return (
+                    all(reply["status"] == "queued" for reply in replies) and
+                    rejected["status"] == "error" and "Missing: body" in rejected["errors"]["email"] and
+                    buffered == 0 and len(session.payloads) == 1 and
+                    digest.startswith("5 notifications:") and "- step 4" in digest and
+                    daemon.coalescer.stats["sent"] == 5 and
+                    not os.path.exists(socket_path) and
+                    send_via_daemon(["slack"], {"text": "no daemon"}, socket_path) is None
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Notify Daemon", "Socket handoff, burst coalesced into one digest", run)
+
+    def test_notify_daemon_slow_channel(self) -> bool:
+        """Test the daemon replies before a slow send finishes"""
+        def run():
+            try:
+                import os
+                import tempfile
+                import threading
+                import time
+                from types import SimpleNamespace
+                sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli"))
+                from notify import NotificationBuilder, NotifyDaemon, send_via_daemon
+                
+                class SlowSession:
+                    """A slow webhook; a send still running when the session closes is lost"""
+                    def __init__(self, seconds):
+                        self.seconds = seconds
+                        self.payloads = []
+                        self.closed = False
+                    
+                    def post(self, url, json=None, timeout=None):
+                        time.sleep(self.seconds)
+                        if self.closed:
+                            raise RuntimeError("session closed mid-send")
+                        self.payloads.append((url, json))
+                        return SimpleNamespace(ok=True, json=lambda: {}, status_code=200, text="")
+                    
+                    def close(self):
+                        self.closed = True
+                
+                def notify(window, seconds, wait_before_shutdown=0.0):
+                    session = SlowSession(seconds)
+                    socket_path = os.path.join(tempfile.mkdtemp(), "notify.sock")
+                    daemon = NotifyDaemon(socket_path, window=window, builder=NotificationBuilder(session=session))
+                    server = threading.Thread(target=daemon.serve_forever, daemon=True)
+                    server.start()
+                    for _ in range(50):
+                        if os.path.exists(socket_path):
+                            break
+                        time.sleep(0.02)
+                    
+                    try:
+                        started = time.perf_counter()
+                        reply = send_via_daemon(["slack"], {"text": "deploy done", "webhook_url": "http://hooks.local/slack"}, socket_path)
+                        elapsed = time.perf_counter() - started
+                        time.sleep(wait_before_shutdown)
+                    finally:
+                        # Shutdown waits for the send in progress
+                        daemon.shutdown()
+                        server.join(10)
+                    return reply, elapsed, len(session.payloads), daemon.coalescer.stats["sent"]
+                
+                # Window 0: sent at once, from its own thread
+                reply, elapsed, delivered, sent = notify(window=0, seconds=3)
+                # Sent by the window timer, still in progress at shutdown
+                _, _, timer_delivered, timer_sent = notify(window=0.2, seconds=1, wait_before_shutdown=0.5)
+                
+                print(f"   Reply in {elapsed * 1000:.0f}ms with a 3s send in progress")
+                return (
+                    reply is not None and reply["status"] == "queued" and elapsed < 1.0 and
+                    delivered == 1 and sent == 1 and
+                    timer_delivered == 1 and timer_sent == 1
+                )
+            except Exception as e:
+                print(f"   Error: {e}")
+                return False
+        
+        return self.test("Notify Daemon Slow Channel", "Reply before a 3s send with window 0, shutdown waits for timer sends", run)
+
     def test_end_to_end_flow(self) -> bool:
         """Test complete end-to-end workflow"""
         def run():